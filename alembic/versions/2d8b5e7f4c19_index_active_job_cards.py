@@ -0,0 +1,34 @@
+"""Index active job cards
+
+Revision ID: 2d8b5e7f4c19
+Revises: 9a4c71e0d3b2
+Create Date: 2025-11-24 10:17:03.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8b5e7f4c19'
+down_revision: Union[str, Sequence[str], None] = '9a4c71e0d3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("status IN ('Pending', 'Processing')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_job_cards_active_id', 'job_cards', ['id'], unique=False, postgresql_where=ACTIVE)
+    op.create_index('ix_job_cards_active_project_id', 'job_cards', ['project_id', 'id'], unique=False, postgresql_where=ACTIVE)
+    op.create_index(op.f('ix_tasks_job_card_id'), 'tasks', ['job_card_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tasks_job_card_id'), table_name='tasks')
+    op.drop_index('ix_job_cards_active_project_id', table_name='job_cards')
+    op.drop_index('ix_job_cards_active_id', table_name='job_cards')
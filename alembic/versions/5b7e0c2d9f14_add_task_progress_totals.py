@@ -0,0 +1,44 @@
+"""Add task progress totals
+
+Revision ID: 5b7e0c2d9f14
+Revises: 8d2e41b7c3a5
+Create Date: 2025-11-12 09:41:36.218570
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c2d9f14'
+down_revision: Union[str, Sequence[str], None] = '8d2e41b7c3a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('quantity_done_total', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False))
+    op.add_column('tasks', sa.Column('last_progress_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_task_progress_logs_task_id'), 'task_progress_logs', ['task_id'], unique=False)
+
+    # Backfill from the existing logs
+    op.execute("""
+        UPDATE tasks t SET
+            quantity_done_total = l.total,
+            last_progress_at = l.last_at
+        FROM (
+            SELECT task_id, sum(quantity_done) AS total, max(created_at) AS last_at
+            FROM task_progress_logs GROUP BY task_id
+        ) l
+        WHERE t.id = l.task_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_task_progress_logs_task_id'), table_name='task_progress_logs')
+    op.drop_column('tasks', 'last_progress_at')
+    op.drop_column('tasks', 'quantity_done_total')
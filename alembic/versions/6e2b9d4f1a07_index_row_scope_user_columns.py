@@ -0,0 +1,40 @@
+"""Index row scope user columns
+
+Revision ID: 6e2b9d4f1a07
+Revises: c3d8f2a61e57
+Create Date: 2025-11-19 09:42:51.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2b9d4f1a07'
+down_revision: Union[str, Sequence[str], None] = 'c3d8f2a61e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns the row-level scopes in app/core/permissions.py filter on.
+SCOPE_COLUMNS = [
+    ('job_cards', 'site_engineer_user_id'),
+    ('job_cards', 'supervisor_user_id'),
+    ('job_cards', 'foreman_user_id'),
+    ('duty_officer_progress', 'created_by_id'),
+    ('site_officer_reports', 'created_by_id'),
+    ('material_requisitions', 'requested_by_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in SCOPE_COLUMNS:
+        op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(SCOPE_COLUMNS):
+        op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table)
@@ -0,0 +1,38 @@
+"""Index report browser
+
+Revision ID: 7f3a91c2d6e8
+Revises: 2d8b5e7f4c19
+Create Date: 2025-11-25 16:41:22.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3a91c2d6e8'
+down_revision: Union[str, Sequence[str], None] = '2d8b5e7f4c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keyset order and filters of the duty / site officer report lists.
+INDEXES = [
+    ('ix_duty_officer_progress_date_of_work_id', 'duty_officer_progress', ['date_of_work', 'id']),
+    ('ix_duty_officer_progress_job_card_id', 'duty_officer_progress', ['job_card_id']),
+    ('ix_site_officer_reports_date_id', 'site_officer_reports', ['date', 'id']),
+    ('ix_report_jc_association_job_card_id', 'report_jc_association', ['job_card_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,76 @@
+"""Add design v3 project progress counters
+
+Revision ID: 8d2e41b7c3a5
+Revises: 3c1f9a7e2b40
+Create Date: 2025-11-05 10:27:18.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e41b7c3a5'
+down_revision: Union[str, Sequence[str], None] = '3c1f9a7e2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('design_projects_v3', sa.Column('current_stage_name', sa.String(), nullable=True))
+    op.add_column('design_projects_v3', sa.Column('current_stage_order', sa.Integer(), nullable=True))
+    op.add_column('design_projects_v3', sa.Column('current_stage_started_at', sa.DateTime(), nullable=True))
+    op.add_column('design_projects_v3', sa.Column('stages_total', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('design_projects_v3', sa.Column('stages_completed', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('design_projects_v3', sa.Column('tasks_total', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('design_projects_v3', sa.Column('tasks_submitted', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the stages/tasks. The time a stage started was never
+    # recorded, so days-in-stage for projects already mid-stage counts from now.
+    op.execute("""
+        UPDATE design_projects_v3 p SET
+            stages_total = s.stages_total,
+            stages_completed = s.stages_completed,
+            tasks_total = COALESCE(t.tasks_total, 0),
+            tasks_submitted = COALESCE(t.tasks_submitted, 0)
+        FROM (
+            SELECT project_id,
+                   count(*) AS stages_total,
+                   count(*) FILTER (WHERE status = 'COMPLETED') AS stages_completed
+            FROM design_stages_v3 GROUP BY project_id
+        ) s
+        LEFT JOIN (
+            SELECT st.project_id,
+                   count(*) AS tasks_total,
+                   count(*) FILTER (WHERE t.status = 'SUBMITTED') AS tasks_submitted
+            FROM design_tasks_v3 t JOIN design_stages_v3 st ON st.id = t.stage_id
+            GROUP BY st.project_id
+        ) t ON t.project_id = s.project_id
+        WHERE p.id = s.project_id
+    """)
+    op.execute("""
+        UPDATE design_projects_v3 p SET
+            current_stage_name = cur.name::text,
+            current_stage_order = cur."order",
+            current_stage_started_at = now()
+        FROM (
+            SELECT DISTINCT ON (project_id) project_id, name, "order"
+            FROM design_stages_v3 WHERE status = 'IN_PROGRESS'
+            ORDER BY project_id, "order"
+        ) cur
+        WHERE p.id = cur.project_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('design_projects_v3', 'tasks_submitted')
+    op.drop_column('design_projects_v3', 'tasks_total')
+    op.drop_column('design_projects_v3', 'stages_completed')
+    op.drop_column('design_projects_v3', 'stages_total')
+    op.drop_column('design_projects_v3', 'current_stage_started_at')
+    op.drop_column('design_projects_v3', 'current_stage_order')
+    op.drop_column('design_projects_v3', 'current_stage_name')
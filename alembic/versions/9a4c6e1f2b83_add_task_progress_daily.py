@@ -0,0 +1,48 @@
+"""Add task progress daily rollup
+
+Revision ID: 9a4c6e1f2b83
+Revises: 5b7e0c2d9f14
+Create Date: 2025-11-14 15:02:47.903118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c6e1f2b83'
+down_revision: Union[str, Sequence[str], None] = '5b7e0c2d9f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_progress_daily',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('quantity_done', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id', 'date')
+    )
+    op.create_index('ix_task_progress_daily_project_date', 'task_progress_daily', ['project_id', 'date', 'task_id'], unique=False, postgresql_include=['quantity_done'])
+
+    # Backfill from the existing logs
+    op.execute("""
+        INSERT INTO task_progress_daily (task_id, date, project_id, quantity_done)
+        SELECT l.task_id, l.date, jc.project_id, sum(l.quantity_done)
+        FROM task_progress_logs l
+        JOIN tasks t ON t.id = l.task_id
+        JOIN job_cards jc ON jc.id = t.job_card_id
+        GROUP BY l.task_id, l.date, jc.project_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_progress_daily_project_date', table_name='task_progress_daily', postgresql_include=['quantity_done'])
+    op.drop_table('task_progress_daily')
@@ -0,0 +1,62 @@
+"""Add approval audit log
+
+Revision ID: c3d8f2a61e57
+Revises: 9a4c6e1f2b83
+Create Date: 2025-11-18 11:26:09.441872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8f2a61e57'
+down_revision: Union[str, Sequence[str], None] = '9a4c6e1f2b83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('approval_audit_log',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('batch_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('gate', sa.String(), nullable=False),
+    sa.Column('from_status', sa.String(), nullable=True),
+    sa.Column('to_status', sa.String(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('actor_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_approval_audit_log_batch_id'), 'approval_audit_log', ['batch_id'], unique=False)
+    op.create_index('ix_approval_audit_log_entity', 'approval_audit_log', ['entity', 'entity_id'], unique=False)
+
+    # The log is append-only
+    op.execute("""
+        CREATE FUNCTION approval_audit_log_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'approval_audit_log is append-only';
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER approval_audit_log_append_only
+        BEFORE UPDATE OR DELETE ON approval_audit_log
+        FOR EACH ROW EXECUTE FUNCTION approval_audit_log_append_only()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER approval_audit_log_append_only ON approval_audit_log")
+    op.execute("DROP FUNCTION approval_audit_log_append_only()")
+    op.drop_index('ix_approval_audit_log_entity', table_name='approval_audit_log')
+    op.drop_index(op.f('ix_approval_audit_log_batch_id'), table_name='approval_audit_log')
+    op.drop_table('approval_audit_log')
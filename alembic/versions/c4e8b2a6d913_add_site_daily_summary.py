@@ -0,0 +1,87 @@
+"""Add site daily summary
+
+Revision ID: c4e8b2a6d913
+Revises: 7f3a91c2d6e8
+Create Date: 2025-11-27 10:18:36.514820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8b2a6d913'
+down_revision: Union[str, Sequence[str], None] = '7f3a91c2d6e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTS = [
+    'form_b_reports', 'form_c_reports', 'ppe_compliant', 'ppe_non_compliant', 'incidents',
+    'health_good', 'health_needs_improvement', 'health_critical', 'critical_actions',
+]
+
+# Same "nothing to report" answers as app/services/site_summary.py
+REPORTED = """(%s IS NOT NULL AND regexp_replace(lower(%s), '^\\s+|[\\s.]+$', '', 'g')
+    NOT IN ('', 'none', 'nil', 'no', 'n/a', 'na', '-', '0', 'nothing', 'no incidents'))"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('site_daily_summary',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('site_location', sa.String(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    *[sa.Column(name, sa.Integer(), server_default='0', nullable=False) for name in COUNTS],
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('date', 'site_location', 'project_id')
+    )
+
+    # Backfill from the existing reports (see site_summary.rebuild)
+    op.execute("""
+        INSERT INTO site_daily_summary (date, site_location, project_id, form_b_reports, ppe_compliant, ppe_non_compliant)
+        SELECT p.date_of_work, jc.site_location, jc.project_id, count(*),
+               count(*) FILTER (WHERE p.sm_ppe_check), count(*) FILTER (WHERE p.sm_ppe_check IS NOT TRUE)
+        FROM duty_officer_progress p
+        JOIN job_cards jc ON jc.id = p.job_card_id
+        GROUP BY p.date_of_work, jc.site_location, jc.project_id
+    """)
+    incidents = REPORTED % ('r.hs_incidents_near_misses', 'r.hs_incidents_near_misses')
+    critical_actions = REPORTED % ('r.sa_critical_actions', 'r.sa_critical_actions')
+    op.execute(f"""
+        INSERT INTO site_daily_summary (date, site_location, project_id, form_c_reports, ppe_compliant, ppe_non_compliant,
+                                        incidents, health_good, health_needs_improvement, health_critical, critical_actions)
+        SELECT r.date, coalesce(r.site_location, ''), rp.project_id, count(*),
+               count(*) FILTER (WHERE r.hs_ppe_compliance), count(*) FILTER (WHERE r.hs_ppe_compliance IS NOT TRUE),
+               count(*) FILTER (WHERE {incidents}),
+               count(*) FILTER (WHERE r.sa_overall_site_health = 'Good'),
+               count(*) FILTER (WHERE r.sa_overall_site_health = 'Needs Improvement'),
+               count(*) FILTER (WHERE r.sa_overall_site_health = 'Critical'),
+               count(*) FILTER (WHERE {critical_actions})
+        FROM site_officer_reports r
+        JOIN (
+            SELECT a.report_id, jc.project_id
+            FROM report_jc_association a JOIN job_cards jc ON jc.id = a.job_card_id
+            UNION
+            SELECT r2.id, r2.material_requisition_project_id
+            FROM site_officer_reports r2
+            WHERE r2.material_requisition_project_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM report_jc_association a WHERE a.report_id = r2.id)
+        ) rp ON rp.report_id = r.id
+        GROUP BY r.date, coalesce(r.site_location, ''), rp.project_id
+        ON CONFLICT (date, site_location, project_id) DO UPDATE SET
+            form_c_reports = site_daily_summary.form_c_reports + excluded.form_c_reports,
+            ppe_compliant = site_daily_summary.ppe_compliant + excluded.ppe_compliant,
+            ppe_non_compliant = site_daily_summary.ppe_non_compliant + excluded.ppe_non_compliant,
+            incidents = excluded.incidents,
+            health_good = excluded.health_good,
+            health_needs_improvement = excluded.health_needs_improvement,
+            health_critical = excluded.health_critical,
+            critical_actions = excluded.critical_actions
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('site_daily_summary')
@@ -10,7 +10,7 @@ from app.models import (
     User, Role, UserRole, JobCard, Task, Project, SiteEngineer, Supervisor, Foreman,
     DutyOfficerProgress, SiteOfficerReport, MaterialRequisition, Supplier, ToolboxVideo, SiteImage, NannyLog,Material,AuthLog 
 )
-from app.auth.security import verify_password
+from app.auth.security import verify_password_async
 from app.core.database import SessionLocal
 
 
@@ -27,7 +27,7 @@ class MyAuthBackend(AuthenticationBackend):
                 joinedload(User.roles)
             ).filter(User.email == email).first()
 
-            if user and user.is_active and verify_password(password, user.hashed_password):
+            if user and user.is_active and await verify_password_async(password, user.hashed_password):
                 user_roles = {role.name for role in user.roles}
                 
                 allowed_roles = {
@@ -1,14 +1,15 @@
 # app/api/deps.py
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 from typing import Generator
 
-from app.core.database import SessionLocal
+from app.core.database import RECENT_WRITE_COOKIE, SessionLocal, read_session
 from app.core.config import settings
-from app import models, schemas
-from app.auth.security import ALGORITHM
+from app.core import cache, concurrency, permissions
+from app import models
+from app.auth import tokens
 
 from fastapi.responses import RedirectResponse
 from starlette.requests import Request
@@ -26,26 +27,57 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> models.User:
-    """Dependency to get the current user from a JWT token."""
-    credentials_exception = HTTPException(
+def get_read_db(request: Request) -> Generator:
+    """
+    Session for read-only GET endpoints. Goes to the read replica when one is
+    configured, except for a browser that wrote in the last
+    READ_YOUR_WRITES_SECONDS (RECENT_WRITE_COOKIE, set by
+    ReadYourWritesMiddleware), which reads from the primary so it sees its own
+    changes. If the replica cannot be reached the primary is used.
+    """
+    if request.method not in ("GET", "HEAD") or request.cookies.get(RECENT_WRITE_COOKIE):
+        db = SessionLocal()
+    else:
+        db = read_session()
+        if db.info.get("replica"):
+            try:
+                db.connection()
+            except OperationalError as e:
+                print(f"Read replica unavailable, using the primary: {e}")
+                db.close()
+                db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        jti: str = payload.get("jti") # Get the session ID from the token
-        if email is None or jti is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
-    if user is None or not user.is_active or str(user.session_id) != jti:
-        raise credentials_exception
+
+
+def get_principal(token: str = Depends(oauth2_scheme)) -> tokens.Principal:
+    """
+    Who is calling, from the access token's claims alone (no database query).
+    Prefer this, or get_access, over get_current_user when the handler only
+    needs the user's id or roles.
+    """
+    principal = tokens.authenticate(token)
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+def get_current_user(
+    db: Session = Depends(get_db), principal: tokens.Principal = Depends(get_principal)
+) -> models.User:
+    """Dependency to get the current user (the ORM object) from a JWT token."""
+    user = db.get(models.User, principal.user_id)
+    if user is None or not user.is_active:
+        raise _credentials_exception()
     return user
 
 
@@ -54,24 +86,22 @@ def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)
     Dependency to get a user from the access_token cookie.
     Redirects to the login page if the cookie is not valid.
     """
-    token = request.cookies.get("access_token")
-    if not token:
+    principal = tokens.authenticate(request.cookies.get(tokens.ACCESS_COOKIE))
+    if principal is None:
         return RedirectResponse(url="/login")
 
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return RedirectResponse(url="/login")
-    except JWTError:
-        return RedirectResponse(url="/login")
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = db.get(models.User, principal.user_id)
     if user is None or not user.is_active:
         return RedirectResponse(url="/login")
-        
+
+    request.state.principal = principal
     return user
 
+def get_access(principal: tokens.Principal = Depends(get_principal)) -> permissions.Access:
+    """The current user's roles and permissions, from the access token's role claims."""
+    return permissions.from_roles(principal.user_id, principal.roles)
+
+
 def get_template_context(
     request: Request, 
     current_user: models.User = Depends(get_current_user_from_cookie)
@@ -79,19 +109,48 @@ def get_template_context(
     if isinstance(current_user, RedirectResponse):
         return current_user
 
-    user_roles = {role.name for role in current_user.roles}
-    
-    # --- ADD THIS LOGIC ---
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Manager', 'Project Manager'}
-    is_privileged = bool(privileged_roles.intersection(user_roles))
-    admin_roles = {'Super Admin', 'Admin'}
-    is_admin = bool(admin_roles.intersection(user_roles))
-    # ----------------------
+    # Same role claims as the bearer path (get_access), so pages and APIs agree.
+    access = permissions.from_roles(current_user.id, request.state.principal.roles)
 
     return {
         "request": request,
         "user": current_user,
-        "user_roles": user_roles,
-        "is_privileged": is_privileged,
-        "is_admin":is_admin # <-- Pass the boolean flag to the template
-    }
\ No newline at end of file
+        "access": access,
+        "user_roles": access.roles,
+        "is_privileged": access.has(permissions.Permission.VIEW_ALL_JOB_CARDS),
+        "is_admin": access.has(permissions.Permission.ADMIN) # <-- Pass the boolean flag to the template
+    }
+
+
+def json_etag(*tables: str):
+    """
+    Dependency factory for JSON GET endpoints. Answers 304 when the client's
+    If-None-Match still matches the data version of `tables`, otherwise sets
+    a weak ETag on the response. Use via `dependencies=[Depends(deps.json_etag(...))]`
+    on endpoints that read through get_read_db, so both see the same database.
+    """
+    def dependency(request: Request, response: Response, db: Session = Depends(get_read_db)):
+        etag = cache.json_etag(request, db, tables)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in {c.strip() for c in if_none_match.split(",")}:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+    return dependency
+
+
+def concurrency_limit(group: str):
+    """
+    Dependency factory capping how many requests of a route group run at once
+    (see app/core/concurrency.py). Use via
+    `dependencies=[Depends(deps.concurrency_limit("pdf"))]`.
+    """
+    limiter = concurrency.limiters[group]
+
+    async def dependency():
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+    return dependency
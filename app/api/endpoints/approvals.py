@@ -3,12 +3,14 @@ from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal, Optional
 from app.services.slack import send_slack_notification # 2. Import the slack service
 from app.core.config import settings # 3. Import settings for the BASE_URL
 
 from app.api import deps
 from app import models
+from app.core import permissions
+from app.services import approval_workflow, inbox
 
 router = APIRouter()
 
@@ -16,115 +18,98 @@ class ApprovalUpdate(BaseModel):
     approval_type: Literal['pm', 'qs', 'mr']
     new_status: Literal['Approved', 'Rejected']
 
+class ApprovalBatch(BaseModel):
+    approval_type: Literal['mr', 'pm', 'qs', 'finance']
+    new_status: Literal['Approved', 'Rejected']
+    ids: List[int] = Field(..., min_length=1, max_length=200)
+    notes: Optional[str] = None
+
 @router.get("/pending", tags=["Approvals"])
 def get_pending_approvals(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
     Fetches material requisitions pending approval for the current user.
     This endpoint is role-aware and handles sequential logic.
     """
-    user_roles = {role.name for role in current_user.roles}
-    query = db.query(models.MaterialRequisition).options(
+    approvals = inbox.requisition_approvals(access.roles, include_mr=False)
+    if approvals is None:
+        return []
+
+    # One row per requisition: PM items first, then QS items that are MR-approved.
+    # Whether a QS item is actionable (the PM has also approved it) is decided in SQL.
+    where, pending_for, is_actionable = approvals
+    rows = db.query(
+        models.MaterialRequisition, pending_for.label("pending_for"), is_actionable.label("is_actionable")
+    ).options(
         joinedload(models.MaterialRequisition.project),
         joinedload(models.MaterialRequisition.requested_by)
-    ).order_by(models.MaterialRequisition.request_date.desc())
+    ).filter(where).order_by(models.MaterialRequisition.request_date.desc()).all()
 
     pending_items = []
-    
-    # For Project Managers: Show items awaiting PM approval THAT ARE MR-APPROVED.
-    if models.UserRole.PROJECT_MANAGER in user_roles:
-        pm_pending = query.filter(
-            models.MaterialRequisition.pm_approval == 'Pending',
-           # models.MaterialRequisition.mr_approval == 'Approved'  # <-- ADD THIS CONDITION
-        ).all()
-        for item in pm_pending:
-            item.pending_for = 'PM'
-            item.is_actionable = True
-            pending_items.append(item)
-
-    # For QS: Show items awaiting QS approval THAT ARE MR-APPROVED.
-    if models.UserRole.QS in user_roles:
-        qs_pending = query.filter(
-            models.MaterialRequisition.qs_approval == 'Pending',
-            models.MaterialRequisition.mr_approval == 'Approved'  # <-- ADD THIS CONDITION
-        ).all()
-        for item in qs_pending:
-            if item not in pending_items:
-                item.pending_for = 'QS'
-                # The logic that an item is only actionable for a QS if the PM 
-                # has also approved it remains correct.
-                item.is_actionable = (item.pm_approval == 'Approved')
-                pending_items.append(item)
+    for item, item_pending_for, item_is_actionable in rows:
+        item.pending_for = item_pending_for
+        item.is_actionable = item_is_actionable
+        pending_items.append(item)
 
     return pending_items
 
 
+@router.post("/batch", tags=["Approvals"])
+def batch_update_approvals(
+    update_data: ApprovalBatch,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """
+    Approves or rejects many requisitions (mr/pm/qs) or LPOs (finance) in one
+    transaction. Items that can't move are listed under `skipped`; one Slack
+    digest is sent for the items that did.
+    """
+    result = approval_workflow.transition(
+        db, update_data.approval_type, update_data.ids, update_data.new_status,
+        current_user, access.roles, update_data.notes
+    )
+    db.commit()
+
+    message = approval_workflow.digest_message(result, current_user, settings.BASE_URL)
+    if message:
+        background_tasks.add_task(send_slack_notification, message=message)
+
+    count = len(result.applied)
+    return {
+        "message": f"{count} item{'s' if count != 1 else ''} {update_data.new_status.lower()}.",
+        **result.summary()
+    }
+
+
 @router.post("/{req_id}/status", response_class=JSONResponse, tags=["Approvals"])
 def update_approval_status(
     req_id: int,
     update_data: ApprovalUpdate,
     background_tasks: BackgroundTasks, # 4. Add background_tasks to the function signature
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    current_user: models.User = Depends(deps.get_current_user),
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
     Updates the approval status for a specific requisition and sends notifications.
     """
-    req = db.query(models.MaterialRequisition).options(
-        joinedload(models.MaterialRequisition.project) # Eager load project for the message
-    ).filter(models.MaterialRequisition.id == req_id).first()
-    
-    if not req:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
-
-    user_roles = {role.name for role in current_user.roles}
-    approval_field_updated = ""
-
-    if update_data.approval_type == 'mr':
-        if "Procurement" not in user_roles and not {"Admin", "Super Admin"}.intersection(user_roles):
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for MR approval")
-        req.mr_approval = update_data.new_status
-        approval_field_updated = "MR"
-        if update_data.new_status == 'Rejected':
-            req.status = 'Rejected'
-    
-    elif update_data.approval_type == 'pm':
-        if "Project Manager" not in user_roles:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for PM approval")
-        req.pm_approval = update_data.new_status
-        approval_field_updated = "PM"
-
-    elif update_data.approval_type == 'qs':
-        if "QS" not in user_roles:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for QS approval")
-        req.qs_approval = update_data.new_status
-        approval_field_updated = "QS"
-    else:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid approval type")
-        
+    result = approval_workflow.transition(
+        db, update_data.approval_type, [req_id], update_data.new_status, current_user, access.roles
+    )
+    if result.skipped:
+        reason = result.skipped[0]["reason"]
+        if reason == "not found":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requisition not found")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Requisition is {reason}.")
     db.commit()
 
-    # --- 5. NEW NOTIFICATION LOGIC ---
-    if update_data.new_status == 'Approved':
-        mr_link = f"<{settings.BASE_URL}/requisition-details/{req.id}|{req.mr_number}>"
-        message = ""
-
-        # If MR was just approved, notify the PMs
-        if approval_field_updated == "MR":
-            message = f"✅ MR Approved: {mr_link} for project *{req.project.name}* is ready for PM approval."
-        
-        # If PM was just approved, notify the QSs
-        elif approval_field_updated == "PM":
-            message = f"✅ PM Approved: {mr_link} for project *{req.project.name}* is ready for QS approval."
-
-        # If QS was just approved (final approval), notify Procurement
-        elif approval_field_updated == "QS" and req.pm_approval == 'Approved':
-            message = f"🎉 Fully Approved: {mr_link} for project *{req.project.name}* is now fully approved and ready for processing."
-
-        if message:
-            background_tasks.add_task(send_slack_notification, message=message)
-    # --------------------------------
+    message = approval_workflow.digest_message(result, current_user, settings.BASE_URL)
+    if message and update_data.new_status == 'Approved':
+        background_tasks.add_task(send_slack_notification, message=message)
 
-    return {"message": f"Requisition {req.id} has been {update_data.new_status.lower()}."}
\ No newline at end of file
+    return {"message": f"Requisition {req_id} has been {update_data.new_status.lower()}."}
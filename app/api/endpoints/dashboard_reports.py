@@ -1,14 +1,17 @@
 # app/api/endpoints/dashboard_reports.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, or_, and_
 from typing import List, Optional
-from datetime import date
+from datetime import date, timedelta
 from pydantic import BaseModel
 
 from app.api import deps
 from app import models
 from app import schemas  # <-- 1. IMPORT YOUR NEW SCHEMAS
+from app.core import permissions
+from app.core.permissions import Permission
+from app.services import progress_analytics, site_summary
 
 router = APIRouter()
 
@@ -20,9 +23,10 @@ class JobCardReportData(BaseModel):
     done_count: int
     items: List[schemas.JobCardSchema]  # <-- 2. USE THE PYDANTIC SCHEMA
 
-@router.get("/job-cards", tags=["Reports"], response_model=JobCardReportData)
+@router.get("/job-cards", tags=["Reports"], response_model=JobCardReportData,
+            dependencies=[Depends(deps.json_etag("job_cards", "projects", "users"))])
 def get_job_card_report(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
     status: Optional[str] = None
@@ -61,9 +65,10 @@ class MRReportData(BaseModel):
     rejected_count: int
     items: List[schemas.MaterialRequisitionSchema]  # <-- 3. USE THE PYDANTIC SCHEMA
 
-@router.get("/material-requisitions", tags=["Reports"], response_model=MRReportData)
+@router.get("/material-requisitions", tags=["Reports"], response_model=MRReportData,
+            dependencies=[Depends(deps.json_etag("material_requisitions", "projects", "users"))])
 def get_mr_report(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
     status: Optional[str] = None,
@@ -113,9 +118,10 @@ class LPOReportData(BaseModel):
     total_value_approved: float
     items: List[schemas.LPOSchema]  # <-- 4. USE THE PYDANTIC SCHEMA
 
-@router.get("/lpos", tags=["Reports"], response_model=LPOReportData)
+@router.get("/lpos", tags=["Reports"], response_model=LPOReportData,
+            dependencies=[Depends(deps.json_etag("lpos", "projects", "suppliers", "users"))])
 def get_lpo_report(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
     status: Optional[str] = None
@@ -155,4 +161,37 @@ def get_lpo_report(
         "rejected_count": rejected_count,
         "total_value_approved": float(total_value_approved),
         "items": items
-    }
\ No newline at end of file
+    }
+
+# --- Site Summary (Form B + Form C) ---
+SITE_SUMMARY_DEFAULT_DAYS = 90
+
+@router.get("/site-summary", tags=["Reports"], dependencies=[Depends(deps.json_etag("site_daily_summary", "projects"))])
+def get_site_summary(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    project_id: Optional[int] = None,
+    site_location: Optional[str] = None,
+    db: Session = Depends(deps.get_read_db),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """
+    Daily site summary from Form B and Form C: reports submitted, PPE
+    compliance, incidents / near misses, site health and open critical actions
+    per site location and project, read from site_daily_summary. Defaults to
+    the last 90 days.
+    """
+    access.require(Permission.VIEW_ALL_SITE_REPORTS, "Not authorized to view site summaries")
+
+    end = end or date.today()
+    start = start or end - timedelta(days=SITE_SUMMARY_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end.")
+    if progress_analytics.bucket_count(start, end, bucket) > progress_analytics.MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many {bucket} buckets in range (max {progress_analytics.MAX_BUCKETS}); use a coarser bucket."
+        )
+
+    return site_summary.summary(db, start, end, bucket, project_id, site_location)
@@ -9,12 +9,14 @@ from app.api import deps
 from app import models
 from app.design_v3_models import Deal, CommitmentPackage
 from app.core.config import settings
-from azure.storage.blob.aio import BlobServiceClient
-from sqlalchemy import func
+from app.core import metrics
+from sqlalchemy import func, select
+from pydantic import BaseModel, Field
 
 from app.design_v3_models import Deal, DesignProjectV3, DesignStageV3, StageV3Name, StageV3Status, CommitmentPackage,DesignTaskV3
 
 from app.design_v3_models import ProjectType, DealAttachment, DealAttachmentType
+from app.services import design_v3_workflow as workflow
 
 
 
@@ -24,83 +26,6 @@ from app.design_v3_models import ProjectType, DealAttachment, DealAttachmentType
 router = APIRouter()
 
 
-# # --- Reusable logic for creating stages and tasks ---
-# def _create_stages_and_tasks(db: Session, project: DesignProjectV3):
-#     # This template defines which tasks are auto-created for each stage
-#     DELIVERABLE_TEMPLATES_V3 = {
-#         StageV3Name.INITIAL_DESIGN: ["2D Layout", "SketchUp Model", "Render Set v1", "Preliminary BOQ"],
-#         # Add other stages with default tasks here in the future
-#     }
-    
-#     # Create all stages in order
-#     for i, stage_enum in enumerate(StageV3Name):
-#         # The first actionable stage is 2A (SITE_VISIT)
-#         stage_status = StageV3Status.IN_PROGRESS if stage_enum == StageV3Name.SITE_VISIT else StageV3Status.LOCKED
-        
-#         new_stage = DesignStageV3(
-#             project_id=project.id,
-#             name=stage_enum,
-#             status=stage_status,
-#             order=i + 1
-#         )
-#         db.add(new_stage)
-#         db.flush()
-        
-#         # Create the default tasks for this stage
-#         tasks_for_stage = DELIVERABLE_TEMPLATES_V3.get(stage_enum, [])
-#         for task_title in tasks_for_stage:
-#             new_task = DesignTaskV3(stage_id=new_stage.id, title=task_title)
-#             db.add(new_task)
-
-def _create_stages_and_tasks(db: Session, project: DesignProjectV3):
-    """A helper function to create all default stages and tasks for a new V3 project."""
-    
-    DELIVERABLE_TEMPLATES_V3 = {
-        StageV3Name.INITIAL_DESIGN: ["2D Layout", "SketchUp Model", "Render Set v1", "Preliminary BOQ"],
-        StageV3Name.TECH_REVIEW: ["Structural Review", "MEP Review", "Landscape Review"],
-        StageV3Name.AUTHORITY_PACKAGE: ["Architectural Set", "Structural Set", "MEP Set", "Landscape Set", "Lighting Set", "Paint Plans Set"],
-        StageV3Name.FINAL_DELIVERY: ["Client-ready final design set", "Internal release memo"],
-        StageV3Name.EXECUTION_HANDOVER: ["Execution-ready files", "Task checklist for site team"]
-    }
-    # -----------------------
-    
-    # We explicitly define the linear workflow stages to create
-    stages_to_create = [
-        StageV3Name.FINANCE_CONFIRMATION,
-        StageV3Name.DEAL_CREATION,
-        StageV3Name.SITE_VISIT,
-        StageV3Name.MEASUREMENT,
-        StageV3Name.INITIAL_DESIGN,
-        StageV3Name.QS_HANDOVER,
-        StageV3Name.TECH_REVIEW,
-        StageV3Name.AUTHORITY_PACKAGE,
-        StageV3Name.FINAL_DELIVERY,
-        StageV3Name.EXECUTION_HANDOVER,
-    ]
-
-    for i, stage_enum in enumerate(stages_to_create):
-        # The first actionable stage is 2A (SITE_VISIT)
-        stage_status = StageV3Status.IN_PROGRESS if stage_enum == StageV3Name.SITE_VISIT else StageV3Status.LOCKED
-        
-        # --- THIS IS THE FIX ---
-        new_stage = DesignStageV3(
-            project_id=project.id,
-            name=stage_enum,             # enum member → stored as .value due to values_callable
-            status=stage_status,         # enum member → stored as .name (UPPERCASE)
-            order=i + 1,
-        )
-        # -----------------------
-        db.add(new_stage)
-        db.flush()
-        
-        # Create the default tasks for this stage
-        tasks_for_stage = DELIVERABLE_TEMPLATES_V3.get(stage_enum, [])
-        for task_title in tasks_for_stage:
-            new_task = DesignTaskV3(stage_id=new_stage.id, title=task_title)
-            db.add(new_task)
-
-
-
 @router.post("/", tags=["Design V3 Deals"])
 async def create_deal_v3(
     db: Session = Depends(deps.get_db),
@@ -121,7 +46,8 @@ async def create_deal_v3(
     as_builts: List[UploadFile] = File([], alias="as_built")
 ):
     """Creates a new V3 Deal, uploading attachments to Azure."""
-    
+    from azure.storage.blob.aio import BlobServiceClient  # Azure SDK is imported on first upload
+
     async def upload_to_azure(file: UploadFile) -> str:
         if not file or not file.filename:
             return ""
@@ -129,14 +55,16 @@ async def create_deal_v3(
         container_name = "deal-attachments"
         async with blob_service_client:
             container_client = blob_service_client.get_container_client(container_name)
-            if not await container_client.exists():
-                await container_client.create_container()
+            with metrics.track_external("azure"):
+                if not await container_client.exists():
+                    await container_client.create_container()
             
             blob_name = f"{uuid.uuid4()}-{file.filename}"
             blob_client = container_client.get_blob_client(blob_name)
             
             file_contents = await file.read()
-            await blob_client.upload_blob(file_contents, overwrite=True)
+            with metrics.track_external("azure"):
+                await blob_client.upload_blob(file_contents, overwrite=True)
             return {"url": blob_client.url, "name": file.filename}
 
     # # Upload files and get their URLs
@@ -218,23 +146,43 @@ def activate_deal_v3(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Creates a new V3 Design Project from a Deal."""
-    deal = db.query(Deal).filter(Deal.id == deal_id).first()
+    deal = db.query(Deal).filter(Deal.id == deal_id).with_for_update().first()
     if not deal:
         raise HTTPException(status_code=404, detail="Deal not found.")
         
     if deal.project:
         raise HTTPException(status_code=400, detail="A project has already been activated for this deal.")
 
-    new_project = DesignProjectV3(
-        name=deal.project_name,
-        client=deal.client_name,
-        created_by_id=current_user.id,
-        deal_id=deal.id
-    )
-    db.add(new_project)
-    db.flush()
-    
-    _create_stages_and_tasks(db, new_project)
+    project_ids = workflow.activate_deals(db, [deal], current_user.id)
     
     db.commit()
-    return {"message": "Project activated successfully!", "project_id": new_project.id}
\ No newline at end of file
+    return {"message": "Project activated successfully!", "project_id": project_ids[deal.id]}
+
+
+class DealBatchActivate(BaseModel):
+    deal_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+@router.post("/activate-batch", tags=["Design V3 Deals"])
+def activate_deals_v3_batch(
+    payload: DealBatchActivate,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """Activates many deals at once (imports). Deals that are missing or already activated are skipped."""
+    requested = list(dict.fromkeys(payload.deal_ids))
+    deals = db.query(Deal).filter(Deal.id.in_(requested)).order_by(Deal.id).with_for_update().all()
+    already_active = set(db.execute(
+        select(DesignProjectV3.deal_id).where(DesignProjectV3.deal_id.in_([d.id for d in deals]))
+    ).scalars())
+    to_activate = [d for d in deals if d.id not in already_active]
+
+    project_ids = workflow.activate_deals(db, to_activate, current_user.id)
+    db.commit()
+
+    found = {d.id for d in deals}
+    return {
+        "activated": [{"deal_id": deal_id, "project_id": project_id} for deal_id, project_id in project_ids.items()],
+        "already_activated": sorted(already_active),
+        "not_found": [deal_id for deal_id in requested if deal_id not in found],
+    }
\ No newline at end of file
@@ -1,11 +1,47 @@
 # app/api/endpoints/design/projects_v3.py
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session, selectinload, joinedload
+from app import models
 from app.api import deps
 from app.design_v3_models import DesignProjectV3, DesignStageV3, DesignTaskV3,MeasurementRequisition,InterdisciplinarySignoff
 
 router = APIRouter()
 
+
+@router.get("/portfolio", tags=["Design V3 Projects"])
+def get_design_v3_portfolio(
+    status: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """Progress of every V3 project, read from the counters on design_projects_v3 (no stage or task rows)."""
+    days_in_stage = func.floor(
+        func.extract("epoch", func.now() - DesignProjectV3.current_stage_started_at) / 86400
+    ).label("days_in_stage")
+    query = db.query(
+        DesignProjectV3.id, DesignProjectV3.name, DesignProjectV3.client, DesignProjectV3.status,
+        DesignProjectV3.current_stage_name, DesignProjectV3.current_stage_order, DesignProjectV3.current_stage_started_at,
+        DesignProjectV3.stages_total, DesignProjectV3.stages_completed,
+        DesignProjectV3.tasks_total, DesignProjectV3.tasks_submitted,
+        days_in_stage,
+    )
+    if status:
+        query = query.filter(DesignProjectV3.status == status)
+
+    total_count = query.count()
+    rows = query.order_by(DesignProjectV3.created_at.desc(), DesignProjectV3.id.desc()).offset(skip).limit(limit).all()
+    projects = []
+    for row in rows:
+        project = dict(row._mapping)
+        project["days_in_stage"] = int(row.days_in_stage) if row.days_in_stage is not None else None
+        projects.append(project)
+    return {"total_count": total_count, "projects": projects}
+
+
 @router.get("/{project_id}", tags=["Design V3 Projects"])
 def get_design_project_v3_details(project_id: int, db: Session = Depends(deps.get_db)):
     """Fetches a single V3 Design Project with all its stages, tasks, and compliance data."""
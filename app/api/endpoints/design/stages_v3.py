@@ -1,8 +1,8 @@
 # app/api/endpoints/design/stages_v3.py
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, timezone
 from fastapi import Request
 from app.api import deps
@@ -13,10 +13,8 @@ from fastapi.responses import HTMLResponse
 
 
 from fastapi.responses import HTMLResponse # Add this import
-from fastapi.templating import Jinja2Templates # Add this import
-
-# Add this at the top, after your router definition
-templates = Jinja2Templates(directory="templates")
+from app.core.templating import templates
+from app.services import design_v3_workflow as workflow
 
 router = APIRouter()
 
@@ -37,15 +35,12 @@ class QSUpdate(BaseModel):
     cost_estimation_sheet_link: HttpUrl
     validated_boq_link: HttpUrl
 
-def _unlock_next_stage(db: Session, current_stage: DesignStageV3):
-    next_stage = db.query(DesignStageV3).filter_by(project_id=current_stage.project_id, order=current_stage.order + 1).first()
-    if next_stage:
-        next_stage.status = StageV3Status.IN_PROGRESS
+def _user_roles(user: models.User) -> set:
+    return {role.name for role in user.roles}
 
 @router.post("/{stage_id}/complete-2a", tags=["Design V3 Stages"])
-def complete_stage_2a(stage_id: int, update_data: SiteVisitUpdate, db: Session = Depends(deps.get_db)):
-    stage = db.query(DesignStageV3).filter_by(id=stage_id, name=StageV3Name.SITE_VISIT, status=StageV3Status.IN_PROGRESS).first()
-    if not stage: raise HTTPException(status_code=404, detail="Active Stage 2A not found.")
+def complete_stage_2a(stage_id: int, update_data: SiteVisitUpdate, db: Session = Depends(deps.get_db), current_user: models.User = Depends(deps.get_current_user)):
+    workflow.complete_stage(db, stage_id, StageV3Name.SITE_VISIT, _user_roles(current_user), not_found="Active Stage 2A not found.")
     
     # --- THIS IS THE FIX ---
     # Manually create the log entry, converting HttpUrl objects to strings
@@ -58,8 +53,6 @@ def complete_stage_2a(stage_id: int, update_data: SiteVisitUpdate, db: Session =
     )
     # -----------------------
     db.add(log_entry)
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage)
     db.commit()
     return {"message": "Stage 2A completed."}
 
@@ -71,9 +64,7 @@ def complete_stage_4_qs(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Completes Stage 4, logs the QS validation, and unlocks the next stage."""
-    stage = db.query(DesignStageV3).filter_by(id=stage_id, name=StageV3Name.QS_HANDOVER, status=StageV3Status.IN_PROGRESS).first()
-    if not stage:
-        raise HTTPException(status_code=404, detail="Active Stage 4 (QS Handover) not found.")
+    workflow.complete_stage(db, stage_id, StageV3Name.QS_HANDOVER, _user_roles(current_user), not_found="Active Stage 4 (QS Handover) not found.")
 
     log_entry = QSValidation(
         stage_id=stage_id,
@@ -82,10 +73,6 @@ def complete_stage_4_qs(
         validated_boq_link=str(update_data.validated_boq_link)
     )
     db.add(log_entry)
-    
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage) # Re-use the helper to unlock Stage 5
-    
     db.commit()
     return {"message": "Stage 4 (QS) completed successfully."}
 
@@ -126,6 +113,57 @@ def create_measurement_requisition(
 
 
 
+TASK_LIST_TEMPLATE = "design/v3/_stage_task_list.html"
+
+
+def _design_team_members(db: Session) -> list:
+    """Users who can be assigned V3 design tasks (the assignment dropdown)."""
+    team_roles = [models.UserRole.DESIGN_TEAM_MEMBER, models.UserRole.LEAD_DESIGNER, models.UserRole.TECH_ENGINEER, models.UserRole.DOC_CONTROLLER, models.UserRole.DESIGN_MANAGER]
+    return db.query(models.User).join(models.User.roles).filter(models.Role.name.in_(team_roles)).all()
+
+
+def _task_list_context(request: Request, stage: DesignStageV3, team_members: list, current_user: models.User, user_roles: set) -> dict:
+    return {
+        "request": request,
+        "stage": stage,
+        "team_members": team_members,
+        "user": current_user,
+        "user_roles": user_roles,
+    }
+
+
+@router.get("/tasks-html", tags=["Design V3 Stages"])
+def get_project_stage_tasks_html(
+    request: Request,
+    project_id: int,
+    stage_id: Optional[List[int]] = Query(None, description="Only render these stages (partial refresh after an action)"),
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Renders the task list partial for every stage of a project in one go:
+    one query for the stages with their tasks and owners, one for the team
+    members. Returns {"stages": {stage_id: html}}. Pass stage_id (repeatable)
+    to re-render just the stages an action touched.
+    """
+    query = db.query(DesignStageV3).options(
+        selectinload(DesignStageV3.tasks).joinedload(DesignTaskV3.owner)
+    ).filter(DesignStageV3.project_id == project_id)
+    if stage_id:
+        query = query.filter(DesignStageV3.id.in_(stage_id))
+    stages = query.order_by(DesignStageV3.order).all()
+
+    team_members = _design_team_members(db) if stages else []
+    user_roles = {role.name for role in current_user.roles}
+    template = templates.get_template(TASK_LIST_TEMPLATE)
+    return {
+        "stages": {
+            stage.id: template.render(_task_list_context(request, stage, team_members, current_user, user_roles))
+            for stage in stages
+        }
+    }
+
+
 @router.get("/{stage_id}/tasks-html", response_class=HTMLResponse, tags=["Design V3 Stages"])
 def get_stage_tasks_html(
     stage_id: int,
@@ -133,27 +171,16 @@ def get_stage_tasks_html(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
-    """Renders the HTML partial for a task-based stage."""
+    """Renders the HTML partial for a task-based stage. The project page uses the batched /tasks-html."""
     stage = db.query(DesignStageV3).options(
         selectinload(DesignStageV3.tasks).joinedload(DesignTaskV3.owner)
     ).filter(DesignStageV3.id == stage_id).first()
 
     if not stage:
         return "<p class='text-danger p-3'>Stage not found.</p>"
-        
-    # Fetch team members for the assignment dropdown
-    team_roles = [models.UserRole.DESIGN_TEAM_MEMBER, models.UserRole.LEAD_DESIGNER, models.UserRole.TECH_ENGINEER, models.UserRole.DOC_CONTROLLER, models.UserRole.DESIGN_MANAGER]
-    team_members = db.query(models.User).join(models.User.roles).filter(models.Role.name.in_(team_roles)).all()
-    
-    # Prepare context for the template
-    context = {
-        "request": request,
-        "stage": stage,
-        "team_members": team_members,
-        "user": current_user,
-        "user_roles": {role.name for role in current_user.roles}
-    }
-    return templates.TemplateResponse("design/v3/_stage_task_list.html", context)
+
+    context = _task_list_context(request, stage, _design_team_members(db), current_user, {role.name for role in current_user.roles})
+    return templates.TemplateResponse(TASK_LIST_TEMPLATE, context)
 
 
 
@@ -161,21 +188,18 @@ def get_stage_tasks_html(
 def complete_stage_2b(
     stage_id: int,
     update_data: MeasurementComplete,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
 ):
     """Marks Stage 2B as complete and unlocks the next stage."""
-    stage = db.query(DesignStageV3).filter_by(id=stage_id, name=StageV3Name.MEASUREMENT).first()
-    if not stage or not stage.measurement_requisition:
-        raise HTTPException(status_code=404, detail="Active measurement requisition not found.")
+    # Gate Logic: the requisition must exist; completes Stage 2B and unlocks Stage 3
+    workflow.complete_stage(db, stage_id, StageV3Name.MEASUREMENT, _user_roles(current_user), not_found="Active measurement requisition not found.")
 
     # Update the measurement requisition record
-    stage.measurement_requisition.status = "Approved"
-    stage.measurement_requisition.measurement_package_link = str(update_data.measurement_package_link)
-    
-    # Gate Logic: Complete Stage 2B and unlock Stage 3
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage)
-    
+    requisition = db.query(MeasurementRequisition).filter_by(stage_id=stage_id).first()
+    requisition.status = "Approved"
+    requisition.measurement_package_link = str(update_data.measurement_package_link)
+
     db.commit()
     return {"message": "Measurement received and Stage 2B is complete."}
 
@@ -189,20 +213,7 @@ def complete_stage_3(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Checks if all tasks in Stage 3 are submitted, then completes the stage."""
-    user_roles = {role.name for role in current_user.roles}
-    if not {"Design Manager", "Lead Designer"}.intersection(user_roles):
-        raise HTTPException(status_code=403, detail="Not authorized.")
-
-    stage = db.query(DesignStageV3).options(selectinload(DesignStageV3.tasks)).filter_by(id=stage_id).first()
-    if not stage or stage.name != StageV3Name.INITIAL_DESIGN:
-        raise HTTPException(status_code=404, detail="Stage 3 not found.")
-
-    for task in stage.tasks:
-        if task.status != TaskStatusV3.SUBMITTED:
-            raise HTTPException(status_code=400, detail=f"Cannot complete: Task '{task.title}' is not submitted.")
-            
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage)
+    workflow.complete_stage(db, stage_id, StageV3Name.INITIAL_DESIGN, _user_roles(current_user), not_found="Stage 3 not found.")
     db.commit()
     return {"message": "Stage 3 completed. Handoff to QS initiated."}
 
@@ -238,27 +249,8 @@ def complete_stage_5(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Checks if all Stage 5 signoffs are done, then completes the stage."""
-    user_roles = {role.name for role in current_user.roles}
-    if not {"Design Manager", "Lead Designer"}.intersection(user_roles):
-        raise HTTPException(status_code=403, detail="Not authorized for this action.")
-
-    stage = db.query(DesignStageV3).options(
-        selectinload(DesignStageV3.interdisciplinary_signoffs)
-    ).filter_by(id=stage_id, name=StageV3Name.TECH_REVIEW).first()
-
-    if not stage:
-        raise HTTPException(status_code=404, detail="Stage 5 not found.")
-
-    # Gate Logic: Check if all disciplines are signed off (assuming 3 are required)
-    REQUIRED_SIGNOFFS = 3
-    if len(stage.interdisciplinary_signoffs) < REQUIRED_SIGNOFFS:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Cannot complete stage: Not all technical disciplines have been signed off."
-        )
-            
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage) # This unlocks Stage 6
+    # Gate Logic: all disciplines signed off (see workflow.STAGE_RULES); unlocks Stage 6
+    workflow.complete_stage(db, stage_id, StageV3Name.TECH_REVIEW, _user_roles(current_user), not_found="Stage 5 not found.")
     db.commit()
     return {"message": "Stage 5 completed. Authority Drawing Package is now unlocked."}
 
@@ -270,27 +262,8 @@ def complete_stage_6(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Checks if all tasks in Stage 6 are submitted, then completes the stage."""
-    user_roles = {role.name for role in current_user.roles}
-    if not {"Design Manager", "Lead Designer"}.intersection(user_roles):
-        raise HTTPException(status_code=403, detail="Not authorized for this action.")
-
-    stage = db.query(DesignStageV3).options(
-        selectinload(DesignStageV3.tasks)
-    ).filter_by(id=stage_id, name=StageV3Name.AUTHORITY_PACKAGE).first()
-
-    if not stage:
-        raise HTTPException(status_code=404, detail="Stage 6 not found.")
-
-    # Gate Logic: Check if all tasks in this stage are Submitted
-    for task in stage.tasks:
-        if task.status != TaskStatusV3.SUBMITTED:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Cannot complete stage: Task '{task.title}' is not yet submitted."
-            )
-            
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage) # This unlocks Stage 7
+    # Gate Logic: all tasks in this stage Submitted; unlocks Stage 7
+    workflow.complete_stage(db, stage_id, StageV3Name.AUTHORITY_PACKAGE, _user_roles(current_user), not_found="Stage 6 not found.")
     db.commit()
     return {"message": "Stage 6 completed. Final Package Delivery is now unlocked."}
 
@@ -302,27 +275,8 @@ def complete_stage_7(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Checks if all tasks in Stage 7 are submitted, then completes the stage."""
-    user_roles = {role.name for role in current_user.roles}
-    if not {"Design Manager", "Lead Designer"}.intersection(user_roles):
-        raise HTTPException(status_code=403, detail="Not authorized for this action.")
-
-    stage = db.query(DesignStageV3).options(
-        selectinload(DesignStageV3.tasks)
-    ).filter_by(id=stage_id, name=StageV3Name.FINAL_DELIVERY).first()
-
-    if not stage:
-        raise HTTPException(status_code=404, detail="Stage 7 not found.")
-
-    # Gate Logic: Check if all tasks in this stage are Submitted
-    for task in stage.tasks:
-        if task.status != TaskStatusV3.SUBMITTED:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Cannot complete stage: Task '{task.title}' is not yet submitted."
-            )
-            
-    stage.status = StageV3Status.COMPLETED
-    _unlock_next_stage(db, stage) # This unlocks Stage 8
+    # Gate Logic: all tasks in this stage Submitted; unlocks Stage 8
+    workflow.complete_stage(db, stage_id, StageV3Name.FINAL_DELIVERY, _user_roles(current_user), not_found="Stage 7 not found.")
     db.commit()
     return {"message": "Stage 7 completed. Handover to Execution is now unlocked."}
 
@@ -359,7 +313,8 @@ def handover_stage_8(
     
     # If both have now signed off, complete the stage and the project
     if project.handover_design_head_signed_by_id and project.handover_ops_head_signed_by_id:
-        stage.status = StageV3Status.COMPLETED
+        if stage.status == StageV3Status.IN_PROGRESS:
+            workflow.complete_stage(db, stage_id, StageV3Name.EXECUTION_HANDOVER, user_roles, not_found="Stage 8 not found.")
         project.status = "Handed Over"
 
     db.commit()
@@ -8,6 +8,7 @@ from sqlalchemy.orm import selectinload, joinedload
 from app.api import deps
 from app import models
 from app.design_v3_models import DesignTaskV3,DesignStageV3,StageV3Status,StageV3Name, TaskStatusV3
+from app.services import design_v3_workflow as workflow
 from datetime import datetime, timezone
 
 class TaskSubmitDataV3(BaseModel):
@@ -51,10 +52,13 @@ def submit_design_task_v3(
     current_user: models.User = Depends(deps.get_current_user)
 ):
     """Submits a file link for a V3 task."""
-    task = db.query(DesignTaskV3).filter(DesignTaskV3.id == task_id).first()
+    # Locked so two concurrent submits cannot both see it open and count it twice.
+    task = db.query(DesignTaskV3).filter(DesignTaskV3.id == task_id).with_for_update().first()
     if not task or task.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Task not found or you are not the owner.")
 
+    if task.status != TaskStatusV3.SUBMITTED:
+        workflow.record_task_submitted(db, task)
     task.file_link = str(submit_data.file_link)
     task.status = TaskStatusV3.SUBMITTED
     task.submitted_at = datetime.now(timezone.utc)
@@ -1,46 +1,89 @@
 # app/api/endpoints/duty_officer_reports.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import or_, tuple_
 from sqlalchemy.orm import Session, joinedload
 
 from app.api import deps
 from app import models
-from app.utils import generate_sas_url
+from app.core import permissions
+from app.core.permissions import Permission
+from app.utils import date_cursor, generate_sas_url, parse_date_cursor
 
 router = APIRouter()
 
+REPORT_PAGE_SIZE = 25
+
+
 @router.get("/", tags=["Duty Officer Reports"])
 def get_all_duty_officer_reports(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    project_id: Optional[int] = None,
+    job_card_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    search: Optional[str] = Query(None, description="Job card no., project, author, output or issues"),
+    limit: int = Query(REPORT_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(deps.get_read_db),
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
-    Fetches a list of Duty Officer Progress reports.
+    One page of Duty Officer Progress reports, newest first, as summary rows;
+    the full report is at /{report_id}.
     - Privileged users see all reports.
     - Non-privileged users (e.g., Foremen) see only reports they created.
     """
-    # Base query with eager loading for performance on the list page
-    query = db.query(models.DutyOfficerProgress).options(
-        joinedload(models.DutyOfficerProgress.job_card).joinedload(models.JobCard.project),
-        joinedload(models.DutyOfficerProgress.created_by)
-    )
+    report = models.DutyOfficerProgress
+    query = db.query(
+        report.id, report.date_of_work, report.job_card_id, models.JobCard.job_card_no,
+        models.Project.id.label("project_id"), models.Project.name.label("project_name"),
+        report.created_by_id, models.User.name.label("created_by_name"), report.created_at
+    ).join(models.JobCard, models.JobCard.id == report.job_card_id).join(
+        models.Project, models.Project.id == models.JobCard.project_id
+    ).outerjoin(models.User, models.User.id == report.created_by_id)
 
-    # Define roles that can see ALL reports
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    user_roles = {role.name for role in current_user.roles}
-    is_privileged = bool(privileged_roles.intersection(user_roles))
+    # Privileged users see every report, everyone else only their own
+    query = query.filter(permissions.owned_scope(access, Permission.VIEW_ALL_SITE_REPORTS, report.created_by_id))
 
-    # If the user is NOT privileged, filter the query to their own records
-    if not is_privileged:
-        query = query.filter(models.DutyOfficerProgress.created_by_id == current_user.id)
+    if from_date:
+        query = query.filter(report.date_of_work >= from_date)
+    if to_date:
+        query = query.filter(report.date_of_work <= to_date)
+    if project_id:
+        query = query.filter(models.JobCard.project_id == project_id)
+    if job_card_id:
+        query = query.filter(report.job_card_id == job_card_id)
+    if author_id:
+        query = query.filter(report.created_by_id == author_id)
+    if search:
+        search_term = f"%{search}%"
+        query = query.filter(or_(
+            models.JobCard.job_card_no.ilike(search_term),
+            models.Project.name.ilike(search_term),
+            models.User.name.ilike(search_term),
+            report.actual_output.ilike(search_term),
+            report.issues_delays.ilike(search_term)
+        ))
+    if cursor:
+        try:
+            after = parse_date_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        query = query.filter(tuple_(report.date_of_work, report.id) < after)
+    rows = query.order_by(report.date_of_work.desc(), report.id.desc()).limit(limit + 1).all()
 
-    reports = query.order_by(models.DutyOfficerProgress.date_of_work.desc()).all()
-    return reports
+    reports = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = date_cursor(reports[-1]["date_of_work"], reports[-1]["id"]) if len(rows) > limit else None
+    return {"reports": reports, "next_cursor": next_cursor}
 
 @router.get("/{report_id}", tags=["Duty Officer Reports"])
 def get_duty_officer_report_details(
     report_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
     Fetches all details for a single Duty Officer Progress report.
@@ -57,11 +100,7 @@ def get_duty_officer_report_details(
         raise HTTPException(status_code=404, detail="Report not found")
 
     # Security check: Ensure non-privileged users can only see their own reports
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    user_roles = {role.name for role in current_user.roles}
-    is_privileged = bool(privileged_roles.intersection(user_roles))
-    
-    if not is_privileged and report.created_by_id != current_user.id:
+    if not access.has(Permission.VIEW_ALL_SITE_REPORTS) and report.created_by_id != access.user_id:
         raise HTTPException(status_code=403, detail="You do not have permission to view this report")
 
     # Generate SAS URLs for media files
@@ -0,0 +1,23 @@
+# app/api/endpoints/inbox.py
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app import models
+from app.core import permissions
+from app.services import inbox
+
+router = APIRouter()
+
+
+@router.get("", tags=["Inbox"])
+def get_my_inbox(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """
+    Everything waiting on the current user - job cards, MR and LPO approvals,
+    Design and Design V3 tasks - with a count per source and the first items.
+    """
+    return inbox.get_inbox(db, current_user, access.roles)
@@ -11,16 +11,14 @@ from pydantic import BaseModel
 from app.api import deps
 from app import models, invoice_models
 from app.core.config import settings
-from azure.storage.blob.aio import BlobServiceClient # Use aio for async uploads
+from app.core import metrics
+from app.core.templating import templates as pdf_templates
+from app.services import pdf
 from sqlalchemy import or_
 from app.utils import generate_sas_url, image_to_data_uri
-from weasyprint import HTML, CSS
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import StreamingResponse
 import io
 
-pdf_templates = Jinja2Templates(directory="templates")
-
 router = APIRouter()
 
 def get_next_invoice_number(db: Session):
@@ -84,18 +82,22 @@ async def create_invoice(
 
         # Handle file uploads
         if attachments:
+            from azure.storage.blob.aio import BlobServiceClient # Use aio for async uploads; imported on first use
+
             blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
             container_name = "invoice-attachments"
             async with blob_service_client:
                 container_client = blob_service_client.get_container_client(container_name)
-                if not await container_client.exists():
-                    await container_client.create_container()
+                with metrics.track_external("azure"):
+                    if not await container_client.exists():
+                        await container_client.create_container()
 
                 for file in attachments:
                     blob_name = f"{uuid.uuid4()}-{file.filename}"
                     blob_client = container_client.get_blob_client(blob_name)
                     file_contents = await file.read()
-                    await blob_client.upload_blob(file_contents, overwrite=True)
+                    with metrics.track_external("azure"):
+                        await blob_client.upload_blob(file_contents, overwrite=True)
                     
                     new_att = invoice_models.InvoiceAttachment(
                         blob_url=blob_client.url,
@@ -112,9 +114,9 @@ async def create_invoice(
 
 
 
-@router.get("/", tags=["Invoices"])
+@router.get("/", tags=["Invoices"], dependencies=[Depends(deps.json_etag("invoices", "suppliers", "projects"))])
 def get_invoices(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None
@@ -142,7 +144,7 @@ def get_invoices(
 
 
 @router.get("/{invoice_id}", tags=["Invoices"])
-def get_invoice_details(invoice_id: int, db: Session = Depends(deps.get_db)):
+def get_invoice_details(invoice_id: int, db: Session = Depends(deps.get_read_db)):
     """Fetches all details for a single Invoice."""
     invoice = db.query(invoice_models.Invoice).options(
         joinedload(invoice_models.Invoice.supplier),
@@ -161,8 +163,8 @@ def get_invoice_details(invoice_id: int, db: Session = Depends(deps.get_db)):
     return invoice
 
 
-@router.get("/{invoice_id}/pdf", tags=["Invoices"], response_class=StreamingResponse)
-def generate_invoice_pdf(invoice_id: int, db: Session = Depends(deps.get_db)):
+@router.get("/{invoice_id}/pdf", tags=["Invoices"], response_class=StreamingResponse, dependencies=[Depends(deps.concurrency_limit("pdf"))])
+def generate_invoice_pdf(invoice_id: int, db: Session = Depends(deps.get_read_db)):
     """Generates and returns a PDF for a given Invoice."""
     invoice = db.query(invoice_models.Invoice).options(
         joinedload(invoice_models.Invoice.supplier),
@@ -186,6 +188,9 @@ def generate_invoice_pdf(invoice_id: int, db: Session = Depends(deps.get_db)):
     }
     html_string = pdf_templates.get_template("invoice/invoice_pdf.html").render(context)
 
-    pdf_bytes = HTML(string=html_string).write_pdf()
-    headers = {'Content-Disposition': f'inline; filename="{invoice.invoice_number}.pdf"'}
+    filename = f"{invoice.invoice_number}.pdf"
+    db.rollback()  # Release the DB connection while the PDF renders
+
+    pdf_bytes = pdf.render(html_string)
+    headers = {'Content-Disposition': f'inline; filename="{filename}"'}
     return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
\ No newline at end of file
@@ -1,14 +1,22 @@
 # app/api/endpoints/job_card_details.py
-from fastapi import APIRouter, Depends, HTTPException, Body, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body, Form, Query
 from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import or_
+from sqlalchemy import func, or_, tuple_
 from typing import List, Optional
 
 from app.api import deps
+from app.auth import tokens
 from app import models
+from app.core import permissions
+from app.core.permissions import Permission
+from app.core.config import settings
+from app.services import task_progress
+from app.services.slack import send_slack_notification
+from app.utils import date_cursor, parse_date_cursor
 
 from pydantic import BaseModel
 from datetime import date, datetime
+from decimal import Decimal
 
 
 
@@ -28,7 +36,7 @@ def get_all_personnel(db: Session = Depends(deps.get_db)):
 def get_job_card_details(
     jc_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """Fetches all details for a single Job Card."""
     job_card = db.query(models.JobCard).options(
@@ -50,33 +58,75 @@ def get_job_card_details(
         raise HTTPException(status_code=404, detail="Job Card not found")
 
     # Security Check
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    user_roles = {role.name for role in current_user.roles}
-    is_privileged = bool(privileged_roles.intersection(user_roles))
-    
-    is_assigned = (
-        job_card.site_engineer_user_id == current_user.id or
-        job_card.supervisor_user_id == current_user.id or
-        job_card.foreman_user_id == current_user.id
+    is_assigned = access.is_assigned(
+        job_card.site_engineer_user_id, job_card.supervisor_user_id, job_card.foreman_user_id
     )
 
-    if not is_privileged and not is_assigned:
+    if not access.has(Permission.VIEW_ALL_JOB_CARDS) and not is_assigned:
         raise HTTPException(status_code=403, detail="You do not have permission to view this job card")
         
     return job_card
 
 
+@router.get("/{jc_id}/progress", tags=["Job Card Details"])
+def get_job_card_progress(
+    jc_id: int,
+    db: Session = Depends(deps.get_db),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """Percent complete of every task on a Job Card, from the stored totals in one query."""
+    percent = func.least(
+        100, func.round(models.Task.quantity_done_total * 100 / func.nullif(models.Task.quantity, 0), 1)
+    )
+    rows = db.query(
+        models.JobCard.site_engineer_user_id, models.JobCard.supervisor_user_id, models.JobCard.foreman_user_id,
+        models.Task.id, models.Task.task_details, models.Task.status, models.Task.quantity, models.Task.units,
+        models.Task.quantity_done_total, models.Task.last_progress_at, percent.label("percent_complete")
+    ).outerjoin(models.Task, models.Task.job_card_id == models.JobCard.id).filter(
+        models.JobCard.id == jc_id
+    ).order_by(models.Task.id).all()
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="Job Card not found")
+
+    if not access.has(Permission.VIEW_ALL_JOB_CARDS) and not access.is_assigned(
+        rows[0].site_engineer_user_id, rows[0].supervisor_user_id, rows[0].foreman_user_id
+    ):
+        raise HTTPException(status_code=403, detail="You do not have permission to view this job card")
+
+    tasks = [
+        {
+            "id": row.id,
+            "task_details": row.task_details,
+            "status": row.status,
+            "quantity": row.quantity,
+            "units": row.units,
+            "quantity_done_total": row.quantity_done_total,
+            "last_progress_at": row.last_progress_at,
+            "percent_complete": row.percent_complete,
+        }
+        for row in rows if row.id is not None
+    ]
+    # Tasks are measured in different units, so the job card is the plain average
+    measured = [t["percent_complete"] for t in tasks if t["percent_complete"] is not None]
+    return {
+        "job_card_id": jc_id,
+        "percent_complete": round(sum(measured) / len(measured), 1) if measured else None,
+        "tasks": tasks
+    }
+
+
 @router.post("/{jc_id}/comments", tags=["Job Card Details"])
 def add_job_card_comment(
     jc_id: int,
     comment_text: str = Form(...),
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal)
 ):
     """Adds a new comment to a Job Card."""
     new_comment = models.JobCardComment(
         job_card_id=jc_id,
-        comment_by_id=current_user.id,
+        comment_by_id=principal.user_id,
         comment_text=comment_text
     )
     db.add(new_comment)
@@ -87,17 +137,16 @@ def add_job_card_comment(
 @router.post("/{jc_id}/reassign", tags=["Job Card Details"])
 def reassign_job_card(
     jc_id: int,
+    background_tasks: BackgroundTasks,
     supervisor_user_id: int = Body(...),
     foreman_user_id: int = Body(...),
     notes: str = Body(None),
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal),
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """Re-assigns a Job Card and creates a history log entry."""
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    user_roles = {role.name for role in current_user.roles}
-    if not privileged_roles.intersection(user_roles):
-        raise HTTPException(status_code=403, detail="Not authorized to re-assign job cards")
+    access.require(Permission.REASSIGN_JOB_CARDS, "Not authorized to re-assign job cards")
 
     job_card = db.query(models.JobCard).filter(models.JobCard.id == jc_id).first()
     if not job_card:
@@ -106,11 +155,12 @@ def reassign_job_card(
     job_card.supervisor_user_id = supervisor_user_id
     job_card.foreman_user_id = foreman_user_id
 
+    # Written with the reassignment itself, so the history can never miss one.
     log_entry = models.JobCardAssignmentLog(
         job_card_id=jc_id,
         assigned_supervisor_id=supervisor_user_id,
         assigned_foreman_id=foreman_user_id,
-        changed_by_id=current_user.id,
+        changed_by_id=principal.user_id,
         change_notes=notes
     )
     db.add(log_entry)
@@ -118,7 +168,7 @@ def reassign_job_card(
     # Notify the new Supervisor
     supervisor_notification = models.Notification(
         user_id=supervisor_user_id,
-        message=f"Job Card {job_card.job_card_no} has been assigned to you by {current_user.name}.",
+        message=f"Job Card {job_card.job_card_no} has been assigned to you by {principal.name}.",
         link=f"/job-card-details/{jc_id}"
     )
     db.add(supervisor_notification)
@@ -131,7 +181,7 @@ def reassign_job_card(
     # Notify the new Foreman
     foreman_notification = models.Notification(
         user_id=foreman_user_id,
-        message=f"Job Card {job_card.job_card_no} has been assigned to you by {current_user.name}.",
+        message=f"Job Card {job_card.job_card_no} has been assigned to you by {principal.name}.",
         link=f"/job-card-details/{jc_id}"
     )
     db.add(foreman_notification)
@@ -149,46 +199,62 @@ class TaskProgressCreate(BaseModel):
 
 # --- 2. ADD THESE TWO NEW ENDPOINTS (e.g., after the /reassign endpoint) ---
 
+PROGRESS_LOG_PAGE_SIZE = 20
+
+
 @router.get("/tasks/{task_id}/progress", tags=["Job Card Details"])
 def get_task_progress(
     task_id: int,
+    limit: int = Query(PROGRESS_LOG_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: Session = Depends(deps.get_db)
 ):
-    """Fetches a task and its progress log."""
-    task = db.query(models.Task).options(
-        selectinload(models.Task.progress_logs).joinedload(models.TaskProgressLog.created_by)
+    """Fetches a task's progress totals and one page of its progress log, newest first."""
+    task = db.query(
+        models.Task.id, models.Task.quantity, models.Task.units,
+        models.Task.quantity_done_total, models.Task.last_progress_at
     ).filter(models.Task.id == task_id).first()
-    
+
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    # Calculate total done
-    total_done = sum(log.quantity_done for log in task.progress_logs)
-    
+
+    query = db.query(
+        models.TaskProgressLog.id, models.TaskProgressLog.date, models.TaskProgressLog.quantity_done,
+        models.TaskProgressLog.notes, models.TaskProgressLog.created_at, models.User.name.label("created_by_name")
+    ).outerjoin(models.User, models.User.id == models.TaskProgressLog.created_by_id).filter(
+        models.TaskProgressLog.task_id == task_id
+    )
+    if cursor:
+        try:
+            after = parse_date_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        query = query.filter(tuple_(models.TaskProgressLog.date, models.TaskProgressLog.id) < after)
+    rows = query.order_by(models.TaskProgressLog.date.desc(), models.TaskProgressLog.id.desc()).limit(limit + 1).all()
+
+    logs = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = date_cursor(logs[-1]["date"], logs[-1]["id"]) if len(rows) > limit else None
     return {
-        "task": task,
-        "total_done": total_done
+        "task": dict(task._mapping),
+        "total_done": task.quantity_done_total,
+        "logs": logs,
+        "next_cursor": next_cursor
     }
 
+
 @router.post("/tasks/{task_id}/progress", tags=["Job Card Details"])
 def log_task_progress(
     task_id: int,
     progress_data: TaskProgressCreate,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal)
 ):
-    """Adds a new progress log entry to a task."""
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    new_log = models.TaskProgressLog(
-        task_id=task_id,
-        date=progress_data.date,
-        quantity_done=progress_data.quantity_done,
-        notes=progress_data.notes,
-        created_by_id=current_user.id
+    """Adds a new progress log entry to a task and updates the task's totals."""
+    total_done = task_progress.record_progress(
+        db, task_id, progress_data.date, Decimal(str(progress_data.quantity_done)),
+        progress_data.notes, principal.user_id
     )
-    db.add(new_log)
+    if total_done is None:
+        raise HTTPException(status_code=404, detail="Task not found")
     db.commit()
-    return {"message": "Progress logged successfully."}
\ No newline at end of file
+    return {"message": "Progress logged successfully.", "total_done": total_done}
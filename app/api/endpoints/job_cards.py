@@ -1,16 +1,22 @@
 # app/api/endpoints/job_cards.py
-from fastapi import APIRouter, Depends, Form, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Form, HTTPException, BackgroundTasks, Query, UploadFile, File
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import date
-from sqlalchemy import or_
+from sqlalchemy import func, or_, select
 
 from app.api import deps
+from app.auth import tokens
 from app import models
 from app.utils import generate_job_card_number
 from app.services.slack import send_slack_notification
+from app.core import permissions
 from app.core.config import settings
+from app.services import job_card_import, task_status
 
 router = APIRouter()
 
@@ -18,7 +24,7 @@ router = APIRouter()
 async def create_job_card(
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     project_id: int = Form(...),
     job_card_no: str = Form(...),
     date_issued: date = Form(...),
@@ -45,7 +51,7 @@ async def create_job_card(
             job_card_no=job_card_no,
             date_issued=date_issued,
             site_location=site_location,
-            created_by_id=current_user.id, # Automatically set the creator
+            created_by_id=principal.user_id, # Automatically set the creator
             site_engineer_user_id=site_engineer_user_id,
             supervisor_user_id=supervisor_user_id,
             foreman_user_id=foreman_user_id,
@@ -75,7 +81,7 @@ async def create_job_card(
         # Notify the new Supervisor
         supervisor_notification = models.Notification(
             user_id=supervisor_user_id,
-            message=f"Job Card {job_card_no} has been assigned to you by {current_user.name}.",
+            message=f"Job Card {job_card_no} has been assigned to you by {principal.name}.",
             link=f"/job-card-details/{new_job_card.id}"
         )
         db.add(supervisor_notification)
@@ -88,7 +94,7 @@ async def create_job_card(
         # Notify the new Foreman
         foreman_notification = models.Notification(
             user_id=foreman_user_id,
-            message=f"Job Card {job_card_no} has been assigned to you by {current_user.name}.",
+            message=f"Job Card {job_card_no} has been assigned to you by {principal.name}.",
             link=f"/job-card-details/{new_job_card.id}"
         )
         db.add(foreman_notification)
@@ -105,44 +111,97 @@ async def create_job_card(
         db.rollback()
         return JSONResponse(status_code=500, content={"message": f"An error occurred: {e}"})
 
+@router.get("/import/template.csv", response_class=PlainTextResponse, tags=["Job Cards"])
+def get_job_card_import_template():
+    """Header row for bulk job card imports (one row per task)."""
+    return PlainTextResponse(
+        ",".join(job_card_import.COLUMNS) + "\n",
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="job_card_import.csv"'},
+    )
+
+
+@router.post("/import", tags=["Job Cards"], dependencies=[Depends(deps.concurrency_limit("uploads"))])
+def import_job_cards(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    dry_run: bool = True,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    Bulk-creates job cards and their tasks from a CSV or XLSX file (columns as in
+    /job-cards/import/template.csv). With dry_run (the default) nothing is
+    written and the response lists what would be created and every row error.
+    """
+    try:
+        plan = job_card_import.build_plan(
+            db, job_card_import.read_rows(file.file, file.filename), settings.JOB_CARD_IMPORT_MAX_ROWS
+        )
+    except job_card_import.JobCardImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    summary = {"dry_run": dry_run, **plan.summary()}
+    if dry_run:
+        return summary
+    if not summary["valid"]:
+        return JSONResponse(status_code=400, content=jsonable_encoder({**summary, "message": "Nothing was imported; fix the errors and upload again."}))
+    if not plan.job_cards:
+        raise HTTPException(status_code=400, detail="The file has no job cards.")
+
+    try:
+        created = job_card_import.commit_plan(db, plan, current_user)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Some job card numbers were taken while importing. Please upload again.")
+
+    background_tasks.add_task(
+        send_slack_notification,
+        message=f"📥 *Job Card Import:* {current_user.name} imported {created['job_cards']} job cards with {created['tasks']} tasks. Link: {settings.BASE_URL}/job-card-tracking"
+    )
+    return {**summary, "message": f"Imported {created['job_cards']} job cards and {created['tasks']} tasks.", "created": created}
+
+
+class TaskStatusChange(BaseModel):
+    task_id: int
+    status: str
+
+
+class TaskStatusBatch(BaseModel):
+    updates: List[TaskStatusChange] = Field(..., min_length=1, max_length=500)
+
+
+@router.post("/api/tasks/update-status", response_class=JSONResponse, tags=["Tasks API"])
+def update_task_statuses(
+    payload: TaskStatusBatch,
+    db: Session = Depends(deps.get_db),
+    principal: tokens.Principal = Depends(deps.get_principal),
+):
+    """Sets many task statuses at once; returns the new task statuses and the job cards whose status changed."""
+    result = task_status.apply_status_updates(db, {u.task_id: u.status for u in payload.updates})
+    db.commit()
+    count = len(result["tasks"])
+    return {"message": f"{count} task{'s' if count != 1 else ''} updated", **result}
+
+
 @router.post("/api/tasks/{task_id}/update-status", response_class=JSONResponse, tags=["Tasks API"])
-async def update_task_status(
+def update_task_status(
     task_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     status: str = Form(...)
 ):
-    task = db.query(models.Task).filter(models.Task.id == task_id).options(joinedload(models.Task.job_card)).first()
-    if not task:
+    result = task_status.apply_status_updates(db, {task_id: status})
+    if not result["tasks"]:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    task.status = status
     db.commit()
 
-    job_card = task.job_card
-    pending_or_processing_tasks_count = db.query(models.Task).filter(
-        models.Task.job_card_id == job_card.id,
-        models.Task.status != 'Done'
-    ).count()
-
-    job_card_status_changed = False
-    if pending_or_processing_tasks_count == 0:
-        if job_card.status != 'Done':
-            job_card.status = 'Done'
-            job_card_status_changed = True
-    else:
-        if job_card.status == 'Done':
-            job_card.status = 'Pending'
-            job_card_status_changed = True
-
-    if job_card_status_changed:
-        db.commit()
-        db.refresh(job_card)
-
+    job_card_id = result["tasks"][task_id]["job_card_id"]
     return {
         "message": f"Task {task_id} status updated to {status}",
-        "job_card_id": job_card.id,
-        "job_card_status": job_card.status if job_card_status_changed else None
+        "job_card_id": job_card_id,
+        "job_card_status": result["job_cards"].get(job_card_id)
     }
 
 @router.get("/api/generate-job-card-no", tags=["Job Cards API"])
@@ -169,9 +228,9 @@ def get_job_cards_by_project(project_id: int, db: Session = Depends(deps.get_db)
     return job_cards
 
 
-@router.get("/api/all-done", tags=["Job Cards"])
+@router.get("/api/all-done", tags=["Job Cards"], dependencies=[Depends(deps.json_etag("job_cards", "projects"))])
 def get_all_done_job_cards(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None
@@ -195,4 +254,73 @@ def get_all_done_job_cards(
     total_count = query.count()
     job_cards = query.order_by(models.JobCard.id.desc()).offset(skip).limit(limit).all()
     
-    return {"total_count": total_count, "job_cards": job_cards}
\ No newline at end of file
+    return {"total_count": total_count, "job_cards": job_cards}
+
+
+# --- Job card tracking (the /job-card-tracking page) ---
+
+TRACKING_PAGE_SIZE = 25
+
+
+@router.get("/api/tracking", tags=["Job Cards API"])
+def get_tracking_job_cards(
+    project_id: Optional[int] = None,
+    site_location: Optional[str] = None,
+    assignee_id: Optional[int] = Query(None, description="Site engineer, supervisor or foreman"),
+    limit: int = Query(TRACKING_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(deps.get_read_db),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """
+    One page of the active job cards the user may see, newest first, with a
+    task count but not the tasks themselves (see get_tracking_tasks). Pages
+    are keyset-paginated on the job card id, so a page costs the same however
+    deep into the list it is.
+    """
+    task_count = select(func.count(models.Task.id)).where(
+        models.Task.job_card_id == models.JobCard.id
+    ).correlate(models.JobCard).scalar_subquery()
+    query = db.query(
+        models.JobCard.id, models.JobCard.job_card_no, models.JobCard.status, models.JobCard.site_location,
+        models.JobCard.date_issued, models.Project.name.label("project_name"), task_count.label("task_count")
+    ).join(models.Project, models.Project.id == models.JobCard.project_id).filter(
+        models.JobCard.status.in_(models.ACTIVE_JOB_CARD_STATUSES),
+        permissions.job_card_scope(access)
+    )
+    if project_id:
+        query = query.filter(models.JobCard.project_id == project_id)
+    if site_location:
+        query = query.filter(models.JobCard.site_location == site_location)
+    if assignee_id:
+        query = query.filter(or_(
+            models.JobCard.site_engineer_user_id == assignee_id,
+            models.JobCard.supervisor_user_id == assignee_id,
+            models.JobCard.foreman_user_id == assignee_id
+        ))
+    if cursor is not None:
+        query = query.filter(models.JobCard.id < cursor)
+    rows = query.order_by(models.JobCard.id.desc()).limit(limit + 1).all()
+
+    job_cards = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = job_cards[-1]["id"] if len(rows) > limit else None
+    return {"job_cards": job_cards, "next_cursor": next_cursor}
+
+
+@router.get("/api/tracking/{job_card_id}/tasks", tags=["Job Cards API"])
+def get_tracking_tasks(
+    job_card_id: int,
+    db: Session = Depends(deps.get_read_db),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """The tasks of one job card, fetched when its card is expanded on the tracking page."""
+    visible = db.query(models.JobCard.id).filter(
+        models.JobCard.id == job_card_id, permissions.job_card_scope(access)
+    ).first()
+    if not visible:
+        raise HTTPException(status_code=404, detail="Job card not found")
+
+    tasks = db.query(models.Task.id, models.Task.task_details, models.Task.status).filter(
+        models.Task.job_card_id == job_card_id
+    ).order_by(models.Task.id).all()
+    return {"tasks": [dict(task._mapping) for task in tasks]}
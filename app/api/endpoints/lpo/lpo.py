@@ -9,21 +9,20 @@ from typing import List, Optional
 from datetime import date
 import io
 from sqlalchemy import or_
-from weasyprint import HTML, CSS
-from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from app.services.slack import send_slack_notification # 2. Import the slack service
 from app.core.config import settings # 3. Import settings for the BASE_URL
+from app.core import metrics, permissions
+from app.core.templating import templates as pdf_templates
 
 from app.api import deps
 from app import models
 from app.core.config import settings
-from azure.storage.blob import BlobServiceClient
+from app.services import approval_workflow, pdf
 from app.utils import generate_sas_url, image_to_data_uri
 
 
 router = APIRouter()
-pdf_templates = Jinja2Templates(directory="templates")
 
 def get_next_lpo_number(db: Session):
     last_lpo = db.query(models.LPO.lpo_number).order_by(models.LPO.id.desc()).first()
@@ -178,22 +177,26 @@ def update_lpo(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
-@router.post("/attachments", response_class=JSONResponse, tags=["LPO"])
+@router.post("/attachments", response_class=JSONResponse, tags=["LPO"], dependencies=[Depends(deps.concurrency_limit("uploads"))])
 async def upload_lpo_attachment(file: UploadFile = File(...), db: Session = Depends(deps.get_db)):
     """Uploads an attachment to Azure Blob and creates a temporary record."""
+    from azure.storage.blob import BlobServiceClient  # Azure SDK is imported on first upload
+
     blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
     container_name = "lpo-attachments"
     try:
         container_client = blob_service_client.get_container_client(container_name)
-        if not container_client.exists():
-            container_client.create_container()
+        with metrics.track_external("azure"):
+            if not container_client.exists():
+                container_client.create_container()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Storage error: {e}")
 
     file_contents = await file.read()
     blob_name = f"{uuid.uuid4()}-{file.filename}"
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-    blob_client.upload_blob(file_contents, overwrite=True)
+    with metrics.track_external("azure"):
+        blob_client.upload_blob(file_contents, overwrite=True)
 
     new_attachment = models.LPOAttachment(blob_url=blob_client.url, file_name=file.filename)
     db.add(new_attachment)
@@ -204,9 +207,9 @@ async def upload_lpo_attachment(file: UploadFile = File(...), db: Session = Depe
 
 
 
-@router.get("/", tags=["LPO"])
+@router.get("/", tags=["LPO"], dependencies=[Depends(deps.json_etag("lpos", "suppliers", "projects", "users", "material_requisitions"))])
 def get_lpos(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None
@@ -244,11 +247,17 @@ def get_lpos(
     return {"total_count": total_count, "lpos": lpos}
     
 
-def _check_finance_role(current_user: models.User):
-    """Helper to check if the current user has the Finance role."""
-    user_roles = {role.name for role in current_user.roles}
-    if "Finance" not in user_roles:
-        raise HTTPException(status_code=403, detail="Not authorized for this action.")
+def _decide_lpo(db: Session, lpo_id: int, decision: str, current_user: models.User):
+    """Finance approval or rejection of one LPO through the approval workflow (403/404/400)."""
+    user_roles = permissions.resolve(db, current_user).roles
+    result = approval_workflow.transition(db, "finance", [lpo_id], decision, current_user, user_roles)
+    if result.skipped:
+        reason = result.skipped[0]["reason"]
+        if reason == "not found":
+            raise HTTPException(status_code=404, detail="LPO not found")
+        raise HTTPException(status_code=400, detail=f"LPO is {reason}.")
+    db.commit()
+    return result
 
 @router.post("/{lpo_id}/approve", tags=["LPO"])
 def approve_lpo(
@@ -258,15 +267,10 @@ def approve_lpo(
     current_user: models.User = Depends(deps.get_current_user)
     
 ):
-    _check_finance_role(current_user)
-    lpo = db.query(models.LPO).filter(models.LPO.id == lpo_id).first()
-    if not lpo:
-        raise HTTPException(status_code=404, detail="LPO not found")
-    lpo.status = "Approved"
-    db.commit()
-    message_slack = f"🎉 LPO Approved: {lpo.lpo_number} is now fully approved and ready for further processing."
+    result = _decide_lpo(db, lpo_id, "Approved", current_user)
+    message_slack = approval_workflow.digest_message(result, current_user, settings.BASE_URL)
     background_tasks.add_task(send_slack_notification, message=message_slack)
-    return {"message": f"{lpo.lpo_number} has been approved."}
+    return {"message": f"{result.applied[0]['number']} has been approved."}
 
 @router.post("/{lpo_id}/reject", tags=["LPO"])
 def reject_lpo(
@@ -275,18 +279,13 @@ def reject_lpo(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_user)
 ):
-    _check_finance_role(current_user)
-    lpo = db.query(models.LPO).filter(models.LPO.id == lpo_id).first()
-    if not lpo:
-        raise HTTPException(status_code=404, detail="LPO not found")
-    lpo.status = "Rejected"
-    db.commit()
-    message_slack = f"🎉 LPO Rejected: {lpo.lpo_number} is has been rejected by finance."
+    result = _decide_lpo(db, lpo_id, "Rejected", current_user)
+    message_slack = approval_workflow.digest_message(result, current_user, settings.BASE_URL)
     background_tasks.add_task(send_slack_notification, message=message_slack)
-    return {"message": f"{lpo.lpo_number} has been rejected."}
+    return {"message": f"{result.applied[0]['number']} has been rejected."}
 
-@router.get("/{lpo_id}/pdf", tags=["LPO"], response_class=StreamingResponse)
-def generate_lpo_pdf(lpo_id: int, db: Session = Depends(deps.get_db)):
+@router.get("/{lpo_id}/pdf", tags=["LPO"], response_class=StreamingResponse, dependencies=[Depends(deps.concurrency_limit("pdf"))])
+def generate_lpo_pdf(lpo_id: int, db: Session = Depends(deps.get_read_db)):
     """Generates and returns a PDF for a given LPO."""
     lpo = db.query(models.LPO).options(
         joinedload(models.LPO.supplier),
@@ -303,19 +302,22 @@ def generate_lpo_pdf(lpo_id: int, db: Session = Depends(deps.get_db)):
     # Note: We use a separate template designed specifically for the PDF layout
     html_string = pdf_templates.get_template("lpo/lpo_pdf.html").render({"lpo": lpo, "logo_data_uri": logo_data_uri})
 
-    # Use WeasyPrint to convert the HTML to a PDF in memory
-    pdf_bytes = HTML(string=html_string).write_pdf()
+    filename = f"{lpo.lpo_number}.pdf"
+    db.rollback()  # Release the DB connection while the PDF renders
+
+    # Use WeasyPrint (in the PDF worker pool) to convert the HTML to a PDF in memory
+    pdf_bytes = pdf.render(html_string)
 
     # Create headers to prompt a download
     headers = {
-        'Content-Disposition': f'inline; filename="{lpo.lpo_number}.pdf"'
+        'Content-Disposition': f'inline; filename="{filename}"'
     }
 
     return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
 
 
 @router.get("/{lpo_id}", tags=["LPO"])
-def get_lpo_details(lpo_id: int, db: Session = Depends(deps.get_db)):
+def get_lpo_details(lpo_id: int, db: Session = Depends(deps.get_read_db)):
     """Fetches all details for a single LPO."""
     lpo = db.query(models.LPO).options(
         joinedload(models.LPO.supplier),
@@ -333,7 +335,7 @@ def get_lpo_details(lpo_id: int, db: Session = Depends(deps.get_db)):
 
 
 @router.get("/{lpo_id}/for-invoice", tags=["LPO"])
-def get_lpo_data_for_invoice(lpo_id: int, db: Session = Depends(deps.get_db)):
+def get_lpo_data_for_invoice(lpo_id: int, db: Session = Depends(deps.get_read_db)):
     """Fetches LPO data specifically to pre-fill a new invoice."""
     lpo = db.query(models.LPO).options(
         joinedload(models.LPO.supplier),
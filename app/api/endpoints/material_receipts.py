@@ -6,9 +6,10 @@ from typing import List, Optional
 import uuid
 
 from app.api import deps
+from app.auth import tokens
 from app import models
 from app.core.config import settings
-from azure.storage.blob import BlobServiceClient
+from app.core import metrics
 from app.utils import generate_sas_url
 
 router = APIRouter()
@@ -49,22 +50,26 @@ def get_mr_details(req_id: int, db: Session = Depends(deps.get_db)):
         ]
     }
 
-@router.post("/upload-image", response_class=JSONResponse, tags=["Material Receipts"])
+@router.post("/upload-image", response_class=JSONResponse, tags=["Material Receipts"], dependencies=[Depends(deps.concurrency_limit("uploads"))])
 async def upload_receipt_image(file: UploadFile = File(...), db: Session = Depends(deps.get_db)):
     """Uploads an image to Azure Blob and creates a temporary record."""
+    from azure.storage.blob import BlobServiceClient  # Azure SDK is imported on first upload
+
     blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
     container_name = "material-receipts"
     try:
         container_client = blob_service_client.get_container_client(container_name)
-        if not container_client.exists():
-            container_client.create_container()
+        with metrics.track_external("azure"):
+            if not container_client.exists():
+                container_client.create_container()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Storage error: {e}")
 
     file_contents = await file.read()
     blob_name = f"{uuid.uuid4()}-{file.filename}"
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-    blob_client.upload_blob(file_contents, overwrite=True)
+    with metrics.track_external("azure"):
+        blob_client.upload_blob(file_contents, overwrite=True)
 
     new_image = models.MaterialReceiptImage(blob_url=blob_client.url, file_name=file.filename)
     db.add(new_image)
@@ -78,7 +83,7 @@ async def upload_receipt_image(file: UploadFile = File(...), db: Session = Depen
 @router.post("/", response_class=JSONResponse, tags=["Material Receipts"])
 async def create_material_receipt(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     requisition_id: int = Form(...),
     delivery_status: str = Form(...),
     notes: Optional[str] = Form(None),
@@ -92,7 +97,7 @@ async def create_material_receipt(
         delivery_status=delivery_status,
         notes=notes,
         acknowledged_by_receiver=acknowledged,
-        received_by_id=current_user.id
+        received_by_id=principal.user_id
     )
     db.add(new_receipt)
     db.flush() # Flush to get the new_receipt.id
@@ -6,6 +6,7 @@ from typing import List, Optional
 from datetime import date
 
 from app.api import deps
+from app.auth import tokens
 from app import models, schemas
 
 router = APIRouter()
@@ -15,7 +16,7 @@ router = APIRouter()
 @router.post("/", response_class=JSONResponse, tags=["Nanny Log"])
 async def create_nanny_log(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     # General
     log_date: date = Form(...),
     nanny_id: int = Form(...),
@@ -65,7 +66,7 @@ async def create_nanny_log(
         # --------------------------------------------------------------
 
         new_log = models.NannyLog(
-            created_by_id=current_user.id,
+            created_by_id=principal.user_id,
             log_date=log_date,
             nanny_id=nanny_id,
             handwashing_checks=",".join(handwashing_checks) if handwashing_checks else None,
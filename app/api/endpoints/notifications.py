@@ -6,6 +6,7 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.auth import tokens
 from app import models
 
 router = APIRouter()
@@ -39,12 +40,13 @@ async def notification_generator(request: Request, db: Session, current_user: mo
             yield f"data: {json.dumps({'count': unread_count, 'notifications': recent_notifications_data})}\n\n"
             last_count = unread_count
 
+        db.rollback()  # End the read transaction so the connection goes back to the pool while we sleep
         await asyncio.sleep(5)
 
 @router.get("/stream", tags=["Notifications"])
 async def stream_notifications(
     request: Request,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: models.User = Depends(deps.get_current_user_from_cookie)
 ):
     """
@@ -58,11 +60,11 @@ async def stream_notifications(
 @router.post("/mark-as-read", tags=["Notifications"])
 def mark_notifications_as_read(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal)
 ):
     """Marks all of a user's notifications as read."""
     db.query(models.Notification).filter(
-        models.Notification.user_id == current_user.id,
+        models.Notification.user_id == principal.user_id,
         models.Notification.is_read == False
     ).update({"is_read": True})
     db.commit()
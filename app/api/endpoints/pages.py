@@ -1,8 +1,7 @@
 # app/api/endpoints/pages.py
 from fastapi import APIRouter, Depends, Request , Form # <--- MAKE SURE 'Request' IS IMPORTED
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm import Session, joinedload
 from app.api.endpoints.lpo.lpo import get_next_lpo_number
 from app.design_v3_models import Vendor
 from app import invoice_models
@@ -10,11 +9,14 @@ import yaml
 from pathlib import Path
 import os
 #from sqlalchemy import or_
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_
 import httpx
 from app.api import deps
 from app import models
 from app import design_models
+from app.core import cache, metrics, permissions
+from app.core.templating import templates
+from app.services import inbox
 from app.design_models import DesignTaskStatus
 from app.utils import generate_job_card_number
 from fastapi.responses import HTMLResponse, JSONResponse
@@ -24,7 +26,6 @@ from datetime import datetime, timezone, timedelta
 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 # --- Safe Configuration Loading ---
 def _load_config() -> dict:
@@ -38,10 +39,17 @@ def _load_config() -> dict:
 app_config = _load_config()
 # --- End Config Loading ---
 
+# --- Page cache dependencies: tables each cached page reads ---
+DASHBOARD_TABLES = ("job_cards", "projects", "design_tasks", "design_scores")
+# The tracking page is a shell; its job cards come from /job-cards/api/tracking.
+# It renders project names and active users' names (the assignee filter);
+# logins do not bump users (cache.UNTRACKED_WRITE).
+JOB_CARD_TRACKING_TABLES = ("projects", "users")
+
 # --- Protected Page Routes (Using the new dependency) ---
 
 @router.get("/", response_class=HTMLResponse, tags=["Pages"])
-async def dashboard(context: dict = Depends(deps.get_template_context),db: Session = Depends(deps.get_db)):
+async def dashboard(request: Request, context: dict = Depends(deps.get_template_context),db: Session = Depends(deps.get_db)):
     if isinstance(context, RedirectResponse):
         return context
     
@@ -49,51 +57,47 @@ async def dashboard(context: dict = Depends(deps.get_template_context),db: Sessi
     # --- NEW LOGIC TO FETCH PENDING JOB CARDS ---
     current_user = context["user"]
     user_roles = context["user_roles"]
+
+    page_key = cache.PageKey(db, "dashboard.html", context, DASHBOARD_TABLES)
+    cached = cache.cached_page(request, page_key)
+    if cached is not None:
+        return cached
     
     # Define roles that need to see their pending job cards
     field_roles = {'Supervisor/Site Officer', 'Foreman/Duty Officer'}
     
     # Check if the user has one of the field roles
     if any(role in user_roles for role in field_roles):
-        # Query for job cards that are 'Pending' and assigned to this user
-        pending_job_cards = db.query(models.JobCard).filter(
-            models.JobCard.status == 'Pending',
-            or_(
-                models.JobCard.supervisor_user_id == current_user.id,
-                models.JobCard.foreman_user_id == current_user.id
-            )
-        ).options(
-            joinedload(models.JobCard.project) # Load project info efficiently
-        ).order_by(models.JobCard.date_issued.desc()).all()
-        
-        # Add the list to the context
-        context["pending_job_cards"] = pending_job_cards
+        # Pending job cards assigned to this user, from their (cached) inbox
+        my_inbox = inbox.get_inbox(db, current_user, set(user_roles))
+        context["pending_job_cards"] = my_inbox["sources"]["job_cards"]["items"]
+        context["pending_job_cards_count"] = my_inbox["counts"]["job_cards"]
     # ----------------------------------------------
      # --- NEW: DESIGN TEAM MEMBER PERFORMANCE STATS LOGIC ---
     design_team_roles = {'Design Team Member', 'Technical Engineer', 'Document Controller'}
     if any(role in user_roles for role in design_team_roles):
-        # Find all completed tasks with scores for this user
-        scored_tasks = db.query(design_models.DesignTask).join(
-            design_models.DesignScore
+        # Aggregate this user's scored, completed tasks in the database
+        total_tasks, on_time_tasks, avg_score = db.query(
+            func.count(design_models.DesignScore.id),
+            func.count(design_models.DesignScore.id).filter(design_models.DesignScore.lateness_days == 0),
+            func.avg(design_models.DesignScore.score)
+        ).join(
+            design_models.DesignTask, design_models.DesignTask.id == design_models.DesignScore.task_id
         ).filter(
             design_models.DesignTask.owner_id == current_user.id,
             design_models.DesignTask.status.in_([
                 DesignTaskStatus.SUBMITTED, DesignTaskStatus.VERIFIED, DesignTaskStatus.DONE
             ])
-        ).all()
+        ).one()
 
-        if scored_tasks:
-            total_tasks = len(scored_tasks)
-            on_time_tasks = sum(1 for task in scored_tasks if task.score.lateness_days == 0)
-            total_score = sum(task.score.score for task in scored_tasks)
-            
+        if total_tasks:
             context["on_time_rate"] = round((on_time_tasks / total_tasks) * 100)
-            context["avg_score"] = round(total_score / total_tasks)
+            context["avg_score"] = round(avg_score)
         else:
             context["on_time_rate"] = 100
             context["avg_score"] = 100
     # ----------------------------------------------------
-    return templates.TemplateResponse("dashboard.html", context)
+    return cache.render_page(templates, page_key, context)
 
 
 @router.get("/job-card-form", response_class=HTMLResponse, tags=["Pages"])
@@ -137,17 +141,10 @@ async def read_duty_officer_form(
     # Base query for Job Cards
     job_cards_query = db.query(models.JobCard).options(joinedload(models.JobCard.project))
 
-    # Check if the user is privileged (can see everything)
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    is_privileged = bool(privileged_roles.intersection(context["user_roles"]))
-
-    # If the user is NOT privileged, filter the job cards query
-    if not is_privileged:
-        current_user_id = context["user"].id
-        job_cards_query = job_cards_query.filter(
-            # A foreman should only see job cards they are assigned to
-            models.JobCard.foreman_user_id == current_user_id
-        )
+    # Privileged users see everything; a foreman only the job cards they are assigned to
+    job_cards_query = job_cards_query.filter(
+        permissions.job_card_scope(context["access"], models.JobCard.foreman_user_id)
+    )
     
     # Execute the final query
     job_cards = job_cards_query.order_by(models.JobCard.id.desc()).all()
@@ -179,16 +176,10 @@ async def read_site_officer_form(
     # --- V3 DATA FILTERING LOGIC ---
     job_cards_query = db.query(models.JobCard).options(joinedload(models.JobCard.project))
 
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    is_privileged = bool(privileged_roles.intersection(context["user_roles"]))
-
-    # If the user is NOT privileged, filter the job cards to only show their own
-    if not is_privileged:
-        current_user_id = context["user"].id
-        job_cards_query = job_cards_query.filter(
-            # A supervisor should only see job cards they are assigned to
-            models.JobCard.supervisor_user_id == current_user_id
-        )
+    # Privileged users see everything; a supervisor only the job cards they are assigned to
+    job_cards_query = job_cards_query.filter(
+        permissions.job_card_scope(context["access"], models.JobCard.supervisor_user_id)
+    )
     
     job_cards = job_cards_query.order_by(models.JobCard.id.desc()).all()
 
@@ -214,44 +205,35 @@ async def read_site_officer_form(
 
 @router.get("/job-card-tracking", response_class=HTMLResponse, tags=["Pages"])
 async def job_card_tracking(
+    request: Request,
     context: dict = Depends(deps.get_template_context),
     db: Session = Depends(deps.get_db)
 ):
     if isinstance(context, RedirectResponse):
         return context
-    
-    # Base query
-    
-    query = db.query(models.JobCard).filter(
-        models.JobCard.status.in_(['Pending', 'Processing'])
-    ).options(
-        joinedload(models.JobCard.project), 
-        selectinload(models.JobCard.tasks)
-    )
 
-    # Check if the user is privileged (can see everything)
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    is_privileged = bool(privileged_roles.intersection(context["user_roles"]))
-
-    # If the user is NOT privileged, filter the query
-    if not is_privileged:
-        current_user_id = context["user"].id
-        query = query.filter(
-            or_(
-                models.JobCard.site_engineer_user_id == current_user_id,
-                models.JobCard.supervisor_user_id == current_user_id,
-                models.JobCard.foreman_user_id == current_user_id
-            )
-        )
-    
-    job_cards = query.order_by(models.JobCard.id.desc()).all()
-    
+    page_key = cache.PageKey(db, "job_card_tracking.html", context, JOB_CARD_TRACKING_TABLES)
+    cached = cache.cached_page(request, page_key)
+    if cached is not None:
+        return cached
+
+    # Only the filter choices are rendered here; the cards are fetched a page at a time
+    # and a card's tasks only when it is expanded, so the page costs the same however
+    # many job cards are active.
+    assignees = []
+    if context["is_privileged"]:
+        assignees = db.query(models.User.id, models.User.name).filter(
+            models.User.is_active == True
+        ).order_by(models.User.name).all()
+
     context.update({
         "page_title": "Pending Job Cards", # Renamed for clarity
-        "job_cards": job_cards,
+        "projects": db.query(models.Project.id, models.Project.name).order_by(models.Project.name).all(),
+        "site_locations": app_config.get('site_locations', []),
+        "assignees": assignees,
         "task_statuses": app_config.get('task_statuses', [])
     })
-    return templates.TemplateResponse("job_card_tracking.html", context)
+    return cache.render_page(templates, page_key, context)
 
 
 @router.get("/material-requisition-form", response_class=HTMLResponse, tags=["Pages"])
@@ -371,7 +353,8 @@ async def submit_requisition(
 
     try:
         async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(n8n_url, json=data)
+            with metrics.track_external("n8n"):
+                response = await client.post(n8n_url, json=data)
             response.raise_for_status()
         return JSONResponse({"message": "Form submitted successfully!"})
     except Exception as e:
@@ -405,14 +388,29 @@ async def receive_mr_form(
     return templates.TemplateResponse("receive_mr.html", context)
 
 
+def _report_filter_choices(db: Session, context: dict) -> dict:
+    """Project and author choices for the report list filters; authors only matter to users who see everyone's reports."""
+    authors = []
+    if context["access"].has(permissions.Permission.VIEW_ALL_SITE_REPORTS):
+        authors = db.query(models.User.id, models.User.name).filter(
+            models.User.is_active == True
+        ).order_by(models.User.name).all()
+    return {
+        "projects": db.query(models.Project.id, models.Project.name).order_by(models.Project.name).all(),
+        "authors": authors,
+    }
+
+
 @router.get("/duty-officer-reports", response_class=HTMLResponse, tags=["Pages"])
 async def duty_officer_reports_list_page(
-    context: dict = Depends(deps.get_template_context)
+    context: dict = Depends(deps.get_template_context),
+    db: Session = Depends(deps.get_read_db)
 ):
     if isinstance(context, RedirectResponse):
         return context
     
     context["page_title"] = "View Progress Reports"
+    context.update(_report_filter_choices(db, context))
     return templates.TemplateResponse("duty_officer_progress_list.html", context)
 
 
@@ -431,12 +429,14 @@ async def duty_officer_report_detail_page(
 
 @router.get("/site-officer-reports", response_class=HTMLResponse, tags=["Pages"])
 async def site_officer_reports_list_page(
-    context: dict = Depends(deps.get_template_context)
+    context: dict = Depends(deps.get_template_context),
+    db: Session = Depends(deps.get_read_db)
 ):
     if isinstance(context, RedirectResponse):
         return context
     
     context["page_title"] = "View Daily Reports"
+    context.update(_report_filter_choices(db, context))
     return templates.TemplateResponse("site_officer_report_list.html", context)
 
 
@@ -1,7 +1,6 @@
 # app/api/endpoints/procurement.py
-from fastapi import APIRouter, Depends, Form, HTTPException
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import Optional
@@ -13,10 +12,13 @@ from typing import List
 from sqlalchemy import or_
 
 from app.api import deps
+from app.auth import tokens
 from app import models
+from app.core import cache, permissions
+from app.core.permissions import Permission
+from app.core.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 # --- Safe Configuration Loading (making this file self-sufficient) ---
 def _load_config() -> dict:
@@ -30,17 +32,26 @@ def _load_config() -> dict:
 app_config = _load_config()
 # --- End Config Loading ---
 
+# Tables the cached requisition list pages read (see app/core/cache.py)
+REQUISITION_LIST_TABLES = ("material_requisitions", "projects", "users")
+
 
 # --- Page-Rendering GET Routes (Refactored) ---
 
 @router.get("/material-requisitions", response_class=HTMLResponse, tags=["Procurement"])
 async def list_material_requisitions(
+    request: Request,
     context: dict = Depends(deps.get_template_context),
     db: Session = Depends(deps.get_db)
 ):
     if isinstance(context, RedirectResponse):
         return context
 
+    page_key = cache.PageKey(db, "procurement_list.html", context, REQUISITION_LIST_TABLES)
+    cached = cache.cached_page(request, page_key)
+    if cached is not None:
+        return cached
+
     # --- V3 DATA FILTERING LOGIC ---
     # Start with a base query
     query = db.query(models.MaterialRequisition).filter(
@@ -50,18 +61,10 @@ async def list_material_requisitions(
         joinedload(models.MaterialRequisition.requested_by)
     )
 
-    # Define roles that can see ALL requisitions
-    privileged_roles = {
-        'Super Admin', 'Admin', 'Operation Mananger', 
-        'Project Manager', 'Procurement', 'QS'
-    }
-    is_privileged = bool(privileged_roles.intersection(context["user_roles"]))
-
-    # If the user is NOT privileged, apply a filter
-    if not is_privileged:
-        # This will apply to roles like 'Supervisor/Site Officer'
-        current_user_id = context["user"].id
-        query = query.filter(models.MaterialRequisition.requested_by_id == current_user_id)
+    # Roles like 'Supervisor/Site Officer' only see the requisitions they requested
+    query = query.filter(permissions.owned_scope(
+        context["access"], Permission.VIEW_ALL_REQUISITIONS, models.MaterialRequisition.requested_by_id
+    ))
     
     # Execute the final query
     requisitions = query.order_by(models.MaterialRequisition.request_date.desc()).all()
@@ -71,11 +74,12 @@ async def list_material_requisitions(
         "page_title": "Procurement Dashboard",
         "requisitions": requisitions
     })
-    return templates.TemplateResponse("procurement_list.html", context)
+    return cache.render_page(templates, page_key, context)
 
 
 @router.get("/material-requisitions-delivered", response_class=HTMLResponse, tags=["Procurement"])
 async def list_material_requisitions_delivered(
+    request: Request,
     context: dict = Depends(deps.get_template_context),
     db: Session = Depends(deps.get_db),
     search: Optional[str] = None
@@ -83,6 +87,13 @@ async def list_material_requisitions_delivered(
     if isinstance(context, RedirectResponse):
         return context
 
+    page_key = cache.PageKey(
+        db, "procurement_list_delivered.html", context, REQUISITION_LIST_TABLES, variant=search or ""
+    )
+    cached = cache.cached_page(request, page_key)
+    if cached is not None:
+        return cached
+
     # --- V3 DATA FILTERING LOGIC ---
     # Start with a base query
     query = db.query(models.MaterialRequisition).filter(
@@ -104,18 +115,10 @@ async def list_material_requisitions_delivered(
         )
     # --------------------------------
 
-    # Define roles that can see ALL requisitions
-    privileged_roles = {
-        'Super Admin', 'Admin', 'Operation Mananger', 
-        'Project Manager', 'Procurement', 'QS'
-    }
-    is_privileged = bool(privileged_roles.intersection(context["user_roles"]))
-
-    # If the user is NOT privileged, apply a filter
-    if not is_privileged:
-        # This will apply to roles like 'Supervisor/Site Officer'
-        current_user_id = context["user"].id
-        query = query.filter(models.MaterialRequisition.requested_by_id == current_user_id)
+    # Roles like 'Supervisor/Site Officer' only see the requisitions they requested
+    query = query.filter(permissions.owned_scope(
+        context["access"], Permission.VIEW_ALL_REQUISITIONS, models.MaterialRequisition.requested_by_id
+    ))
 
     
     
@@ -127,7 +130,7 @@ async def list_material_requisitions_delivered(
         "page_title": "Procurement Dashboard",
         "requisitions": requisitions
     })
-    return templates.TemplateResponse("procurement_list_delivered.html", context)
+    return cache.render_page(templates, page_key, context)
 
 
 # @router.get("/material-requisition/{req_id}", response_class=HTMLResponse, tags=["Procurement"])
@@ -222,9 +225,8 @@ async def create_material_requisition(
         new_mr_number = f"MR-{next_mr_num:06d}"
 
         # --- NEW: Auto-approval logic for PM ---
-        user_roles = {role.name for role in current_user.roles}
         pm_status = "Pending" # Default status
-        if "Project Manager" in user_roles:
+        if "Project Manager" in permissions.resolve(db, current_user).roles:
             pm_status = "Approved"
         # ------------------------------------
         # --- NEW: Logic to handle Draft vs. Final Submission ---
@@ -300,7 +302,7 @@ async def create_material_requisition(
 async def update_material_requisition(
     req_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     supplier_id: int = Form(...),
     status: str = Form(...),
     lpo_number: Optional[str] = Form(None),
@@ -333,7 +335,7 @@ async def update_material_requisition(
 async def finalize_material_requisition(
     req_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     material_ids: List[int] = Form(...),
     quantities: List[float] = Form(...)
 ):
@@ -359,12 +361,18 @@ async def finalize_material_requisition(
 
 @router.get("/material-requisitions-drafts", response_class=HTMLResponse, tags=["Procurement"])
 async def list_draft_requisitions(
+    request: Request,
     context: dict = Depends(deps.get_template_context),
     db: Session = Depends(deps.get_db)
 ):
     if isinstance(context, RedirectResponse):
         return context
 
+    page_key = cache.PageKey(db, "procurement_list_drafts.html", context, REQUISITION_LIST_TABLES)
+    cached = cache.cached_page(request, page_key)
+    if cached is not None:
+        return cached
+
     # Query for requisitions with the "Draft" status
     draft_requisitions = db.query(models.MaterialRequisition).filter(
         models.MaterialRequisition.status == 'Draft'
@@ -377,4 +385,4 @@ async def list_draft_requisitions(
         "page_title": "Draft Material Requisitions",
         "requisitions": draft_requisitions
     })
-    return templates.TemplateResponse("procurement_list_drafts.html", context)
\ No newline at end of file
+    return cache.render_page(templates, page_key, context)
\ No newline at end of file
@@ -0,0 +1,45 @@
+# app/api/endpoints/progress_analytics.py
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core import permissions
+from app.core.permissions import Permission
+from app.services import progress_analytics
+
+router = APIRouter()
+
+DEFAULT_RANGE_DAYS = 90
+
+
+@router.get("/trend", tags=["Progress Analytics"], dependencies=[Depends(deps.json_etag("task_progress_daily", "tasks"))])
+def get_progress_trend(
+    project_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    task_id: Optional[List[int]] = Query(None, description="Limit the chart to these tasks"),
+    db: Session = Depends(deps.get_read_db),
+    access: permissions.Access = Depends(deps.get_access)
+):
+    """
+    Burn-up data for a project: quantity done per day/week/month, per task and
+    in total, as columnar arrays aligned with `buckets`. Defaults to the last
+    90 days.
+    """
+    access.require(Permission.VIEW_PROJECT_PROGRESS, "Not authorized to view project progress")
+
+    end = end or date.today()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end.")
+    if progress_analytics.bucket_count(start, end, bucket) > progress_analytics.MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many {bucket} buckets in range (max {progress_analytics.MAX_BUCKETS}); use a coarser bucket."
+        )
+
+    return progress_analytics.trend(db, project_id, start, end, bucket, task_id)
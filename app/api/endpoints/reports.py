@@ -7,14 +7,16 @@ from datetime import date
 from sqlalchemy.orm import Session, joinedload
 
 from app.api import deps
+from app.auth import tokens
 from app import models
+from app.services import site_summary
 
 router = APIRouter()
 
 @router.post("/duty-officer-progress/", response_class=JSONResponse, tags=["Reports"])
 async def create_duty_officer_progress(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user), # Captures who is submitting
+    principal: tokens.Principal = Depends(deps.get_principal), # Captures who is submitting
     toolbox_video_id: Optional[str] = Form(None),
     site_image_ids: Optional[str] = Form(None),
     job_card_id: int = Form(...),
@@ -46,7 +48,7 @@ async def create_duty_officer_progress(
     try:
         progress_report = models.DutyOfficerProgress(
             # --- V3 FIELD UPDATES ---
-            created_by_id=current_user.id,
+            created_by_id=principal.user_id,
             foreman_user_id=foreman_user_id,
             sm_foreman_signature_id=1, # Placeholder for old required field
             # --------------------------
@@ -66,6 +68,7 @@ async def create_duty_officer_progress(
         )
         db.add(progress_report)
         db.flush()
+        site_summary.record_duty_officer_report(db, progress_report)
 
         video_id = int(toolbox_video_id) if toolbox_video_id and toolbox_video_id.isdigit() else None
         if video_id:
@@ -89,7 +92,7 @@ async def create_duty_officer_progress(
 @router.post("/site-officer-reports/", response_class=JSONResponse, tags=["Reports"])
 async def create_site_officer_report(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user), # Captures who is submitting
+    principal: tokens.Principal = Depends(deps.get_principal), # Captures who is submitting
     toolbox_video_id: Optional[str] = Form(None),
     site_image_ids: Optional[str] = Form(None),
     date: date = Form(...),
@@ -126,7 +129,7 @@ async def create_site_officer_report(
         # -------------------------------------------
         report = models.SiteOfficerReport(
             # --- V3 FIELD UPDATES ---
-            created_by_id=current_user.id,
+            created_by_id=principal.user_id,
             site_officer_user_id=site_officer_id_int,
             duty_officer_user_id=duty_officer_id_int,
             site_officer_id=1, # Placeholder for old required field
@@ -161,6 +164,7 @@ async def create_site_officer_report(
         # --------------------------------------------
         db.add(report)
         db.flush()
+        site_summary.record_site_officer_report(db, report)
 
         video_id = int(toolbox_video_id) if toolbox_video_id and toolbox_video_id.isdigit() else None
         if video_id:
@@ -5,7 +5,9 @@ from sqlalchemy.orm import Session, joinedload
 from app.utils import generate_sas_url
 from pydantic import BaseModel
 from app.api import deps
+from app.auth import tokens
 from app import models
+from app.core import permissions
 from typing import List, Optional
 
 router = APIRouter()
@@ -20,7 +22,7 @@ def update_requisition_details(
     req_id: int,
     update_data: RequisitionUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
     Partially updates a Material Requisition with role-based permissions.
@@ -29,7 +31,7 @@ def update_requisition_details(
     if not req:
         raise HTTPException(status_code=404, detail="Requisition not found")
 
-    user_roles = {role.name for role in current_user.roles}
+    user_roles = access.roles
     updated = False
 
     # Only a PM can update the technical spec
@@ -52,7 +54,7 @@ def update_requisition_details(
 def get_requisition_details(
     req_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal)
 ):
     """
     Fetches all details for a single Material Requisition, including related objects.
@@ -85,14 +87,14 @@ def add_comment(
     req_id: int,
     comment_text: str = Form(...),
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal)
 ):
     """
     Adds a new comment to a Material Requisition.
     """
     new_comment = models.MaterialRequisitionComment(
         requisition_id=req_id,
-        comment_by_id=current_user.id,
+        comment_by_id=principal.user_id,
         comment_text=comment_text
     )
     db.add(new_comment)
@@ -105,7 +107,7 @@ def add_comment(
         "comment_text": new_comment.comment_text,
         "created_at": new_comment.created_at.isoformat(),
         "comment_by": {
-            "name": current_user.name
+            "name": principal.name
         }
     }
     return JSONResponse(status_code=201, content=comment_data)
\ No newline at end of file
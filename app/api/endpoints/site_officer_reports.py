@@ -1,45 +1,108 @@
 # app/api/endpoints/site_officer_reports.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import or_, select, tuple_
 from sqlalchemy.orm import Session, joinedload,selectinload
 
 from app.api import deps
 from app import models
-from app.utils import generate_sas_url
+from app.core import permissions
+from app.core.permissions import Permission
+from app.utils import date_cursor, generate_sas_url, parse_date_cursor
 
 router = APIRouter()
 
+REPORT_PAGE_SIZE = 25
+
+
+def _linked_job_card(*criteria):
+    """EXISTS: the report is linked to a job card matching `criteria`."""
+    link = models.report_jc_association_table
+    return select(link.c.report_id).join(models.JobCard, models.JobCard.id == link.c.job_card_id).where(
+        link.c.report_id == models.SiteOfficerReport.id, *criteria
+    ).exists()
+
+
 @router.get("/", tags=["Site Officer Reports"])
 def get_all_site_officer_reports(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    project_id: Optional[int] = None,
+    job_card_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    search: Optional[str] = Query(None, description="Site location, job card no., author or the report's notes"),
+    limit: int = Query(REPORT_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(deps.get_read_db),
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
-    Fetches a list of Site Officer reports.
+    One page of Site Officer reports, newest first, as summary rows without
+    the report's free-text sections; the full report is at /{report_id}.
     - Privileged users see all reports.
     - Non-privileged users (e.g., Supervisors) see only reports they created.
     """
-    query = db.query(models.SiteOfficerReport).options(
-        selectinload(models.SiteOfficerReport.job_cards).joinedload(models.JobCard.project),
-        joinedload(models.SiteOfficerReport.created_by)
-    )
+    report = models.SiteOfficerReport
+    query = db.query(
+        report.id, report.date, report.site_location, report.sa_overall_site_health,
+        report.created_by_id, models.User.name.label("created_by_name"), report.created_at
+    ).outerjoin(models.User, models.User.id == report.created_by_id)
 
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    user_roles = {role.name for role in current_user.roles}
-    is_privileged = bool(privileged_roles.intersection(user_roles))
+    # Privileged users see every report, everyone else only their own
+    query = query.filter(permissions.owned_scope(access, Permission.VIEW_ALL_SITE_REPORTS, report.created_by_id))
 
-    if not is_privileged:
-        query = query.filter(models.SiteOfficerReport.created_by_id == current_user.id)
+    if from_date:
+        query = query.filter(report.date >= from_date)
+    if to_date:
+        query = query.filter(report.date <= to_date)
+    if project_id:
+        query = query.filter(_linked_job_card(models.JobCard.project_id == project_id))
+    if job_card_id:
+        query = query.filter(_linked_job_card(models.JobCard.id == job_card_id))
+    if author_id:
+        query = query.filter(report.created_by_id == author_id)
+    if search:
+        search_term = f"%{search}%"
+        query = query.filter(or_(
+            report.site_location.ilike(search_term),
+            models.User.name.ilike(search_term),
+            report.dependency_notes.ilike(search_term),
+            report.sm_other_notes.ilike(search_term),
+            report.sa_immediate_actions.ilike(search_term),
+            report.sa_critical_actions.ilike(search_term),
+            _linked_job_card(models.JobCard.job_card_no.ilike(search_term))
+        ))
+    if cursor:
+        try:
+            after = parse_date_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        query = query.filter(tuple_(report.date, report.id) < after)
+    rows = query.order_by(report.date.desc(), report.id.desc()).limit(limit + 1).all()
 
-    reports = query.order_by(models.SiteOfficerReport.date.desc()).all()
-    return reports
+    reports = [dict(row._mapping, job_cards=[]) for row in rows[:limit]]
+    if reports:
+        # The page's job cards in one query rather than one per report
+        link = models.report_jc_association_table
+        by_id = {r["id"]: r for r in reports}
+        linked = db.query(
+            link.c.report_id, models.JobCard.id, models.JobCard.job_card_no, models.Project.name.label("project_name")
+        ).join(models.JobCard, models.JobCard.id == link.c.job_card_id).join(
+            models.Project, models.Project.id == models.JobCard.project_id
+        ).filter(link.c.report_id.in_(by_id)).order_by(models.JobCard.id).all()
+        for report_id, jc_id, job_card_no, project_name in linked:
+            by_id[report_id]["job_cards"].append({"id": jc_id, "job_card_no": job_card_no, "project_name": project_name})
 
-    
+    next_cursor = date_cursor(reports[-1]["date"], reports[-1]["id"]) if len(rows) > limit else None
+    return {"reports": reports, "next_cursor": next_cursor}
 
 @router.get("/{report_id}", tags=["Site Officer Reports"])
 def get_site_officer_report_details(
     report_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    access: permissions.Access = Depends(deps.get_access)
 ):
     """
     Fetches all details for a single Site Officer report.
@@ -59,11 +122,7 @@ def get_site_officer_report_details(
         raise HTTPException(status_code=404, detail="Report not found")
 
     # Security check (is unchanged)
-    privileged_roles = {'Super Admin', 'Admin', 'Operation Mananger', 'Project Manager'}
-    user_roles = {role.name for role in current_user.roles}
-    is_privileged = bool(privileged_roles.intersection(user_roles))
-    
-    if not is_privileged and report.created_by_id != current_user.id:
+    if not access.has(Permission.VIEW_ALL_SITE_REPORTS) and report.created_by_id != access.user_id:
         raise HTTPException(status_code=403, detail="You do not have permission to view this report")
 
     # Generate SAS URLs for media files (is unchanged)
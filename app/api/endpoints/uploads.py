@@ -1,14 +1,16 @@
 # app/api/endpoints/uploads.py
-from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile, File
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from azure.storage.blob import BlobServiceClient
 import uuid
 from typing import List
 
 from app.api import deps
+from app.auth import tokens
 from app import models
 from app.core.config import settings
+from app.core import metrics
+from app.services import jobs
 from app.services.video_processing import process_video_and_update_db
 
 router = APIRouter()
@@ -17,17 +19,20 @@ router = APIRouter()
 async def upload_images(
     files: List[UploadFile] = File(...),
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    principal: tokens.Principal = Depends(deps.get_principal)
 ):
     if not settings.AZURE_STORAGE_CONNECTION_STRING:
         raise HTTPException(status_code=500, detail="Azure Storage not configured on the server.")
 
+    from azure.storage.blob import BlobServiceClient  # Azure SDK is imported on first upload
+
     blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
     container_name = "site-images"
     try:
         container_client = blob_service_client.get_container_client(container_name)
-        if not container_client.exists():
-            container_client.create_container()
+        with metrics.track_external("azure"):
+            if not container_client.exists():
+                container_client.create_container()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not access storage container: {e}")
 
@@ -38,7 +43,8 @@ async def upload_images(
             safe_filename = "".join(c for c in file.filename if c.isalnum() or c in ('.', '_')).rstrip()
             blob_name = f"{uuid.uuid4()}-{safe_filename}"
             blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-            blob_client.upload_blob(file_contents, overwrite=True)
+            with metrics.track_external("azure"):
+                blob_client.upload_blob(file_contents, overwrite=True)
 
             new_image = models.SiteImage(blob_url=blob_client.url, file_name=file.filename)
             db.add(new_image)
@@ -53,9 +59,8 @@ async def upload_images(
 
 @router.post("/api/videos/upload", response_class=JSONResponse, tags=["Uploads"])
 async def upload_video(
-    background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user),
+    principal: tokens.Principal = Depends(deps.get_principal),
     video: UploadFile = File(...)
 ):
     if not settings.AZURE_STORAGE_CONNECTION_STRING or not settings.OPENAI_API_KEY:
@@ -67,11 +72,17 @@ async def upload_video(
     db.commit()
     db.refresh(new_video_record)
 
-    background_tasks.add_task(
-        process_video_and_update_db,
-        new_video_record.id,
-        file_contents,
-        settings.AZURE_STORAGE_CONNECTION_STRING,
-        settings.OPENAI_API_KEY
-    )
+    # Runs on the job pool rather than as a BackgroundTask, which would tie up a request thread for minutes.
+    try:
+        jobs.job_pool.submit(
+            process_video_and_update_db,
+            new_video_record.id,
+            file_contents,
+            settings.AZURE_STORAGE_CONNECTION_STRING,
+            settings.OPENAI_API_KEY
+        )
+    except HTTPException:
+        db.delete(new_video_record)  # Busy: don't leave a video that will never be processed
+        db.commit()
+        raise
     return {"message": "Video upload started. Processing in the background.", "video_id": new_video_record.id}
\ No newline at end of file
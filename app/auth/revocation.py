@@ -0,0 +1,124 @@
+# app/auth/revocation.py
+"""
+Revoked sessions, checked on every authenticated request without a query.
+
+Access tokens are short-lived (ACCESS_TOKEN_TTL_MINUTES), so a session only
+needs to stay on the revoked list until the last access token issued for it
+has expired. Each worker process keeps the list in a Bloom filter, rebuilt
+from revoked_sessions every REVOCATION_REFRESH_SECONDS. A miss - the answer
+for nearly every request - is definite; a hit is confirmed against the table,
+so a false positive costs one indexed lookup rather than a spurious 401.
+
+revoke() adds the jti to this worker's filter straight away; other workers
+pick it up on their next reload. Deactivating a user (is_active set to False,
+from the app or the admin panel) revokes their current session the same way,
+so they lose access within seconds rather than when their token expires.
+"""
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+
+from typing import Union
+
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.core.database import engine
+
+BLOOM_ERROR_RATE = 0.001
+BLOOM_MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._bloom = BloomFilter(BLOOM_MIN_CAPACITY)
+        self._loaded_at = None
+        self._reload_lock = threading.Lock()
+
+    def _reload(self):
+        with engine.connect() as conn:
+            jtis = conn.execute(
+                select(models.RevokedSession.jti).where(models.RevokedSession.expires_at > _now())
+            ).scalars().all()
+        bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * len(jtis)))
+        for jti in jtis:
+            bloom.add(str(jti))
+        self._bloom = bloom
+        self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        # One thread reloads; the others keep answering from the current filter
+        # (the first load is waited for, there is nothing to answer from yet).
+        if self._reload_lock.acquire(blocking=self._loaded_at is None):
+            try:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                    self._reload()
+            finally:
+                self._reload_lock.release()
+
+    def is_revoked(self, jti: str) -> bool:
+        self._ensure_fresh()
+        if jti not in self._bloom:
+            return False
+        with engine.connect() as conn:
+            return conn.execute(
+                select(models.RevokedSession.jti).where(
+                    models.RevokedSession.jti == uuid.UUID(jti), models.RevokedSession.expires_at > _now()
+                )
+            ).first() is not None
+
+    def revoke(self, db: Union[Session, Connection], jti, user_id: int = None):
+        """Records `jti` as revoked in the caller's transaction (the caller commits)."""
+        now = _now()
+        db.execute(delete(models.RevokedSession).where(models.RevokedSession.expires_at <= now))
+        db.execute(
+            insert(models.RevokedSession).values(
+                jti=uuid.UUID(str(jti)), user_id=user_id,
+                expires_at=now + timedelta(minutes=settings.ACCESS_TOKEN_TTL_MINUTES),
+            ).on_conflict_do_nothing()
+        )
+        self._bloom.add(str(jti))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+revoked = RevocationList(settings.REVOCATION_REFRESH_SECONDS)
+
+
+@event.listens_for(models.User, "before_update")
+def _revoke_on_deactivation(mapper, connection, user):
+    # A mapper event, so it also fires for the admin panel's own sessions.
+    if inspect(user).attrs.is_active.history.has_changes() and not user.is_active:
+        revoked.revoke(connection, user.session_id, user.id)
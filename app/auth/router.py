@@ -1,81 +1,161 @@
 # app/auth/router.py
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 import uuid
-from user_agents import parse
 
 from app import models, schemas
 from app.api import deps
-from app.auth import security
+from app.auth import security, throttle, tokens
+from app.auth.revocation import revoked
+from app.core import cache, permissions
 from app.core.config import settings
+from app.services import auth_log
 
 router = APIRouter()
 
+class RefreshRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+def _find_user(db: Session, email: str):
+    """(id, email, name, hashed_password, session_id, is_active) or None. Ends the transaction so no connection is held during bcrypt."""
+    user = db.query(
+        models.User.id, models.User.email, models.User.name, models.User.hashed_password, models.User.session_id,
+        models.User.is_active,
+    ).filter(models.User.email == email).first()
+    db.rollback()
+    return user
+
+
+def _start_session(db: Session, user) -> dict:
+    session_id = uuid.uuid4() # Generate a new session ID, invalidating old ones
+    db.execute(
+        update(models.User).where(models.User.id == user.id).values(session_id=session_id),
+        execution_options=cache.UNTRACKED_WRITE,
+    )
+    if user.session_id:
+        revoked.revoke(db, user.session_id, user.id)  # Its access tokens stop working right away
+    roles = permissions.load(db, user.id).roles
+    db.commit()
+    return {
+        "access_token": tokens.issue_access_token(user.id, user.email, user.name, roles, session_id),
+        "refresh_token": tokens.issue_refresh_token(user.id, user.email, session_id),
+        "token_type": "bearer",
+    }
+
+
+def _end_session(db: Session, user_id: int, session_id: str):
+    db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.session_id == uuid.UUID(session_id))
+        .values(session_id=uuid.uuid4()),  # Outstanding refresh tokens no longer match
+        execution_options=cache.UNTRACKED_WRITE,
+    )
+    revoked.revoke(db, session_id, user_id)
+    db.commit()
+
+
+def _is_https(request: Request) -> bool:
+    return request.url.scheme == "https"
+
+
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     request: Request,
+    response: Response,
     db: Session = Depends(deps.get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     Standard OAuth2 password flow. Takes a username (email) and password.
-    Returns an access token.
+    Returns a short-lived access token and a refresh token (also set as an
+    httpOnly cookie); see app/auth/tokens.py.
+
+    Throttled clients are turned away before the user lookup and bcrypt; the
+    lookup and session write run in the threadpool and bcrypt on its own pool,
+    so logins never block the event loop. Auth events are logged through the
+    buffered app.services.auth_log writer.
     """
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    # --- ADD THIS LOGGING LOGIC ---
-    # --- PARSE THE USER AGENT ---
-    user_agent_string = request.headers.get('user-agent', '')
-    user_agent = parse(user_agent_string)
-    
-    # Determine device type
-    if user_agent.is_mobile:
-        device_type = "Mobile"
-    elif user_agent.is_tablet:
-        device_type = "Tablet"
-    elif user_agent.is_pc:
-        device_type = "PC/Laptop"
-    else:
-        device_type = "Other"
-    # -----------------------------
-    log_entry = models.AuthLog(
-        ip_address=request.client.host,
-        user_agent=request.headers.get('user-agent'),
-        # --- SAVE THE PARSED DATA ---
-        browser=f"{user_agent.browser.family} {user_agent.browser.version_string}",
-        os=f"{user_agent.os.family} {user_agent.os.version_string}",
-        device=f"{device_type} ({user_agent.device.family})"
-        # -----------------------------
-    )
+    ip_address = request.client.host
+    user_agent = request.headers.get('user-agent')
+
+    wait = throttle.retry_after(ip_address, form_data.username)
+    if wait:
+        auth_log.record(f"Login Throttled: {form_data.username}", ip_address, user_agent)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Please try again later.",
+            headers={"Retry-After": str(wait)},
+        )
 
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
-        log_entry.event_type = f"Login Failure: {form_data.username}"
-        db.add(log_entry)
-        db.commit()
+    user = await run_in_threadpool(_find_user, db, form_data.username)
+    # Inactive accounts get the same answer as a wrong password, and only after
+    # bcrypt, so the response does not reveal that the account exists.
+    if (
+        not user
+        or not await security.verify_password_async(form_data.password, user.hashed_password)
+        or not user.is_active
+    ):
+        throttle.record_failure(ip_address, form_data.username)
+        auth_log.record(f"Login Failure: {form_data.username}", ip_address, user_agent)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    log_entry.user_id = user.id
-    log_entry.event_type = "Login Success"
-    db.add(log_entry)
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    # access_token = security.create_access_token(
-    #     data={"sub": user.email}, expires_delta=access_token_expires
-    # )
-    # db.commit()
-    # return {"access_token": access_token, "token_type": "bearer"}
-
-    if user:
-        user.session_id = uuid.uuid4() # Generate a new session ID, invalidating old ones
-        # ... add the log entry ...
-        access_token = security.create_access_token(
-            data={"sub": user.email, "jti": str(user.session_id)}, # Add session ID to token
-            expires_delta=access_token_expires
+    throttle.record_success(ip_address, form_data.username)
+    token = await run_in_threadpool(_start_session, db, user)
+    auth_log.record("Login Success", ip_address, user_agent, user_id=user.id)
+    response.set_cookie(
+        tokens.REFRESH_COOKIE, token["refresh_token"], max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        httponly=True, samesite="lax", secure=_is_https(request),
+    )
+    return token
+
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(
+    request: Request,
+    response: Response,
+    body: Optional[RefreshRequest] = Body(None),
+    db: Session = Depends(deps.get_db)
+):
+    """
+    Trades a refresh token (JSON body or the refresh_token cookie) for a new
+    access token. Fails with 401 once the user has logged out, logged in
+    elsewhere or been deactivated.
+    """
+    refresh_token = (body.refresh_token if body else None) or request.cookies.get(tokens.REFRESH_COOKIE)
+    access_token = tokens.refresh(db, refresh_token)
+    if access_token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has ended, please log in again.",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        db.commit()
-        return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    response.headers.append("set-cookie", tokens.access_cookie(access_token, secure=_is_https(request)))
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(request: Request, db: Session = Depends(deps.get_db)):
+    """Ends the caller's session: its access and refresh tokens stop working and the cookies are cleared."""
+    authorization = request.headers.get("authorization", "")
+    candidates = (
+        authorization[7:] if authorization.lower().startswith("bearer ") else None,
+        request.cookies.get(tokens.ACCESS_COOKIE),
+        request.cookies.get(tokens.REFRESH_COOKIE),
+    )
+    session = next(filter(None, map(tokens.session_of, candidates)), None)
+    if session:
+        _end_session(db, *session)
+
+    response = Response(status_code=status.HTTP_204_NO_CONTENT)
+    response.delete_cookie(tokens.ACCESS_COOKIE)
+    response.delete_cookie(tokens.REFRESH_COOKIE, httponly=True, samesite="lax")
+    return response
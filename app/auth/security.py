@@ -1,6 +1,9 @@
 # app/auth/security.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import HTTPException
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -9,9 +12,26 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
 
+# bcrypt is deliberately slow CPU work; run it on a small dedicated pool so a burst
+# of logins can neither block the event loop nor take over the shared threadpool.
+_hash_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_pending = 0
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool. Sheds load with 503 when too many are already queued."""
+    global _hash_pending
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Too many sign-in attempts in progress, please retry.", headers={"Retry-After": "1"})
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_pool, verify_password, plain_password, hashed_password)
+    finally:
+        _hash_pending -= 1
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -0,0 +1,120 @@
+# app/auth/throttle.py
+"""
+Login throttling, checked before any database lookup or password hashing.
+
+Failed logins are counted in a sliding window per client IP and per account
+(the submitted email) from that IP. Once either passes its limit, further
+attempts are rejected with 429 until the oldest failure leaves the window.
+The per-IP limit is deliberately much higher than the per-account one: a
+whole site crew logging in at shift change shares one IP, while password
+guessing shows up as many failures for one account or from one address.
+
+Failures for an account from any IP only slow it down: past
+LOGIN_ACCOUNT_BACKOFF_AFTER of them, each attempt waits a delay that doubles
+with every further failure (up to LOGIN_ACCOUNT_MAX_DELAY_SECONDS) after the
+latest one. Someone who only knows an email address can therefore not lock
+its owner out, only make them wait a little.
+
+State is kept per worker process and bounded to THROTTLE_MAX_KEYS keys
+(least recently used are dropped), so the effective limits scale with the
+number of workers.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from app.core.config import settings
+
+THROTTLE_MAX_KEYS = 10000
+
+
+class SlidingWindow:
+    """Failure timestamps per key within the last `window` seconds."""
+
+    def __init__(self, limit: int, window: float, max_keys: int = THROTTLE_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits: OrderedDict[str, deque] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key: str, now: float) -> Optional[deque]:
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+            return None
+        return hits
+
+    def retry_after(self, key: str) -> float:
+        """Seconds until `key` may try again, or 0 if it is under the limit."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None or len(hits) < self.limit:
+                return 0.0
+            return hits[-self.limit] + self.window - now
+
+    def backoff(self, key: str, max_delay: float) -> float:
+        """
+        Seconds until `key` may try again when, past `limit` failures in the
+        window, the wait after the latest failure doubles with each one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None or len(hits) < self.limit:
+                return 0.0
+            delay = min(max_delay, 2.0 ** (len(hits) - self.limit))
+            return max(0.0, hits[-1] + delay - now)
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now) or deque()
+            hits.append(now)
+            self._hits[key] = hits
+            self._hits.move_to_end(key)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+_by_ip = SlidingWindow(settings.LOGIN_MAX_FAILURES_PER_IP, settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+_by_account_ip = SlidingWindow(settings.LOGIN_MAX_FAILURES_PER_ACCOUNT, settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+_by_account = SlidingWindow(settings.LOGIN_ACCOUNT_BACKOFF_AFTER, settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+
+
+def _account_key(username: str) -> str:
+    return username.strip().lower()
+
+
+def retry_after(ip: str, username: str) -> int:
+    """Whole seconds the client must wait before another attempt (0 = allowed)."""
+    account = _account_key(username)
+    wait = max(
+        _by_ip.retry_after(ip),
+        _by_account_ip.retry_after(f"{account}|{ip}"),
+        _by_account.backoff(account, settings.LOGIN_ACCOUNT_MAX_DELAY_SECONDS),
+    )
+    return int(wait) + 1 if wait > 0 else 0
+
+
+def record_failure(ip: str, username: str):
+    account = _account_key(username)
+    _by_ip.hit(ip)
+    _by_account_ip.hit(f"{account}|{ip}")
+    _by_account.hit(account)
+
+
+def record_success(ip: str, username: str):
+    account = _account_key(username)
+    _by_account_ip.reset(f"{account}|{ip}")
+    _by_account.reset(account)
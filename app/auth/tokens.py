@@ -0,0 +1,132 @@
+# app/auth/tokens.py
+"""
+Access and refresh tokens.
+
+A login creates a session (users.session_id) and issues two JWTs carrying it
+as `jti`:
+
+- an access token, valid for ACCESS_TOKEN_TTL_MINUTES, with the user's id,
+  name and role names as claims. authenticate() trusts these claims, so an
+  authenticated request needs no user or role lookup - only the in-memory
+  revocation check (app/auth/revocation.py).
+- a refresh token, valid for ACCESS_TOKEN_EXPIRE_MINUTES, kept in an
+  httpOnly cookie. refresh() trades it for a new access token after checking
+  the user is still active and the session is still their current one, and
+  re-reads their roles, so role changes and deactivations apply within one
+  access token lifetime.
+
+Browsers are refreshed transparently by SessionRefreshMiddleware
+(app/core/middleware.py); API clients call POST /auth/refresh.
+"""
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional
+
+from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+
+from app import models
+from app.auth.revocation import revoked
+from app.auth.security import ALGORITHM, create_access_token
+from app.core import permissions
+from app.core.config import settings
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+ACCESS_COOKIE = "access_token"
+REFRESH_COOKIE = "refresh_token"
+
+# Browsers get a new access token once less than this is left on the old one.
+REFRESH_MARGIN_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    email: str
+    name: Optional[str]
+    roles: frozenset
+    session_id: str
+
+
+def issue_access_token(user_id: int, email: str, name: Optional[str], roles, session_id) -> str:
+    return create_access_token(
+        data={
+            "sub": email, "uid": user_id, "name": name, "roles": sorted(roles),
+            "jti": str(session_id), "typ": ACCESS,
+        },
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_TTL_MINUTES),
+    )
+
+
+def issue_refresh_token(user_id: int, email: str, session_id) -> str:
+    return create_access_token(
+        data={"sub": email, "uid": user_id, "jti": str(session_id), "typ": REFRESH},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _signed_claims(token: str) -> Optional[dict]:
+    """Signature-checked claims (expiry is checked by the caller, so this can be cached)."""
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+        uuid.UUID(claims["jti"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+    if not isinstance(claims.get("uid"), int) or not isinstance(claims.get("exp"), int):
+        return None
+    return claims
+
+
+def _claims(token: Optional[str], token_type: str, margin: float = 0) -> Optional[dict]:
+    claims = _signed_claims(token) if token else None
+    if claims is None or claims.get("typ") != token_type or claims["exp"] <= time.time() + margin:
+        return None
+    return claims
+
+
+def authenticate(token: Optional[str]) -> Optional[Principal]:
+    """The principal for a valid, unexpired, unrevoked access token, else None."""
+    claims = _claims(token, ACCESS)
+    if claims is None or revoked.is_revoked(claims["jti"]):
+        return None
+    return Principal(
+        user_id=claims["uid"], email=claims["sub"], name=claims.get("name"),
+        roles=frozenset(claims.get("roles") or ()), session_id=claims["jti"],
+    )
+
+
+def needs_refresh(access_token: Optional[str]) -> bool:
+    """True if a browser's access token is missing, invalid or about to expire."""
+    return _claims(access_token, ACCESS, margin=REFRESH_MARGIN_SECONDS) is None
+
+
+def session_of(token: Optional[str]) -> Optional[tuple]:
+    """(user_id, session_id) of any token we signed, expired or not."""
+    claims = _signed_claims(token) if token else None
+    return (claims["uid"], claims["jti"]) if claims else None
+
+
+def refresh(db: Session, refresh_token: Optional[str]) -> Optional[str]:
+    """A new access token for a valid refresh token whose session is still current, else None."""
+    claims = _claims(refresh_token, REFRESH)
+    if claims is None:
+        return None
+    user = db.query(models.User.id, models.User.email, models.User.name, models.User.is_active).filter(
+        models.User.id == claims["uid"], models.User.session_id == uuid.UUID(claims["jti"])
+    ).first()
+    if user is None or not user.is_active:
+        return None
+    access = permissions.load(db, user.id)
+    return issue_access_token(user.id, user.email, user.name, access.roles, claims["jti"])
+
+
+def access_cookie(token: str, secure: bool) -> str:
+    """Set-Cookie value for the access token; readable by page scripts, which send it as a Bearer header."""
+    cookie = f"{ACCESS_COOKIE}={token}; Max-Age={settings.ACCESS_TOKEN_TTL_MINUTES * 60}; Path=/; SameSite=Lax"
+    return cookie + "; Secure" if secure else cookie
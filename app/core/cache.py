@@ -0,0 +1,293 @@
+# app/core/cache.py
+"""
+Versioned page and fragment cache for the heavy server-rendered pages.
+
+Every committed write to a table bumps a per-table version stamp in
+`cache_versions` (done automatically by the session hooks below, in a short
+transaction of its own right after the commit). Cache keys combine the
+template, a user scope and the stamps of the tables the page reads, so once
+its data changed a cached entry simply stops being looked up. The same stamps give JSON list endpoints their ETags. Each worker keeps the stamps in memory and re-reads them at
+most every CACHE_VERSION_REFRESH_SECONDS, which is how a page served with a
+matching ETag avoids running any page queries.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from markupsafe import Markup
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models import CacheVersion
+
+# Writes to these tables never affect rendered pages.
+UNTRACKED_TABLES = {"cache_versions", "auth_logs", "approval_audit_log", "revoked_sessions"}
+
+logger = logging.getLogger("app.cache")
+
+# Execution options for bulk writes to columns no page or cached value reads,
+# e.g. login / logout rotating users.session_id; such writes bump nothing.
+UNTRACKED_WRITE = {"cache_untracked": True}
+
+
+# --- Data version stamps ---
+
+class DataVersions:
+    """In-process copy of `cache_versions`, refreshed lazily."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._versions: dict[str, int] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self, db: Session):
+        rows = db.execute(select(CacheVersion.table_name, CacheVersion.version)).all()
+        with self._lock:
+            for table_name, version in rows:
+                if version > self._versions.get(table_name, -1):
+                    self._versions[table_name] = version
+            self._loaded_at = time.monotonic()
+
+    def stamp(self, db: Session, tables: Iterable[str]) -> str:
+        """Returns a short string that changes whenever any of `tables` is written."""
+        if db.info.get("replica"):
+            # The replica may lag the stamps this worker holds; use its own so
+            # an ETag never labels data the replica has not caught up with yet.
+            tables = sorted(tables)
+            rows = db.execute(
+                select(CacheVersion.table_name, CacheVersion.version).where(CacheVersion.table_name.in_(tables))
+            ).all()
+            versions = dict(rows)
+            return ",".join(f"{t}:{versions.get(t, 0)}" for t in tables)
+        if time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self._refresh(db)
+        return ",".join(f"{t}:{self._versions.get(t, 0)}" for t in sorted(tables))
+
+    def apply(self, bumped: dict[str, int]):
+        """Records versions this worker just committed (read-your-writes)."""
+        with self._lock:
+            for table_name, version in bumped.items():
+                if version > self._versions.get(table_name, -1):
+                    self._versions[table_name] = version
+
+
+data_versions = DataVersions(settings.CACHE_VERSION_REFRESH_SECONDS)
+
+
+def bump_versions(db: Session, *tables: str):
+    """
+    Marks `tables` as written by the current transaction. Their version stamps
+    are bumped once it commits, in a separate short transaction, so writers do
+    not hold the shared cache_versions rows for the length of their own
+    transaction. ORM flushes and bulk update/delete statements are handled
+    automatically; call this only after raw SQL writes.
+    """
+    tables = set(tables) - UNTRACKED_TABLES
+    if tables:
+        db.info.setdefault("cache_touched", set()).update(tables)
+
+
+def _bump_committed(tables: Iterable[str]) -> dict[str, int]:
+    # One statement in sorted order, so concurrent bumps lock rows in the same
+    # order and cannot deadlock.
+    stmt = insert(CacheVersion).values([{"table_name": t, "version": 1} for t in sorted(tables)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CacheVersion.table_name],
+        set_={"version": CacheVersion.version + 1, "updated_at": func.now()},
+    ).returning(CacheVersion.table_name, CacheVersion.version)
+    with engine.begin() as conn:
+        return {name: version for name, version in conn.execute(stmt)}
+
+
+def _secondary_tables(session: Session, obj) -> set:
+    """Association tables the flush wrote because one of obj's many-to-many collections changed."""
+    state = inspect(obj)
+    return {
+        rel.secondary.name
+        for rel in state.mapper.relationships
+        if rel.secondary is not None and (obj in session.deleted or state.attrs[rel.key].history.has_changes())
+    }
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _bump_after_flush(session: Session, flush_context):
+    tables = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not hasattr(obj, "__table__"):
+            continue
+        if obj in session.new or obj in session.deleted or session.is_modified(obj):
+            tables.add(obj.__table__.name)
+        tables |= _secondary_tables(session, obj)
+    if tables:
+        bump_versions(session, *tables)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _bump_on_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get("cache_untracked"):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and getattr(table, "name", None):
+        bump_versions(orm_execute_state.session, table.name)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_versions(session: Session):
+    touched = session.info.pop("cache_touched", None)
+    if not touched:
+        return
+    try:
+        bumped = _bump_committed(touched)
+    except Exception:
+        # The data is committed; pages keyed on these tables stay stale until
+        # their next write rather than failing the request that wrote.
+        logger.exception("Could not bump cache versions for %s", ", ".join(sorted(touched)))
+        return
+    data_versions.apply(bumped)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_versions(session: Session):
+    session.info.pop("cache_touched", None)
+
+
+# --- Rendered page / fragment store ---
+
+class _RenderedStore:
+    """Small thread-safe LRU of rendered HTML (or computed data), keyed by the full cache key."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+_store = _RenderedStore(settings.PAGE_CACHE_MAX_ENTRIES)
+_data_store = _RenderedStore(settings.PAGE_CACHE_MAX_ENTRIES)
+
+
+def user_scope(user_id: int, is_privileged: bool) -> str:
+    """Privileged users all see the same data, everyone else gets their own slot."""
+    return "privileged" if is_privileged else f"user:{user_id}"
+
+
+def _make_key(template_name: str, scope: str, stamp: str) -> str:
+    return hashlib.sha1(f"{template_name}|{scope}|{stamp}".encode()).hexdigest()
+
+
+class PageKey:
+    """Cache key for a full page. Build it *before* running the page queries."""
+
+    def __init__(self, db: Session, template_name: str, context: dict, tables: Iterable[str], variant: str = ""):
+        self.template_name = template_name
+        # base.html renders the user's name and role-based navigation, so pages are always
+        # user-scoped and the shell inputs are part of the key.
+        user = context["user"]
+        shell = f"user:{user.id}:{user.name}:{','.join(sorted(context['user_roles']))}"
+        # `variant` distinguishes query-string variations of the same page (e.g. a search term).
+        self.key = _make_key(f"{template_name}?{variant}", shell, data_versions.stamp(db, tables))
+        self.etag = f'W/"{self.key[:20]}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {c.strip() for c in header.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def _cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+
+
+def cached_page(request: Request, page_key: PageKey) -> Optional[Response]:
+    """Returns a 304 or a cached 200 for `page_key`, or None if the page must be rendered."""
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    if _etag_matches(request, page_key.etag):
+        return Response(status_code=304, headers=_cache_headers(page_key.etag))
+    body = _store.get(page_key.key)
+    if body is not None:
+        return HTMLResponse(body, headers=_cache_headers(page_key.etag))
+    return None
+
+
+def render_page(templates, page_key: PageKey, context: dict) -> HTMLResponse:
+    """Renders the page, stores it under `page_key` and attaches the ETag."""
+    body = templates.get_template(page_key.template_name).render(context)
+    if settings.PAGE_CACHE_ENABLED:
+        _store.set(page_key.key, body)
+    return HTMLResponse(body, headers=_cache_headers(page_key.etag))
+
+
+def json_etag(request: Request, db: Session, tables: Iterable[str]) -> str:
+    """Weak ETag for a JSON GET: the URL (path + query) plus the stamps of `tables`."""
+    url = f"{request.url.path}?{request.url.query}"
+    return f'W/"{_make_key(url, "json", data_versions.stamp(db, tables))[:20]}"'
+
+
+def cached_fragment(
+    db: Session,
+    templates,
+    template_name: str,
+    scope: str,
+    tables: Iterable[str],
+    build_context: Callable[[], dict],
+) -> Markup:
+    """
+    Renders a partial template once per (scope, data version) and reuses it.
+    `build_context` runs the queries and is only called on a cache miss.
+    """
+    key = _make_key(template_name, scope, data_versions.stamp(db, tables))
+    body = _store.get(key) if settings.PAGE_CACHE_ENABLED else None
+    if body is None:
+        body = templates.get_template(template_name).render(build_context())
+        if settings.PAGE_CACHE_ENABLED:
+            _store.set(key, body)
+    return Markup(body)
+
+
+def cached_data(
+    db: Session,
+    name: str,
+    scope: str,
+    tables: Iterable[str],
+    build: Callable[[], Any],
+) -> Any:
+    """
+    Like cached_fragment, for computed data (e.g. a user's inbox): `build` runs
+    once per (scope, data version). Callers must not mutate the returned value.
+    """
+    key = _make_key(name, scope, data_versions.stamp(db, tables))
+    value = _data_store.get(key) if settings.PAGE_CACHE_ENABLED else None
+    if value is None:
+        value = build()
+        if settings.PAGE_CACHE_ENABLED:
+            _data_store.set(key, value)
+    return value
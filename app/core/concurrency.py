@@ -0,0 +1,80 @@
+# app/core/concurrency.py
+"""
+Per-route-group concurrency limits.
+
+Sync `def` routes share one threadpool per worker (THREADPOOL_SIZE), so a
+burst on one kind of route - PDFs, report exports, uploads, logins - could
+otherwise take every thread and stall the rest of the app. Routes in such
+a group declare
+
+    dependencies=[Depends(deps.concurrency_limit("pdf"))]
+
+and at most CONCURRENCY_<GROUP> of them run at once per worker. Further
+requests wait on the event loop (not on a thread) for up to
+CONCURRENCY_QUEUE_TIMEOUT_SECONDS, at most CONCURRENCY_MAX_QUEUED of them per
+group; past either bound they get 503 with Retry-After. Rejections and
+queueing time are exported through app.core.metrics.
+"""
+import math
+import time
+
+import anyio
+from fastapi import HTTPException
+
+from app.core import metrics
+from app.core.config import settings
+
+metrics.registry.counter("concurrency_rejections_total", "Requests turned away by a route group limit.", ("group", "reason"))
+metrics.registry.counter("concurrency_queue_seconds_total", "Time requests waited for a route group slot.", ("group",))
+
+
+class Limiter:
+    def __init__(self, group: str, capacity: int, max_queued: int, timeout: float):
+        self.group = group
+        self.capacity = capacity
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self._semaphore = anyio.Semaphore(capacity)
+        self._queued = 0
+
+    def _reject(self, reason: str):
+        metrics.registry.inc("concurrency_rejections_total", (self.group, reason))
+        raise HTTPException(
+            status_code=503,
+            detail="The server is busy, please retry shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(self.timeout)))},
+        )
+
+    async def acquire(self):
+        try:
+            self._semaphore.acquire_nowait()
+            return
+        except anyio.WouldBlock:
+            pass
+        if self._queued >= self.max_queued:
+            self._reject("queue_full")
+        self._queued += 1
+        start = time.perf_counter()
+        try:
+            with anyio.fail_after(self.timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self._reject("timeout")
+        finally:
+            self._queued -= 1
+            metrics.registry.inc("concurrency_queue_seconds_total", (self.group,), time.perf_counter() - start)
+
+    def release(self):
+        self._semaphore.release()
+
+
+def _limiter(group: str, capacity: int) -> Limiter:
+    return Limiter(group, capacity, settings.CONCURRENCY_MAX_QUEUED, settings.CONCURRENCY_QUEUE_TIMEOUT_SECONDS)
+
+
+limiters = {
+    "pdf": _limiter("pdf", settings.CONCURRENCY_PDF),
+    "reports": _limiter("reports", settings.CONCURRENCY_REPORTS),
+    "uploads": _limiter("uploads", settings.CONCURRENCY_UPLOADS),
+    "auth": _limiter("auth", settings.CONCURRENCY_AUTH),
+}
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,11 +7,79 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     AZURE_STORAGE_CONNECTION_STRING: str
     OPENAI_API_KEY:str
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # Default to 30 minutes if not set
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # How long a login lasts (refresh token lifetime)
     SLACK_WEBHOOK_URL: str
     SLACK_DESIGN_WEBHOOK_URL: str
     BASE_URL: str = "http://127.0.0.1:8000/"  # Default base URL
 
+    # Read replica (see app/core/database.py, app/api/deps.py)
+    DATABASE_REPLICA_URL: Optional[str] = None  # Unset: every query goes to DATABASE_URL
+    READ_YOUR_WRITES_SECONDS: float = 10.0  # After a write, a browser reads from the primary this long; keep above replica lag
+
+    # Page / fragment cache (see app/core/cache.py)
+    PAGE_CACHE_ENABLED: bool = True
+    PAGE_CACHE_MAX_ENTRIES: int = 512
+    CACHE_VERSION_REFRESH_SECONDS: float = 2.0  # How stale another worker's writes may look
+
+    # Response compression (see app/core/middleware.py)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Bytes; smaller bodies are sent as-is
+    COMPRESSION_LEVEL: int = 6
+
+    # Request metrics (see app/core/metrics.py)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""  # If set, /metrics requires "Authorization: Bearer <token>"
+    SLOW_QUERY_MS: float = 200.0
+    REQUEST_QUERY_WARN_COUNT: int = 50  # Log requests that run this many SQL statements
+
+    # N+1 detection (see app/core/nplusone.py): "off", "warn" or "raise"
+    N_PLUS_ONE_MODE: str = "off"
+    N_PLUS_ONE_THRESHOLD: int = 5  # Same lazy load repeated more often than this in one request
+
+    # Bulk job card import (see app/services/job_card_import.py)
+    JOB_CARD_IMPORT_MAX_ROWS: int = 20000
+
+    # Login (see app/auth/throttle.py, app/auth/security.py)
+    LOGIN_THROTTLE_WINDOW_SECONDS: float = 900.0
+    LOGIN_MAX_FAILURES_PER_ACCOUNT: int = 5  # For one account from one IP
+    LOGIN_MAX_FAILURES_PER_IP: int = 50  # A whole site crew can share one IP
+    LOGIN_ACCOUNT_BACKOFF_AFTER: int = 10  # Failures for one account from any IP before attempts are delayed
+    LOGIN_ACCOUNT_MAX_DELAY_SECONDS: float = 60.0
+    PASSWORD_HASH_WORKERS: int = 2  # Threads per worker process doing bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Further logins get 503 instead of queueing
+
+    # Sessions (see app/auth/tokens.py, app/auth/revocation.py)
+    ACCESS_TOKEN_TTL_MINUTES: int = 15  # Upper bound on how long a role change or deactivation takes to apply
+    REVOCATION_REFRESH_SECONDS: float = 5.0  # How often each worker reloads the revoked session list
+
+    # Audit sink (see app/services/audit_sink.py)
+    AUDIT_FLUSH_MS: int = 500
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_QUEUE_MAX: int = 10000  # Beyond this, rows go straight to the spool file
+    AUDIT_SPOOL_PATH: str = "audit_spool.jsonl"
+    AUDIT_DEAD_LETTER_PATH: str = "audit_dead_letter.jsonl"  # Spooled rows the database rejected
+
+    # Process model (see gunicorn.conf.py, app/services/jobs.py); sizes are per gunicorn worker
+    THREADPOOL_SIZE: int = 40  # Threads running sync `def` endpoints (anyio's default is 40)
+    PDF_WORKERS: int = 2  # Processes rendering PDFs; 0 renders in the request thread
+    PDF_MAX_TASKS_PER_CHILD: int = 50  # Recycle a PDF process after this many renders
+    PDF_MAX_PENDING: int = 16  # Further PDF requests get 503 instead of queueing
+    PDF_TIMEOUT_SECONDS: float = 60.0
+    JOB_WORKERS: int = 2  # Threads processing uploaded videos
+    JOB_MAX_PENDING: int = 8
+
+    # Concurrency limits per route group, per worker (see app/core/concurrency.py).
+    # Keep their sum for sync routes well under THREADPOOL_SIZE so other routes always get a thread.
+    CONCURRENCY_PDF: int = 4
+    CONCURRENCY_REPORTS: int = 6
+    CONCURRENCY_UPLOADS: int = 6
+    CONCURRENCY_AUTH: int = 8
+    CONCURRENCY_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Longest a request waits for a slot before 503
+    CONCURRENCY_MAX_QUEUED: int = 50  # Waiting requests per group beyond which new ones get 503 at once
+
+    # Permission cache (see app/core/permissions.py)
+    PERMISSION_CACHE_SECONDS: float = 60.0  # Upper bound on how long a role change made in the admin panel takes to apply
+
     class Config:
         env_file = ".env"
 
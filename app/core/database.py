@@ -1,14 +1,37 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
 
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional streaming replica for read-only GET endpoints (see deps.get_read_db).
+# To try it locally, point DATABASE_REPLICA_URL at a second Postgres instance
+# or at a copy of the database (CREATE DATABASE x TEMPLATE y) as a stand-in.
+replica_engine = create_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
+
+# Set on a browser for READ_YOUR_WRITES_SECONDS after it writes, so its next
+# reads go to the primary rather than a replica that may not have the write yet.
+RECENT_WRITE_COOKIE = "recent_write"
+
+
+def read_session() -> Session:
+    """
+    A session on the replica, or on the primary when none is configured. It is
+    still a SessionLocal session, so the cache and N+1 hooks apply; callers
+    must not write through it.
+    """
+    if replica_engine is None:
+        return SessionLocal()
+    db = SessionLocal(bind=replica_engine)
+    db.info["replica"] = True
+    return db
+
+
 # Dependency to get a DB session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
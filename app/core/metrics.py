@@ -0,0 +1,239 @@
+# app/core/metrics.py
+"""
+Per-request performance metrics, exposed in Prometheus text format on /metrics.
+
+A RequestStats object is bound to a context variable for the lifetime of each
+request (see MetricsMiddleware). The SQLAlchemy cursor hooks, the timed Jinja
+template class and `track_external()` add to it, and the middleware folds it
+into the process-wide registry when the request finishes. Metrics are kept per
+worker process; scrape each replica/worker or aggregate downstream.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from jinja2 import Template
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import engine, replica_engine
+
+logger = logging.getLogger("app.metrics")
+slow_query_logger = logging.getLogger("app.slow_query")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+@dataclass
+class RequestStats:
+    scope: dict = field(default_factory=dict, repr=False)
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    template_seconds: float = 0.0
+    external_seconds: dict[str, float] = field(default_factory=dict)
+    external_calls: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def route(self) -> str:
+        """Route template (e.g. /api/lpos/{lpo_id}); set by the router once the request is matched."""
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def bind_stats(stats: RequestStats):
+    return _current.set(stats)
+
+
+def reset_stats(token):
+    _current.reset(token)
+
+
+# --- Registry ---
+
+class _Histogram:
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Registry:
+    """Minimal thread-safe counters and histograms keyed by label tuples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, _Histogram]] = {}
+        self._meta: dict[str, tuple[str, str, tuple]] = {}
+
+    def counter(self, name: str, help_text: str, labels: tuple):
+        self._meta[name] = ("counter", help_text, labels)
+        self._counters[name] = {}
+
+    def histogram(self, name: str, help_text: str, labels: tuple, buckets: Iterable[float]):
+        self._meta[name] = ("histogram", help_text, labels, tuple(buckets))
+        self._histograms[name] = {}
+
+    def inc(self, name: str, label_values: tuple, amount: float = 1.0):
+        with self._lock:
+            series = self._counters[name]
+            series[label_values] = series.get(label_values, 0.0) + amount
+
+    def observe(self, name: str, label_values: tuple, value: float):
+        with self._lock:
+            series = self._histograms[name]
+            if label_values not in series:
+                series[label_values] = _Histogram(self._meta[name][3])
+            series[label_values].observe(value)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, meta in self._meta.items():
+                kind, help_text, labels = meta[:3]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for values, amount in self._counters[name].items():
+                        lines.append(f"{name}{_labels(labels, values)} {amount:g}")
+                    continue
+                for values, hist in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + ('le',), values + (f'{bound:g}',))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels + ('le',), values + ('+Inf',))} {hist.total}")
+                    lines.append(f"{name}_sum{_labels(labels, values)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_labels(labels, values)} {hist.total}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+registry = Registry()
+registry.histogram("http_request_duration_seconds", "Time to produce the response.", ("route", "method", "status"), LATENCY_BUCKETS)
+registry.histogram("http_request_db_queries", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS)
+registry.counter("db_query_seconds_total", "Time spent in SQL statements.", ("route",))
+registry.counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("route",))
+registry.counter("template_render_seconds_total", "Time spent rendering Jinja templates.", ("route",))
+registry.counter("external_call_seconds_total", "Time spent calling external services.", ("route", "service"))
+registry.counter("external_calls_total", "Calls made to external services.", ("route", "service"))
+
+
+def record_request(stats: RequestStats, method: str, status: int, duration: float):
+    route = stats.route
+    registry.observe("http_request_duration_seconds", (route, method, str(status)), duration)
+    registry.observe("http_request_db_queries", (route,), stats.db_queries)
+    registry.inc("db_query_seconds_total", (route,), stats.db_seconds)
+    if stats.template_seconds:
+        registry.inc("template_render_seconds_total", (route,), stats.template_seconds)
+    for service, seconds in stats.external_seconds.items():
+        registry.inc("external_call_seconds_total", (route, service), seconds)
+        registry.inc("external_calls_total", (route, service), stats.external_calls[service])
+    if stats.db_queries >= settings.REQUEST_QUERY_WARN_COUNT:
+        logger.warning("%s %s ran %d SQL statements (%.1f ms) - possible N+1", method, route, stats.db_queries, stats.db_seconds * 1000)
+
+
+def server_timing(stats: RequestStats, duration: float) -> str:
+    """Value for the Server-Timing header, visible in the browser's network panel."""
+    parts = [f"app;dur={duration * 1000:.1f}", f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_queries} queries"']
+    if stats.template_seconds:
+        parts.append(f"tpl;dur={stats.template_seconds * 1000:.1f}")
+    for service, seconds in stats.external_seconds.items():
+        parts.append(f"{service};dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    return registry.render()
+
+
+# --- SQL timing ---
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    route = stats.route if stats else "background"
+    if stats:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        registry.inc("db_slow_queries_total", (route,))
+        slow_query_logger.warning("%.1f ms [%s] %s", elapsed * 1000, route, " ".join(statement.split())[:2000])
+
+
+if replica_engine is not None:
+    event.listen(replica_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(replica_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Template timing ---
+
+class TimedTemplate(Template):
+    """Jinja template class that adds its render time to the current request."""
+
+    def render(self, *args, **kwargs) -> str:
+        stats = _current.get()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+
+
+def instrument_templates(templates):
+    """Makes a Jinja2Templates instance record render time."""
+    templates.env.template_class = TimedTemplate
+    return templates
+
+
+# --- External calls ---
+
+@contextmanager
+def track_external(service: str):
+    """Times a call to an external service (azure, openai, slack, ...)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.external_seconds[service] = stats.external_seconds.get(service, 0.0) + time.perf_counter() - start
+            stats.external_calls[service] = stats.external_calls.get(service, 0) + 1
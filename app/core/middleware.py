@@ -0,0 +1,348 @@
+# app/core/middleware.py
+"""
+HTTP middleware: request metrics, N+1 detection, browser session refresh,
+read-your-writes routing, response compression and cache headers for static
+assets.
+"""
+import hashlib
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import tokens
+from app.core import metrics, nplusone
+from app.core.database import RECENT_WRITE_COOKIE, SessionLocal
+
+try:  # Brotli is optional; without it we only ever negotiate gzip.
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+STATIC_DIR = Path("static")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+
+# --- Metrics ---
+
+class MetricsMiddleware:
+    """
+    Binds a RequestStats to the request, adds a Server-Timing header and records
+    latency, SQL, template and external-call totals per route (see app/core/metrics.py).
+    """
+
+    def __init__(self, app: ASGIApp, excluded_paths: tuple = ("/metrics", "/health")):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.RequestStats(scope=scope)
+        token = metrics.bind_stats(stats)
+        start = time.perf_counter()
+        status_code = 500
+        duration = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, duration
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", metrics.server_timing(stats, time.perf_counter() - start))
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                duration = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Background tasks (e.g. Slack notifications) run before the app returns; their
+            # time counts towards the route's totals but not its response latency.
+            metrics.record_request(stats, scope["method"], status_code, duration or time.perf_counter() - start)
+            metrics.reset_stats(token)
+
+
+class NPlusOneMiddleware:
+    """Counts lazy loads per request and warns/raises on repeats (N_PLUS_ONE_MODE)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with nplusone.detect():
+            await self.app(scope, receive, send)
+
+
+# --- Sessions ---
+
+def _refresh(refresh_token: str):
+    db = SessionLocal()
+    try:
+        return tokens.refresh(db, refresh_token)
+    finally:
+        db.close()
+
+
+class SessionRefreshMiddleware:
+    """
+    Keeps browser sessions alive across short-lived access tokens. When a
+    request has the refresh_token cookie but its access_token cookie is
+    missing, expired or about to expire, a new access token is minted
+    (tokens.refresh, the only auth query a browser makes), swapped into the
+    request's Cookie header - and its Authorization header, if that carried
+    the stale token - and set as a cookie on the response. Page scripts keep
+    reading the cookie as before.
+    """
+
+    def __init__(self, app: ASGIApp, excluded_prefixes: tuple = ("/static", "/auth/")):
+        self.app = app
+        self.excluded_prefixes = excluded_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        cookies = cookie_parser(headers.get("cookie", ""))
+        refresh_token = cookies.get(tokens.REFRESH_COOKIE)
+        old_token = cookies.get(tokens.ACCESS_COOKIE)
+        if not refresh_token or not tokens.needs_refresh(old_token):
+            await self.app(scope, receive, send)
+            return
+
+        new_token = await run_in_threadpool(_refresh, refresh_token)
+        if new_token is None:
+            await self.app(scope, receive, send)
+            return
+
+        cookies[tokens.ACCESS_COOKIE] = new_token
+        raw = [(k, v) for k, v in scope["headers"] if k != b"cookie"]
+        raw.append((b"cookie", "; ".join(f"{k}={v}" for k, v in cookies.items()).encode("latin-1")))
+        authorization = headers.get("authorization")
+        if authorization and tokens.needs_refresh(authorization.partition(" ")[2]):
+            # The page sent the stale cookie value (or "undefined" once it expired).
+            raw = [(k, v) for k, v in raw if k != b"authorization"]
+            raw.append((b"authorization", f"Bearer {new_token}".encode("latin-1")))
+        scope = dict(scope, headers=raw)
+        set_cookie = tokens.access_cookie(new_token, secure=scope.get("scheme") == "https")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("set-cookie", set_cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# --- Read replica ---
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReadYourWritesMiddleware:
+    """
+    Marks browsers that just wrote. A successful POST/PUT/PATCH/DELETE gets
+    the RECENT_WRITE_COOKIE for READ_YOUR_WRITES_SECONDS; while it is present
+    deps.get_read_db serves that browser from the primary instead of the read
+    replica, so a list reloaded right after saving a form shows the change.
+    The cookie is per browser, not per worker, so it holds across gunicorn
+    workers.
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: float):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        cookie = f"{RECENT_WRITE_COOKIE}=1; Max-Age={max(1, round(self.window_seconds))}; Path=/; HttpOnly; SameSite=Lax"
+        if scope.get("scheme") == "https":
+            cookie += "; Secure"
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append("set-cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# --- Compression ---
+
+def _negotiate(accept_encoding: str) -> str | None:
+    """Picks br or gzip from an Accept-Encoding header, honouring q=0."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=min(level, 11))
+        else:
+            # wbits=31 -> gzip container
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.flush()
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses whose content type is in `content_types` and whose body is at
+    least `minimum_size` bytes. Streamed responses are compressed chunk by chunk.
+    Server-sent events and binary formats (PDF, images) are never in the allowlist.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, content_types: tuple = (), level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message:
+                # First body chunk: decide whether this response gets compressed.
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "").split(";")[0].strip()
+                eligible = (
+                    "content-encoding" not in headers
+                    and start_message.get("status", 200) not in (204, 304)
+                    and content_type.startswith(self.content_types)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if eligible:
+                    headers.add_vary_header("Accept-Encoding")
+                    headers["Content-Encoding"] = encoding
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        # The bytes differ from the identity representation.
+                        headers["ETag"] = f"W/{etag}"
+                    compressor = _Compressor(encoding, self.level)
+                    if not more_body:
+                        body = compressor.compress(body) + compressor.finish()
+                        headers["Content-Length"] = str(len(body))
+                else:
+                    passthrough = True
+                await send(start_message)
+                start_message = {}
+                if passthrough or not more_body:
+                    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                    return
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.flush(), "more_body": True})
+                return
+
+            if passthrough:
+                await send(message)
+            elif more_body:
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.flush(), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.finish(), "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# --- Static assets ---
+
+@lru_cache(maxsize=256)
+def _fingerprint(path: str) -> str:
+    try:
+        return hashlib.md5((STATIC_DIR / path).read_bytes()).hexdigest()[:10]
+    except OSError:
+        return ""
+
+
+def static_url(path: str) -> str:
+    """
+    Template helper: returns /static/<path>?v=<content hash>. Fingerprinted URLs
+    change whenever the file changes, so they can be cached forever.
+    """
+    path = path.lstrip("/")
+    fingerprint = _fingerprint(path)
+    return f"/static/{path}?v={fingerprint}" if fingerprint else f"/static/{path}"
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that marks fingerprinted requests as immutable: only when ?v=
+    is the current content hash, so a stale or made-up ?v= (old HTML after a
+    deploy) does not pin today's bytes under that URL for a year.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        versions = parse_qs(scope.get("query_string", b"").decode()).get("v", [])
+        fingerprint = _fingerprint(Path(self.get_path(scope)).as_posix())
+        fingerprinted = bool(fingerprint) and fingerprint in versions
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+        return response
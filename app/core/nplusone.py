@@ -0,0 +1,141 @@
+# app/core/nplusone.py
+"""
+N+1 query detection.
+
+Every lazy relationship load (e.g. `current_user.roles`, `task.phase.project`,
+a template touching `mr.project.name` in a loop) goes through the session's
+do_orm_execute hook. Loads are grouped by their shape - "Model.relationship" -
+and counted per request. When one shape repeats more than
+N_PLUS_ONE_THRESHOLD times in a single request the detector warns or, with
+N_PLUS_ONE_MODE=raise, raises NPlusOneError so tests fail loudly.
+
+`count_queries()` counts statements and lazy loads for a block of code and is
+what the `query_budget` pytest fixture (app/testing/pytest_plugin.py) uses.
+"""
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine, replica_engine
+
+logger = logging.getLogger("app.nplusone")
+
+
+class NPlusOneError(Exception):
+    """Raised in N_PLUS_ONE_MODE=raise when a lazy load shape repeats too often."""
+
+
+@dataclass
+class LazyLoadTracker:
+    threshold: int
+    raise_errors: bool = False
+    loads: Counter = field(default_factory=Counter)
+    reported: set = field(default_factory=set)
+
+    def record(self, shape: str):
+        self.loads[shape] += 1
+        if self.loads[shape] <= self.threshold or shape in self.reported:
+            return
+        self.reported.add(shape)
+        message = (
+            f"N+1 detected: lazy load of {shape} repeated {self.loads[shape]} times "
+            f"(threshold {self.threshold}). Use joinedload/selectinload."
+        )
+        if self.raise_errors:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+_tracker: ContextVar[Optional[LazyLoadTracker]] = ContextVar("lazy_load_tracker", default=None)
+
+
+@contextmanager
+def detect(threshold: Optional[int] = None, raise_errors: Optional[bool] = None):
+    """Tracks lazy loads for the duration of the block (one request, one job, ...)."""
+    tracker = LazyLoadTracker(
+        threshold=settings.N_PLUS_ONE_THRESHOLD if threshold is None else threshold,
+        raise_errors=settings.N_PLUS_ONE_MODE == "raise" if raise_errors is None else raise_errors,
+    )
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+
+
+# --- Block-level counting (tests) ---
+
+@dataclass
+class QueryCount:
+    queries: int = 0
+    statements: list = field(default_factory=list)
+    lazy_loads: Counter = field(default_factory=Counter)
+
+    def summary(self) -> str:
+        lines = [f"{self.queries} SQL statements"]
+        if self.lazy_loads:
+            lines.append("lazy loads: " + ", ".join(f"{shape} x{n}" for shape, n in self.lazy_loads.most_common()))
+        lines.extend(f"  {i + 1}. {statement[:200]}" for i, statement in enumerate(self.statements))
+        return "\n".join(lines)
+
+
+_active_counts: list[QueryCount] = []
+_active_lock = threading.Lock()
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts every statement and lazy load issued by any thread while the block runs.
+    Meant for tests, where the app runs in the TestClient's worker thread.
+    """
+    count = QueryCount()
+    with _active_lock:
+        _active_counts.append(count)
+    try:
+        yield count
+    finally:
+        with _active_lock:
+            _active_counts.remove(count)
+
+
+# --- Hooks ---
+
+def _shape(orm_execute_state) -> str:
+    path = orm_execute_state.loader_strategy_path.path
+    return f"{path[-2].class_.__name__}.{path[-1].key}"
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _on_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_relationship_load or orm_execute_state.lazy_loaded_from is None:
+        return  # Eager loaders (selectinload/subqueryload) are fine.
+    tracker = _tracker.get()
+    if tracker is None and not _active_counts:
+        return
+    shape = _shape(orm_execute_state)
+    for count in _active_counts:
+        count.lazy_loads[shape] += 1
+    if tracker is not None:
+        tracker.record(shape)
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _on_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not _active_counts:
+        return
+    with _active_lock:
+        for count in _active_counts:
+            count.queries += 1
+            count.statements.append(" ".join(statement.split()))
+
+
+if replica_engine is not None:
+    event.listen(replica_engine, "after_cursor_execute", _on_cursor_execute)
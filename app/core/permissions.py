@@ -0,0 +1,124 @@
+# app/core/permissions.py
+"""
+Role-based permissions and row-level scoping.
+
+ROLE_PERMISSIONS maps each role to a Permission bitmask. resolve() turns a
+user into an Access - their role names and the OR of their roles' masks -
+with one query on user_role_association, cached (app.core.cache) until the
+users or roles tables change and for at most PERMISSION_CACHE_SECONDS, since
+the admin panel writes outside the cache hooks. API handlers use
+deps.get_access, which builds the Access from the role claims of the
+access token (app/auth/tokens.py) without touching the database.
+
+Row scoping is expressed as SQL filters (job_card_scope, owned_scope) so
+list queries stay a single indexed WHERE clause; the matching user-id
+columns are indexed.
+"""
+import enum
+import time
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select, true
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core import cache
+from app.core.config import settings
+
+Role = models.UserRole
+
+
+class Permission(enum.IntFlag):
+    VIEW_ALL_JOB_CARDS = enum.auto()      # otherwise only job cards assigned to the user
+    VIEW_ALL_SITE_REPORTS = enum.auto()   # otherwise only Duty/Site Officer reports they created
+    VIEW_ALL_REQUISITIONS = enum.auto()   # otherwise only MRs they requested
+    REASSIGN_JOB_CARDS = enum.auto()
+    VIEW_PROJECT_PROGRESS = enum.auto()
+    ADMIN = enum.auto()
+
+
+SITE_OVERSIGHT = (
+    Permission.VIEW_ALL_JOB_CARDS | Permission.VIEW_ALL_SITE_REPORTS | Permission.VIEW_ALL_REQUISITIONS
+    | Permission.REASSIGN_JOB_CARDS | Permission.VIEW_PROJECT_PROGRESS
+)
+
+ROLE_PERMISSIONS = {
+    Role.SUPER_ADMIN.value: SITE_OVERSIGHT | Permission.ADMIN,
+    Role.ADMIN.value: SITE_OVERSIGHT | Permission.ADMIN,
+    Role.OPERATION_MANAGER.value: SITE_OVERSIGHT,
+    Role.PROJECT_MANAGER.value: SITE_OVERSIGHT,
+    Role.PROCUREMENT.value: Permission.VIEW_ALL_REQUISITIONS,
+    Role.QS.value: Permission.VIEW_ALL_REQUISITIONS,
+}
+
+# Access only depends on role assignments, not on other user columns (logins
+# rewrite users.session_id); user.roles changes bump user_role_association.
+ACCESS_TABLES = ("user_role_association", "roles")
+
+
+@dataclass(frozen=True)
+class Access:
+    user_id: int
+    roles: frozenset
+    permissions: Permission
+
+    def has(self, permission: Permission) -> bool:
+        return permission & self.permissions == permission
+
+    def require(self, permission: Permission, detail: str = "Not authorized for this action."):
+        if not self.has(permission):
+            raise HTTPException(status_code=403, detail=detail)
+
+    def is_assigned(self, *user_ids) -> bool:
+        return self.user_id in user_ids
+
+
+def permissions_for(roles) -> Permission:
+    mask = Permission(0)
+    for role in roles:
+        mask |= ROLE_PERMISSIONS.get(role, Permission(0))
+    return mask
+
+
+def from_roles(user_id: int, roles) -> Access:
+    """Access for a known role set, e.g. the role claims of an access token (no query)."""
+    roles = frozenset(roles)
+    return Access(user_id=user_id, roles=roles, permissions=permissions_for(roles))
+
+
+def load(db: Session, user_id: int) -> Access:
+    """Reads the user's roles from the database."""
+    roles = db.scalars(
+        select(models.Role.name)
+        .join(models.user_role_association, models.user_role_association.c.role_id == models.Role.id)
+        .where(models.user_role_association.c.user_id == user_id)
+    )
+    return from_roles(user_id, roles)
+
+
+def resolve(db: Session, user: models.User) -> Access:
+    """The user's roles and permission mask, from cache when possible."""
+    window = int(time.monotonic() // settings.PERMISSION_CACHE_SECONDS)
+    return cache.cached_data(db, "access", f"user:{user.id}:{window}", ACCESS_TABLES, lambda: load(db, user.id))
+
+
+# --- Row-level scopes ---
+
+def job_card_scope(access: Access, *assignee_columns):
+    """
+    WHERE clause for the job cards `access` may see: all of them, or those
+    where one of `assignee_columns` (default: site engineer, supervisor and
+    foreman) is the user.
+    """
+    if access.has(Permission.VIEW_ALL_JOB_CARDS):
+        return true()
+    columns = assignee_columns or (
+        models.JobCard.site_engineer_user_id, models.JobCard.supervisor_user_id, models.JobCard.foreman_user_id
+    )
+    return or_(*(column == access.user_id for column in columns))
+
+
+def owned_scope(access: Access, permission: Permission, owner_column):
+    """WHERE clause: every row if the user has `permission`, otherwise the rows they own."""
+    return true() if access.has(permission) else owner_column == access.user_id
@@ -0,0 +1,34 @@
+# app/core/templating.py
+"""
+The Jinja2Templates instance shared by the page and PDF routes.
+
+A single environment means each template is compiled once per process. In
+the gunicorn preload mode (gunicorn.conf.py) precompile() runs in the master
+before it forks, so the workers share the compiled templates copy-on-write
+instead of each compiling them on first render.
+"""
+from fastapi.templating import Jinja2Templates
+from jinja2 import TemplateError
+
+from app.core import metrics
+from app.core.middleware import static_url
+
+templates = metrics.instrument_templates(Jinja2Templates(directory="templates"))
+templates.env.globals["static_url"] = static_url
+
+# Rendered by sqladmin's own environment (templates_dir="templates/admin").
+_SKIP_PREFIXES = ("admin/",)
+
+
+def precompile() -> int:
+    """Compiles every template into the environment's cache. Returns how many were loaded."""
+    env = templates.env
+    names = [name for name in env.list_templates(extensions=["html"]) if not name.startswith(_SKIP_PREFIXES)]
+    loaded = 0
+    for name in names:
+        try:
+            env.get_template(name)
+            loaded += 1
+        except TemplateError as e:
+            print(f"Warning: could not precompile template {name}: {e}")
+    return loaded
@@ -113,6 +113,16 @@ class DesignProjectV3(Base):
     handover_ops_head_signed_by_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     handover_ops_head_signed_at = Column(DateTime, nullable=True)
 
+    # Progress summary kept up to date by app/services/design_v3_workflow.py,
+    # so list views never have to load the stages.
+    current_stage_name = Column(String, nullable=True)
+    current_stage_order = Column(Integer, nullable=True)
+    current_stage_started_at = Column(DateTime, nullable=True)
+    stages_total = Column(Integer, nullable=False, default=0, server_default="0")
+    stages_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    tasks_total = Column(Integer, nullable=False, default=0, server_default="0")
+    tasks_submitted = Column(Integer, nullable=False, default=0, server_default="0")
+
     # --- THIS IS THE FIX ---
     # Specify the foreign_keys for each relationship to the User table
     created_by = relationship("User", foreign_keys=[created_by_id])
@@ -1,13 +1,23 @@
 # app/main.py
 import json
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+
+import anyio
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from sqladmin import Admin
 
 from app.core.database import engine
 from app.core.config import settings
+from app.core import metrics
+from app.core.middleware import (
+    CompressionMiddleware, CachedStaticFiles, MetricsMiddleware, NPlusOneMiddleware, ReadYourWritesMiddleware,
+    SessionRefreshMiddleware,
+)
 from app.admin import MyAuthBackend, create_admin_views
+from app.api import deps
+from app.services import jobs
 
 # Import all the routers
 from app.api.endpoints import pages, job_cards, reports, procurement, uploads, users, approvals, nanny_log, requisition_details, material_receipts, duty_officer_reports, site_officer_reports, job_card_details, notifications,materials as materials_router 
@@ -31,7 +41,15 @@ from app.api.endpoints.lpo.lpo import router as lpo_router
 
 
 
-app = FastAPI(title="Metamorphic Job Card App V2")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Threads this worker runs sync `def` endpoints on (see THREADPOOL_SIZE, gunicorn.conf.py).
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    yield
+    jobs.shutdown()
+
+
+app = FastAPI(title="Metamorphic Job Card App V2", lifespan=lifespan)
 
 # --- Setup Admin Panel ---
 # Note: Ensure SECRET_KEY is set in your .env file for session management
@@ -53,6 +71,35 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         content={"message": f"Invalid form data. Please check the fields. Details: {error_messages}"}
     )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        level=settings.COMPRESSION_LEVEL,
+        content_types=(
+            "text/html", "text/css", "text/plain", "text/csv",
+            "application/json", "application/javascript", "image/svg+xml",
+        ),
+    )
+
+# Renews browsers' short-lived access tokens from their refresh cookie (app/auth/tokens.py).
+app.add_middleware(SessionRefreshMiddleware)
+
+if settings.DATABASE_REPLICA_URL:
+    # Sends a browser's reads to the primary for a while after it writes (deps.get_read_db).
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+if settings.N_PLUS_ONE_MODE != "off":
+    # Development / test aid only; see app/core/nplusone.py.
+    app.add_middleware(NPlusOneMiddleware)
+
+if settings.METRICS_ENABLED:
+    # Added last so it is the outermost layer and its latency includes compression.
+    app.add_middleware(MetricsMiddleware)
+
+# Fingerprinted assets (see static_url) are served with an immutable Cache-Control.
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+
 # @app.middleware("http")
 # async def add_security_headers(request, call_next):
 #     response = await call_next(request)
@@ -61,12 +108,12 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 # -----------------------------------------------------------------
 
 # --- Include all API Routers ---
-app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+app.include_router(auth_router, prefix="/auth", tags=["Authentication"], dependencies=[Depends(deps.concurrency_limit("auth"))])
 app.include_router(pages.router, tags=["Pages"]) # Root-level pages
 app.include_router(job_cards.router, prefix="/job-cards", tags=["Job Cards"])
 app.include_router(reports.router, prefix="/reports", tags=["Reports"])
 app.include_router(procurement.router, prefix="/procurement", tags=["Procurement"])
-app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"], dependencies=[Depends(deps.concurrency_limit("uploads"))])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(approvals.router, prefix="/api/approvals", tags=["Approvals"])
 app.include_router(nanny_log.router, prefix="/nanny-log", tags=["Nanny Log"])
@@ -116,13 +163,27 @@ from app.api.endpoints.design.tasks_v3 import router as design_v3_tasks_router
 app.include_router(design_v3_tasks_router, prefix="/api/design/v3/tasks", tags=["Design V3 Tasks"])
 
 from app.api.endpoints.dashboard_reports import router as dashboard_reports_router
-app.include_router(dashboard_reports_router, prefix="/api/reports", tags=["Dashboard Reports"])
+app.include_router(dashboard_reports_router, prefix="/api/reports", tags=["Dashboard Reports"], dependencies=[Depends(deps.concurrency_limit("reports"))])
 
 from app.api.endpoints.invoice.invoice import router as invoice_router
 app.include_router(invoice_router, prefix="/api/invoices", tags=["Invoices"])
 
+from app.api.endpoints.progress_analytics import router as progress_analytics_router
+app.include_router(progress_analytics_router, prefix="/api/progress", tags=["Progress Analytics"], dependencies=[Depends(deps.concurrency_limit("reports"))])
+
+from app.api.endpoints.inbox import router as inbox_router
+app.include_router(inbox_router, prefix="/api/inbox", tags=["Inbox"])
+
 
 @app.get("/health", tags=["System"])
 async def health_check():
     """Simple health check endpoint."""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint for this worker's request metrics."""
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return PlainTextResponse("Forbidden", status_code=403)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,11 +1,11 @@
 from sqlalchemy import (
-    Column, Integer, String, Date, Numeric, ForeignKey, DateTime, func, Text, Boolean
+    Column, Integer, BigInteger, String, Date, Numeric, ForeignKey, DateTime, func, Text, Boolean, text
 )
 
 from sqlalchemy.orm import relationship, declarative_base
 from passlib.context import CryptContext
 import enum
-from sqlalchemy import Table, Enum as SQLAlchemyEnum
+from sqlalchemy import Table, Index, Enum as SQLAlchemyEnum
 
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
@@ -52,7 +52,8 @@ mr_jc_association_table = Table(
 report_jc_association_table = Table(
     'report_jc_association', Base.metadata,
     Column('report_id', Integer, ForeignKey('site_officer_reports.id'), primary_key=True),
-    Column('job_card_id', Integer, ForeignKey('job_cards.id'), primary_key=True)
+    Column('job_card_id', Integer, ForeignKey('job_cards.id'), primary_key=True),
+    Index('ix_report_jc_association_job_card_id', 'job_card_id')
 )
 
 lpo_mr_association_table = Table(
@@ -130,11 +131,14 @@ class SiteImage(Base):
 
 class DutyOfficerProgress(Base):
     __tablename__ = 'duty_officer_progress'
+    __table_args__ = (
+        Index('ix_duty_officer_progress_date_of_work_id', 'date_of_work', 'id'),  # Report browser keyset order
+    )
     # ... (all existing columns are the same)
     id = Column(Integer, primary_key=True, index=True)
-    created_by_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    created_by_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     foreman_user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    job_card_id = Column(Integer, ForeignKey('job_cards.id'), nullable=False)
+    job_card_id = Column(Integer, ForeignKey('job_cards.id'), nullable=False, index=True)
     task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False)
     date_of_work = Column(Date, nullable=False)
     actual_output = Column(Text, nullable=False)
@@ -175,9 +179,12 @@ class DutyOfficerProgress(Base):
 
 class SiteOfficerReport(Base):
     __tablename__ = 'site_officer_reports'
+    __table_args__ = (
+        Index('ix_site_officer_reports_date_id', 'date', 'id'),  # Report browser keyset order
+    )
     # ... (all existing columns are the same)
     id = Column(Integer, primary_key=True, index=True)
-    created_by_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    created_by_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     # --- ADD THESE TWO LINES ---
     site_officer_user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     duty_officer_user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
@@ -290,8 +297,16 @@ class Foreman(Base):
     site_officer_reports = relationship("SiteOfficerReport", back_populates="duty_officer")
     def __str__(self) -> str: return self.name
 
+# Job cards still being worked on (the job card tracking page lists these).
+ACTIVE_JOB_CARD_STATUSES = ('Pending', 'Processing')
+
 class JobCard(Base):
     __tablename__ = 'job_cards'
+    __table_args__ = (
+        # Keyset pages of active job cards (newest first), optionally for one project.
+        Index('ix_job_cards_active_id', 'id', postgresql_where=text("status IN ('Pending', 'Processing')")),
+        Index('ix_job_cards_active_project_id', 'project_id', 'id', postgresql_where=text("status IN ('Pending', 'Processing')")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     job_card_no = Column(String, unique=True, nullable=False, index=True)
     status = Column(String, nullable=False, default='Pending', index=True)
@@ -304,9 +319,9 @@ class JobCard(Base):
     supervisor_id = Column(Integer, ForeignKey('supervisors.id'), nullable=False)
     foreman_id = Column(Integer, ForeignKey('foremen.id'), nullable=False)
     created_by_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    site_engineer_user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    supervisor_user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    foreman_user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    site_engineer_user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    supervisor_user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    foreman_user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     project = relationship("Project", back_populates="job_cards")
     site_engineer = relationship("SiteEngineer", back_populates="job_cards")
     supervisor = relationship("Supervisor", back_populates="job_cards")
@@ -330,7 +345,7 @@ class JobCard(Base):
 class TaskProgressLog(Base):
     __tablename__ = 'task_progress_logs'
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False)
+    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False, index=True)
     date = Column(Date, nullable=False, default=func.current_date())
     quantity_done = Column(Numeric(10, 2), nullable=False)
     notes = Column(Text, nullable=True)
@@ -341,6 +356,37 @@ class TaskProgressLog(Base):
     task = relationship("Task", back_populates="progress_logs")
     created_by = relationship("User")
 
+class TaskProgressDaily(Base):
+    """Quantity done per task per day, rolled up from task_progress_logs for trend charts (services/progress_analytics.py)."""
+    __tablename__ = 'task_progress_daily'
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
+    quantity_done = Column(Numeric(12, 2), nullable=False, default=0)
+    # A project's chart is one index-only range scan
+    __table_args__ = (
+        Index('ix_task_progress_daily_project_date', 'project_id', 'date', 'task_id', postgresql_include=['quantity_done']),
+    )
+
+class SiteDailySummary(Base):
+    """
+    Form B and Form C figures per day, site location and project, kept up to
+    date as reports are submitted (services/site_summary.py).
+    """
+    __tablename__ = 'site_daily_summary'
+    date = Column(Date, primary_key=True)
+    site_location = Column(String, primary_key=True)  # '' when the report gave none
+    project_id = Column(Integer, ForeignKey('projects.id'), primary_key=True)
+    form_b_reports = Column(Integer, nullable=False, default=0, server_default='0')
+    form_c_reports = Column(Integer, nullable=False, default=0, server_default='0')
+    ppe_compliant = Column(Integer, nullable=False, default=0, server_default='0')  # Form B PPE check / Form C PPE compliance ticked
+    ppe_non_compliant = Column(Integer, nullable=False, default=0, server_default='0')
+    incidents = Column(Integer, nullable=False, default=0, server_default='0')  # Form C reports naming incidents / near misses
+    health_good = Column(Integer, nullable=False, default=0, server_default='0')  # Form C overall site health
+    health_needs_improvement = Column(Integer, nullable=False, default=0, server_default='0')
+    health_critical = Column(Integer, nullable=False, default=0, server_default='0')
+    critical_actions = Column(Integer, nullable=False, default=0, server_default='0')  # Form C reports listing critical actions
+
 class Task(Base):
     __tablename__ = 'tasks'
     id = Column(Integer, primary_key=True, index=True)
@@ -354,7 +400,10 @@ class Task(Base):
     assigned_crew = Column(String)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
-    job_card_id = Column(Integer, ForeignKey('job_cards.id'), nullable=False)
+    job_card_id = Column(Integer, ForeignKey('job_cards.id'), nullable=False, index=True)
+    # Running totals of progress_logs, kept in step by services/task_progress.py
+    quantity_done_total = Column(Numeric(12, 2), nullable=False, default=0, server_default='0')
+    last_progress_at = Column(DateTime, nullable=True)
     job_card = relationship("JobCard", back_populates="tasks")
     progress_logs = relationship("TaskProgressLog", back_populates="task", cascade="all, delete-orphan", order_by="TaskProgressLog.date.desc()")
     def __str__(self) -> str: return f"Task #{self.id}: {self.task_details[:50]}" if self.task_details else f"Task #{self.id}"
@@ -366,7 +415,7 @@ class MaterialRequisition(Base):
     id = Column(Integer, primary_key=True, index=True)
     request_date = Column(Date, nullable=False, default=func.current_date())
     project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
-    requested_by_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    requested_by_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     material_type = Column(String, nullable=False)
     urgency = Column(String, nullable=False)
     required_delivery_date = Column(Date, nullable=False)
@@ -646,4 +695,39 @@ class AuthLog(Base):
     os = Column(String, nullable=True)
     device = Column(String, nullable=True)
     # -----------------------------
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CacheVersion(Base):
+    """Per-table data version stamp used to key and invalidate the page cache."""
+    __tablename__ = 'cache_versions'
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class ApprovalAudit(Base):
+    """One row per approval transition (services/approval_workflow.py). Append-only: a trigger rejects UPDATE/DELETE."""
+    __tablename__ = 'approval_audit_log'
+    id = Column(BigInteger, primary_key=True)
+    batch_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    entity = Column(String, nullable=False)     # 'requisition' | 'lpo'
+    entity_id = Column(Integer, nullable=False)
+    gate = Column(String, nullable=False)       # 'mr' | 'pm' | 'qs' | 'finance'
+    from_status = Column(String, nullable=True)
+    to_status = Column(String, nullable=False)
+    notes = Column(Text, nullable=True)
+    actor_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    __table_args__ = (
+        Index('ix_approval_audit_log_entity', 'entity', 'entity_id'),
+    )
+
+
+class RevokedSession(Base):
+    """A session id (token jti) that was logged out or replaced by a newer login; see app/auth/revocation.py."""
+    __tablename__ = 'revoked_sessions'
+    jti = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # once every access token for it has expired
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,204 @@
+# app/services/approval_workflow.py
+"""
+Approval gates for material requisitions and LPOs.
+
+Each gate in GATES says which column holds its decision, who may decide it
+and which earlier gates must have approved first (MR -> PM -> QS for
+requisitions, Finance for LPOs). transition() applies one decision to any
+number of items in the caller's transaction:
+
+  1. one SELECT ... FOR UPDATE that locks all the rows (in id order),
+  2. one UPDATE of the items that are eligible,
+  3. one multi-row INSERT into approval_audit_log (append-only).
+
+Items that cannot move (not found, already decided, waiting on an earlier
+gate) are reported back rather than failing the batch. digest_message()
+renders a single Slack message for the whole batch.
+"""
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+PENDING = "Pending"
+APPROVED = "Approved"
+REJECTED = "Rejected"
+
+DIGEST_MAX_ITEMS = 10
+
+
+@dataclass(frozen=True)
+class Entity:
+    model: type
+    number_field: str
+    link: str  # path format with {id}
+    noun: str
+
+
+ENTITIES = {
+    "requisition": Entity(models.MaterialRequisition, "mr_number", "/requisition-details/{id}", "MR"),
+    "lpo": Entity(models.LPO, "lpo_number", "/lpos/{id}", "LPO"),
+}
+
+
+@dataclass(frozen=True)
+class Gate:
+    name: str
+    label: str
+    entity: str
+    field: str                      # column holding this gate's decision
+    roles: frozenset                # who may decide it
+    requires: tuple = ()            # gates that must be Approved first
+    on_reject: tuple = ()           # extra (column, value) pairs set on rejection
+    approved_note: str = ""         # what an approval means, for the digest
+
+
+GATES = {
+    "mr": Gate(
+        "mr", "MR", "requisition", "mr_approval",
+        roles=frozenset({"Procurement", "Admin", "Super Admin"}),
+        on_reject=(("status", REJECTED),),
+        approved_note="ready for PM approval",
+    ),
+    "pm": Gate(
+        "pm", "PM", "requisition", "pm_approval",
+        roles=frozenset({"Project Manager"}),
+        requires=("mr",),
+        approved_note="ready for QS approval",
+    ),
+    "qs": Gate(
+        "qs", "QS", "requisition", "qs_approval",
+        roles=frozenset({"QS"}),
+        requires=("mr", "pm"),
+        approved_note="fully approved and ready for processing",
+    ),
+    "finance": Gate(
+        "finance", "Finance", "lpo", "status",
+        roles=frozenset({"Finance"}),
+        approved_note="fully approved and ready for further processing",
+    ),
+}
+
+
+def requirements_met(gate: Gate):
+    """SQL condition: every gate `gate` depends on has approved."""
+    model = ENTITIES[gate.entity].model
+    return [getattr(model, GATES[name].field) == APPROVED for name in gate.requires]
+
+
+@dataclass
+class TransitionResult:
+    gate: Gate
+    decision: str
+    batch_id: uuid.UUID
+    applied: list = field(default_factory=list)   # [{"id", "number", "project_name"}]
+    skipped: list = field(default_factory=list)   # [{"id", "reason"}]
+
+    def summary(self) -> dict:
+        return {
+            "gate": self.gate.name,
+            "decision": self.decision,
+            "batch_id": str(self.batch_id),
+            "applied": [item["id"] for item in self.applied],
+            "skipped": self.skipped,
+        }
+
+
+def transition(
+    db: Session,
+    gate_name: str,
+    ids: list,
+    decision: str,
+    actor: models.User,
+    user_roles: set,
+    notes: Optional[str] = None,
+) -> TransitionResult:
+    """Applies `decision` at `gate_name` to every eligible item in `ids`. The caller commits."""
+    gate = GATES[gate_name]
+    if not gate.roles.intersection(user_roles):
+        raise HTTPException(status_code=403, detail=f"Not authorized for {gate.label} approval")
+    if decision not in (APPROVED, REJECTED):
+        raise HTTPException(status_code=400, detail="Invalid decision")
+
+    entity = ENTITIES[gate.entity]
+    model = entity.model
+    required = [GATES[name] for name in gate.requires]
+    rows = db.execute(
+        select(
+            model.id,
+            getattr(model, entity.number_field).label("number"),
+            getattr(model, gate.field).label("current"),
+            models.Project.name.label("project_name"),
+            *(getattr(model, g.field).label(g.name) for g in required),
+        )
+        .outerjoin(models.Project, models.Project.id == model.project_id)
+        .where(model.id.in_(ids))
+        .order_by(model.id)
+        .with_for_update(of=model)
+    ).all()
+
+    result = TransitionResult(gate=gate, decision=decision, batch_id=uuid.uuid4())
+    found = {row.id for row in rows}
+    result.skipped.extend({"id": item_id, "reason": "not found"} for item_id in sorted(set(ids) - found))
+    for row in rows:
+        waiting_on = next((g for g in required if getattr(row, g.name) != APPROVED), None)
+        if row.current != PENDING:
+            result.skipped.append({"id": row.id, "reason": f"already {row.current or 'decided'}"})
+        elif waiting_on is not None:
+            result.skipped.append({"id": row.id, "reason": f"waiting for {waiting_on.label} approval"})
+        else:
+            result.applied.append({"id": row.id, "number": row.number, "project_name": row.project_name})
+
+    if not result.applied:
+        return result
+
+    applied_ids = [item["id"] for item in result.applied]
+    values = {gate.field: decision}
+    if decision == REJECTED:
+        values.update(dict(gate.on_reject))
+    db.execute(
+        update(model)
+        .where(model.id.in_(applied_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(insert(models.ApprovalAudit), [
+        {
+            "batch_id": result.batch_id,
+            "entity": gate.entity,
+            "entity_id": item_id,
+            "gate": gate.name,
+            "from_status": PENDING,
+            "to_status": decision,
+            "notes": notes,
+            "actor_id": actor.id,
+        }
+        for item_id in applied_ids
+    ])
+    return result
+
+
+def digest_message(result: TransitionResult, actor: models.User, base_url: str) -> Optional[str]:
+    """One Slack message for a whole batch, or None if nothing changed."""
+    if not result.applied:
+        return None
+    entity = ENTITIES[result.gate.entity]
+    count = len(result.applied)
+    noun = entity.noun + ("s" if count != 1 else "")
+    if result.decision == APPROVED:
+        headline = f"✅ {result.gate.label} Approved: {count} {noun} by {actor.name}, {result.gate.approved_note}."
+    else:
+        headline = f"❌ {result.gate.label} Rejected: {count} {noun} by {actor.name}."
+    lines = [
+        f"• <{base_url}{entity.link.format(id=item['id'])}|{item['number']}>"
+        + (f" - *{item['project_name']}*" if item["project_name"] else "")
+        for item in result.applied[:DIGEST_MAX_ITEMS]
+    ]
+    if count > DIGEST_MAX_ITEMS:
+        lines.append(f"…and {count - DIGEST_MAX_ITEMS} more")
+    return "\n".join([headline, *lines])
@@ -0,0 +1,195 @@
+# app/services/audit_sink.py
+"""
+Write-behind sink for audit-style rows (auth events).
+
+Handlers call emit(stream, **row), which only appends to a bounded in-memory
+queue. A background thread per worker process writes the queue with one
+multi-row INSERT per stream and a single commit, every AUDIT_FLUSH_MS or as
+soon as AUDIT_BATCH_SIZE rows are waiting.
+
+If the queue is full (AUDIT_QUEUE_MAX) or a flush fails, rows are appended
+as JSON lines to AUDIT_SPOOL_PATH instead of being dropped, and replayed by
+the next successful flush. If a replay fails, its rows are retried one at a
+time; rows the database rejects outright (e.g. a foreign key to a deleted
+user) go to AUDIT_DEAD_LETTER_PATH with an error logged, so they cannot hold
+up the rest. A hard kill can still lose what was queued in memory at that
+moment.
+
+Streams are registered by the module that owns them:
+
+    audit_sink.register("auth_logs", models.AuthLog, prepare=add_user_agent_fields)
+
+`prepare` runs on the flusher thread, so per-row work such as parsing a
+user agent stays off the request path.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger("app.audit")
+
+@dataclass(frozen=True)
+class Stream:
+    model: type
+    prepare: Optional[Callable[[dict], dict]] = None
+
+
+_streams: dict[str, Stream] = {}
+_queue: deque = deque()
+_wakeup = threading.Event()
+_flush_lock = threading.Lock()
+_start_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def register(name: str, model: type, prepare: Optional[Callable[[dict], dict]] = None):
+    _streams[name] = Stream(model, prepare)
+
+
+def emit(stream: str, **row):
+    """Queues one row for `stream`. Never blocks on the database."""
+    if stream not in _streams:
+        raise ValueError(f"Unknown audit stream: {stream}")
+    if len(_queue) >= settings.AUDIT_QUEUE_MAX:
+        _spool([(stream, row)])
+        return
+    _queue.append((stream, row))
+    _ensure_flusher()
+    if len(_queue) >= settings.AUDIT_BATCH_SIZE:
+        _wakeup.set()
+
+
+# --- Disk fallback ---
+
+def _spool(items: list, path: Optional[str] = None):
+    path = path or settings.AUDIT_SPOOL_PATH
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            for stream, row in items:
+                f.write(json.dumps({"stream": stream, "row": row}, default=str) + "\n")
+    except OSError as e:
+        logger.error("Could not write %d audit rows to %s, they are lost: %s", len(items), path, e)
+
+
+def _take_spool() -> list:
+    """Claims the spool file (rename, so only one worker replays it) and reads it."""
+    path = settings.AUDIT_SPOOL_PATH
+    if not os.path.exists(path):
+        return []
+    claimed = f"{path}.{os.getpid()}.replay"
+    try:
+        os.replace(path, claimed)
+    except OSError:
+        return []
+    with open(claimed, encoding="utf-8") as f:
+        items = [(entry["stream"], entry["row"]) for entry in map(json.loads, filter(None, map(str.strip, f)))]
+    os.remove(claimed)
+    return items
+
+
+# --- Flushing ---
+
+def _write(items: list):
+    by_stream: dict[str, list] = {}
+    for stream, row in items:
+        by_stream.setdefault(stream, []).append(row)
+    db = SessionLocal()
+    try:
+        for name, rows in by_stream.items():
+            stream = _streams[name]
+            if stream.prepare:
+                rows = [stream.prepare(dict(row)) for row in rows]
+            db.execute(insert(stream.model), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _is_transient(exc: Exception) -> bool:
+    """The database could not be reached, as opposed to rejecting the row."""
+    return isinstance(exc, (OperationalError, InterfaceError)) or getattr(exc, "connection_invalidated", False)
+
+
+def _replay(items: list):
+    """Writes spooled rows, falling back to one row at a time if the batch fails."""
+    try:
+        _write(items)
+        return
+    except Exception as e:
+        if _is_transient(e):
+            logger.warning("Replaying %d spooled audit rows failed, keeping them spooled: %s", len(items), e)
+            _spool(items)
+            return
+        logger.warning("Replaying %d spooled audit rows failed, retrying one at a time: %s", len(items), e)
+
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            _write([item])
+        except Exception as e:
+            if _is_transient(e):
+                logger.warning("Audit replay interrupted, keeping %d rows spooled: %s", len(items) - index, e)
+                _spool(items[index:])
+                break
+            logger.error("Audit row for %s rejected, moving it to %s: %s", item[0], settings.AUDIT_DEAD_LETTER_PATH, e)
+            rejected.append(item)
+    if rejected:
+        _spool(rejected, settings.AUDIT_DEAD_LETTER_PATH)
+
+
+def flush() -> int:
+    """Writes one batch (plus any spooled rows). Returns how many rows were handled."""
+    with _flush_lock:
+        items = []
+        while _queue and len(items) < settings.AUDIT_BATCH_SIZE:
+            items.append(_queue.popleft())
+        if not items:
+            return 0
+        try:
+            _write(items)
+        except Exception as e:
+            logger.warning("Audit flush of %d rows failed, spooling to disk: %s", len(items), e)
+            _spool(items)
+            return len(items)
+
+        # The database is reachable again: replay anything spooled earlier.
+        spooled = [item for item in _take_spool() if item[0] in _streams]
+        if spooled:
+            _replay(spooled)
+        return len(items)
+
+
+def _drain():
+    while flush():
+        pass
+
+
+def _run():
+    while True:
+        _wakeup.wait(settings.AUDIT_FLUSH_MS / 1000)
+        _wakeup.clear()
+        _drain()
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _start_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="audit-flusher", daemon=True)
+            _flusher.start()
+
+
+atexit.register(_drain)
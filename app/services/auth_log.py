@@ -0,0 +1,57 @@
+# app/services/auth_log.py
+"""
+Auth events (logins, failures, throttling) for auth_logs.
+
+record() hands the event to the audit sink (app/services/audit_sink.py), so a
+login never waits on an INSERT and COMMIT. The user agent is parsed when the
+sink flushes, through an LRU cache, since a site's devices send the same
+handful of UA strings over and over. The parser (and its large regex table)
+is imported on the first flush, not at app startup.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from app import models
+from app.services import audit_sink
+
+
+@lru_cache(maxsize=1024)
+def describe_user_agent(user_agent_string: str) -> tuple:
+    """(browser, os, device) for a User-Agent header."""
+    from user_agents import parse
+
+    user_agent = parse(user_agent_string)
+    if user_agent.is_mobile:
+        device_type = "Mobile"
+    elif user_agent.is_tablet:
+        device_type = "Tablet"
+    elif user_agent.is_pc:
+        device_type = "PC/Laptop"
+    else:
+        device_type = "Other"
+    return (
+        f"{user_agent.browser.family} {user_agent.browser.version_string}",
+        f"{user_agent.os.family} {user_agent.os.version_string}",
+        f"{device_type} ({user_agent.device.family})",
+    )
+
+
+def _add_user_agent_fields(row: dict) -> dict:
+    row["browser"], row["os"], row["device"] = describe_user_agent(row.get("user_agent") or "")
+    return row
+
+
+audit_sink.register("auth_logs", models.AuthLog, prepare=_add_user_agent_fields)
+
+
+def record(event_type: str, ip_address: Optional[str], user_agent: Optional[str], user_id: Optional[int] = None):
+    """Queues one auth event."""
+    audit_sink.emit(
+        "auth_logs",
+        event_type=event_type,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        user_id=user_id,
+        timestamp=datetime.now(timezone.utc),
+    )
@@ -0,0 +1,281 @@
+# app/services/design_v3_workflow.py
+"""
+Stage state machine for Design V3 projects.
+
+Each stage's completion rule lives in STAGE_RULES instead of in the
+`complete-*` handlers. Completing a stage is three statements however many
+tasks or sign-offs it has:
+
+  1. one aggregate SELECT that locks the stage row and returns everything the
+     gates look at (task counts, first open task, sign-offs, requisition),
+  2. one UPDATE that completes the stage and unlocks the next one,
+  3. one UPDATE of the progress counters on DesignProjectV3.
+
+The counters (current stage, stages done, tasks submitted/total, when the
+current stage started) are also bumped when a task is submitted, so list
+views read them straight off design_projects_v3.
+
+Activation creates projects from the stage/task templates in
+design_v3_templates.yaml with bulk INSERTs (see activate_deals).
+"""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import yaml
+from fastapi import HTTPException
+from sqlalchemy import case, cast, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.design_v3_models import (
+    DesignProjectV3, DesignStageV3, DesignTaskV3, InterdisciplinarySignoff,
+    MeasurementRequisition, StageV3Name, StageV3Status, TaskStatusV3,
+)
+
+# Gates
+GATE_NONE = "none"
+GATE_TASKS_SUBMITTED = "tasks_submitted"        # every task in the stage is Submitted
+GATE_SIGNOFFS = "signoffs"                      # enough interdisciplinary sign-offs
+GATE_MEASUREMENT = "measurement_requisition"    # a measurement requisition exists
+
+STAGE_MANAGERS = frozenset({"Design Manager", "Lead Designer"})
+
+
+@dataclass(frozen=True)
+class StageRule:
+    gate: str = GATE_NONE
+    roles: frozenset = frozenset()  # who may complete the stage; empty means anyone signed in
+    required_signoffs: int = 0
+
+
+STAGE_RULES = {
+    StageV3Name.SITE_VISIT: StageRule(),
+    StageV3Name.MEASUREMENT: StageRule(gate=GATE_MEASUREMENT),
+    StageV3Name.INITIAL_DESIGN: StageRule(gate=GATE_TASKS_SUBMITTED, roles=STAGE_MANAGERS),
+    StageV3Name.QS_HANDOVER: StageRule(),
+    StageV3Name.TECH_REVIEW: StageRule(gate=GATE_SIGNOFFS, roles=STAGE_MANAGERS, required_signoffs=3),
+    StageV3Name.AUTHORITY_PACKAGE: StageRule(gate=GATE_TASKS_SUBMITTED, roles=STAGE_MANAGERS),
+    StageV3Name.FINAL_DELIVERY: StageRule(gate=GATE_TASKS_SUBMITTED, roles=STAGE_MANAGERS),
+    # Stage 8 completes through the dual handover sign-off, not a gate.
+    StageV3Name.EXECUTION_HANDOVER: StageRule(),
+}
+
+
+@dataclass
+class StageGateState:
+    id: int
+    project_id: int
+    name: StageV3Name
+    status: StageV3Status
+    order: int
+    tasks_total: int
+    tasks_submitted: int
+    first_open_task: Optional[str]
+    signoffs: int
+    requisition_id: Optional[int]
+
+
+def load_gate_state(db: Session, stage_id: int) -> Optional[StageGateState]:
+    """Locks the stage row and fetches everything its gate needs in one query."""
+    tasks = select(func.count(DesignTaskV3.id)).where(DesignTaskV3.stage_id == DesignStageV3.id)
+    submitted = tasks.where(DesignTaskV3.status == TaskStatusV3.SUBMITTED)
+    first_open = (
+        select(DesignTaskV3.title)
+        .where(DesignTaskV3.stage_id == DesignStageV3.id, DesignTaskV3.status != TaskStatusV3.SUBMITTED)
+        .order_by(DesignTaskV3.id)
+        .limit(1)
+    )
+    signoffs = select(func.count(InterdisciplinarySignoff.id)).where(InterdisciplinarySignoff.stage_id == DesignStageV3.id)
+    requisition = select(MeasurementRequisition.id).where(MeasurementRequisition.stage_id == DesignStageV3.id)
+
+    row = db.execute(
+        select(
+            DesignStageV3.id, DesignStageV3.project_id, DesignStageV3.name, DesignStageV3.status, DesignStageV3.order,
+            tasks.scalar_subquery().label("tasks_total"),
+            submitted.scalar_subquery().label("tasks_submitted"),
+            first_open.scalar_subquery().label("first_open_task"),
+            signoffs.scalar_subquery().label("signoffs"),
+            requisition.scalar_subquery().label("requisition_id"),
+        )
+        .where(DesignStageV3.id == stage_id)
+        .with_for_update(of=DesignStageV3)
+    ).first()
+    return StageGateState(**row._mapping) if row else None
+
+
+def check_gate(state: StageGateState, rule: StageRule):
+    if rule.gate == GATE_TASKS_SUBMITTED and state.first_open_task is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot complete stage: Task '{state.first_open_task}' is not yet submitted."
+        )
+    if rule.gate == GATE_SIGNOFFS and state.signoffs < rule.required_signoffs:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot complete stage: Not all technical disciplines have been signed off."
+        )
+    if rule.gate == GATE_MEASUREMENT and state.requisition_id is None:
+        raise HTTPException(status_code=404, detail="Active measurement requisition not found.")
+
+
+def complete_stage(
+    db: Session,
+    stage_id: int,
+    name: StageV3Name,
+    user_roles: set,
+    not_found: str = "Active stage not found.",
+) -> StageGateState:
+    """
+    Completes an In Progress stage if its rule allows it and unlocks the next
+    one. Raises HTTPException (403/404/400) otherwise. The caller commits.
+    """
+    rule = STAGE_RULES[name]
+    if rule.roles and not rule.roles.intersection(user_roles):
+        raise HTTPException(status_code=403, detail="Not authorized for this action.")
+
+    state = load_gate_state(db, stage_id)
+    if state is None or state.name != name or state.status != StageV3Status.IN_PROGRESS:
+        raise HTTPException(status_code=404, detail=not_found)
+    check_gate(state, rule)
+
+    def status_value(status: StageV3Status):
+        status_type = DesignStageV3.status.type
+        return cast(literal(status, status_type), status_type)
+
+    changed = db.execute(
+        update(DesignStageV3)
+        .where(or_(
+            DesignStageV3.id == state.id,
+            (DesignStageV3.project_id == state.project_id)
+            & (DesignStageV3.order == state.order + 1)
+            & (DesignStageV3.status == StageV3Status.LOCKED),
+        ))
+        .values(status=case(
+            (DesignStageV3.id == state.id, status_value(StageV3Status.COMPLETED)),
+            else_=status_value(StageV3Status.IN_PROGRESS),
+        ))
+        .returning(DesignStageV3.id, DesignStageV3.name, DesignStageV3.order)
+        .execution_options(synchronize_session=False)
+    ).all()
+    next_stage = next((row for row in changed if row.id != state.id), None)
+
+    progress = {"stages_completed": DesignProjectV3.stages_completed + 1}
+    if next_stage is not None:
+        progress.update(
+            current_stage_name=next_stage.name.value,
+            current_stage_order=next_stage.order,
+            current_stage_started_at=func.now(),
+        )
+    else:
+        progress.update(current_stage_name=None, current_stage_order=None, current_stage_started_at=None)
+    db.execute(
+        update(DesignProjectV3)
+        .where(DesignProjectV3.id == state.project_id)
+        .values(**progress)
+        .execution_options(synchronize_session=False)
+    )
+    return state
+
+
+def record_task_submitted(db: Session, task: DesignTaskV3):
+    """
+    Counts a task that just moved to Submitted towards its project's progress.
+    The caller holds the task row lock (with_for_update) while checking that
+    it was not Submitted already, so each task is counted once.
+    """
+    db.execute(
+        update(DesignProjectV3)
+        .where(DesignProjectV3.id == select(DesignStageV3.project_id).where(DesignStageV3.id == task.stage_id).scalar_subquery())
+        .values(tasks_submitted=DesignProjectV3.tasks_submitted + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# --- Activation ---
+
+@dataclass(frozen=True)
+class StageTemplate:
+    name: StageV3Name
+    order: int
+    start: bool
+    tasks: tuple
+
+
+@lru_cache(maxsize=1)
+def stage_templates() -> tuple:
+    """Stage/task templates from design_v3_templates.yaml (DESIGN_V3_TEMPLATES_PATH)."""
+    path = Path(os.getenv("DESIGN_V3_TEMPLATES_PATH", "design_v3_templates.yaml"))
+    with path.open("r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    templates = tuple(
+        StageTemplate(
+            name=StageV3Name[entry["stage"]],
+            order=i + 1,
+            start=bool(entry.get("start")),
+            tasks=tuple(entry.get("tasks") or ()),
+        )
+        for i, entry in enumerate(data.get("stages") or [])
+    )
+    if sum(t.start for t in templates) != 1:
+        raise ValueError(f"{path}: exactly one stage must be marked start: true")
+    return templates
+
+
+def activate_deals(db: Session, deals: list, created_by_id: int) -> dict:
+    """
+    Creates the V3 project, stages and tasks for each deal with three bulk
+    INSERT ... RETURNING statements, however many deals there are.
+    Returns {deal_id: project_id}. The caller commits.
+    """
+    if not deals:
+        return {}
+    templates = stage_templates()
+    start = next(t for t in templates if t.start)
+
+    project_rows = db.execute(
+        insert(DesignProjectV3)
+        .values(current_stage_started_at=func.now())
+        .returning(DesignProjectV3.id, DesignProjectV3.deal_id, sort_by_parameter_order=True),
+        [
+            {
+                "name": deal.project_name,
+                "client": deal.client_name,
+                "created_by_id": created_by_id,
+                "deal_id": deal.id,
+                "current_stage_name": start.name.value,
+                "current_stage_order": start.order,
+                "stages_total": len(templates),
+                "stages_completed": 0,
+                "tasks_total": sum(len(t.tasks) for t in templates),
+                "tasks_submitted": 0,
+            }
+            for deal in deals
+        ],
+    ).all()
+    project_ids = {row.deal_id: row.id for row in project_rows}
+
+    stage_rows = db.execute(
+        insert(DesignStageV3).returning(DesignStageV3.id, DesignStageV3.project_id, DesignStageV3.order),
+        [
+            {
+                "project_id": project_id,
+                "name": t.name,
+                "status": StageV3Status.IN_PROGRESS if t.start else StageV3Status.LOCKED,
+                "order": t.order,
+            }
+            for project_id in project_ids.values()
+            for t in templates
+        ],
+    ).all()
+
+    tasks_by_order = {t.order: t.tasks for t in templates}
+    task_rows = [
+        {"stage_id": row.id, "title": title, "status": TaskStatusV3.OPEN}
+        for row in stage_rows
+        for title in tasks_by_order[row.order]
+    ]
+    if task_rows:
+        db.execute(insert(DesignTaskV3), task_rows)
+    return project_ids
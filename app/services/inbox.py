@@ -0,0 +1,176 @@
+# app/services/inbox.py
+"""
+A user's work inbox: everything currently waiting on them.
+
+Sources (each is one query, and only runs for users whose roles make it
+relevant):
+
+  job_cards      Pending job cards where they are supervisor or foreman
+  requisitions   MRs awaiting their MR, PM or QS approval
+  lpos           LPOs awaiting Finance approval
+  design_tasks   their open / revision-requested Design tasks
+  design_tasks_v3  their open Design V3 tasks
+
+Requisitions are de-duplicated in SQL: one row per MR, with the stage it is
+waiting on for this user picked by a CASE, instead of merging per-role lists.
+
+get_inbox() is cached per user and role set on the data versions of the
+tables the sources read (app.core.cache), so any write to those tables - an
+approval, a new job card, a submitted task - invalidates it.
+"""
+from sqlalchemy import and_, case, false, func, literal, or_, select, true
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core import cache
+from app.services import approval_workflow
+from app.design_models import DesignPhase, DesignProject, DesignTask, DesignTaskStatus
+from app.design_v3_models import DesignProjectV3, DesignStageV3, DesignTaskV3, TaskStatusV3
+
+# Tables read by the sources below; a write to any of them invalidates inboxes.
+INBOX_TABLES = (
+    "job_cards", "projects", "material_requisitions", "lpos", "suppliers",
+    "design_tasks", "design_phases", "design_projects",
+    "design_tasks_v3", "design_stages_v3", "design_projects_v3",
+)
+# Items listed per source; counts are always complete.
+ITEMS_PER_SOURCE = 20
+
+FIELD_ROLES = {'Supervisor/Site Officer', 'Foreman/Duty Officer'}
+
+
+def requisition_approvals(user_roles: set, include_mr: bool = True):
+    """
+    (where, pending_for, is_actionable) expressions over MaterialRequisition
+    for the approval gates `user_roles` can decide, or None if none. Each MR
+    matches once; pending_for is the earliest gate waiting on this user, and
+    it is actionable once the gates before it have approved
+    (approval_workflow.GATES).
+    """
+    MR = models.MaterialRequisition
+    listed = {
+        "mr": and_(MR.mr_approval == 'Pending', MR.status != 'Rejected'),
+        "pm": MR.pm_approval == 'Pending',
+        "qs": and_(MR.qs_approval == 'Pending', MR.mr_approval == 'Approved'),
+    }
+    stages = []
+    for name, condition in listed.items():
+        gate = approval_workflow.GATES[name]
+        if (name == "mr" and not include_mr) or not gate.roles.intersection(user_roles):
+            continue
+        stages.append((gate.label, condition, and_(true(), *approval_workflow.requirements_met(gate))))
+    if not stages:
+        return None
+    where = or_(*(condition for _, condition, _ in stages))
+    pending_for = case(*((condition, literal(label)) for label, condition, _ in stages))
+    is_actionable = case(*((condition, actionable) for _, condition, actionable in stages), else_=false())
+    return where, pending_for, is_actionable
+
+
+def _with_total(query):
+    """Adds a window count so one query returns the first rows and the full count."""
+    return query.add_columns(func.count().over().label("total")).limit(ITEMS_PER_SOURCE)
+
+
+def _collect(db: Session, query, item) -> dict:
+    rows = db.execute(_with_total(query)).all()
+    return {"count": rows[0].total if rows else 0, "items": [item(row) for row in rows]}
+
+
+def _job_cards(db: Session, user: models.User) -> dict:
+    JC = models.JobCard
+    query = (
+        select(JC.id, JC.job_card_no, JC.date_issued, models.Project.name.label("project_name"))
+        .join(models.Project, models.Project.id == JC.project_id)
+        .where(JC.status == 'Pending', or_(JC.supervisor_user_id == user.id, JC.foreman_user_id == user.id))
+        .order_by(JC.date_issued.desc(), JC.id.desc())
+    )
+    return _collect(db, query, lambda r: {
+        "id": r.id, "job_card_no": r.job_card_no, "project_name": r.project_name,
+        "date_issued": r.date_issued, "link": f"/job-card-details/{r.id}",
+    })
+
+
+def _requisitions(db: Session, user_roles: set) -> dict:
+    where, pending_for, is_actionable = requisition_approvals(user_roles)
+    MR = models.MaterialRequisition
+    query = (
+        select(MR.id, MR.mr_number, MR.request_date, models.Project.name.label("project_name"),
+               pending_for.label("pending_for"), is_actionable.label("is_actionable"))
+        .join(models.Project, models.Project.id == MR.project_id)
+        .where(where)
+        .order_by(MR.request_date.desc(), MR.id.desc())
+    )
+    return _collect(db, query, lambda r: {
+        "id": r.id, "mr_number": r.mr_number, "project_name": r.project_name, "request_date": r.request_date,
+        "pending_for": r.pending_for, "is_actionable": r.is_actionable, "link": f"/requisition-details/{r.id}",
+    })
+
+
+def _lpos(db: Session) -> dict:
+    query = (
+        select(models.LPO.id, models.LPO.lpo_number, models.LPO.lpo_date, models.LPO.grand_total,
+               models.Supplier.name.label("supplier_name"))
+        .outerjoin(models.Supplier, models.Supplier.id == models.LPO.supplier_id)
+        .where(models.LPO.status == 'Pending')
+        .order_by(models.LPO.lpo_date.desc(), models.LPO.id.desc())
+    )
+    return _collect(db, query, lambda r: {
+        "id": r.id, "lpo_number": r.lpo_number, "lpo_date": r.lpo_date, "grand_total": r.grand_total,
+        "supplier_name": r.supplier_name, "link": f"/lpos/{r.id}",
+    })
+
+
+def _design_tasks(db: Session, user: models.User) -> dict:
+    query = (
+        select(DesignTask.id, DesignTask.title, DesignTask.status, DesignTask.due_date,
+               DesignProject.name.label("project_name"))
+        .join(DesignPhase, DesignPhase.id == DesignTask.phase_id)
+        .join(DesignProject, DesignProject.id == DesignPhase.project_id)
+        .where(DesignTask.owner_id == user.id,
+               DesignTask.status.in_([DesignTaskStatus.OPEN, DesignTaskStatus.REVISION_REQUESTED]))
+        .order_by(DesignTask.due_date.asc().nulls_last(), DesignTask.id)
+    )
+    return _collect(db, query, lambda r: {
+        "id": r.id, "title": r.title, "status": r.status.value, "due_date": r.due_date,
+        "project_name": r.project_name, "link": "/design/my-tasks",
+    })
+
+
+def _design_tasks_v3(db: Session, user: models.User) -> dict:
+    query = (
+        select(DesignTaskV3.id, DesignTaskV3.title, DesignTaskV3.due_date,
+               DesignProjectV3.name.label("project_name"))
+        .join(DesignStageV3, DesignStageV3.id == DesignTaskV3.stage_id)
+        .join(DesignProjectV3, DesignProjectV3.id == DesignStageV3.project_id)
+        .where(DesignTaskV3.owner_id == user.id, DesignTaskV3.status == TaskStatusV3.OPEN)
+        .order_by(DesignTaskV3.due_date.asc().nulls_last(), DesignTaskV3.id)
+    )
+    return _collect(db, query, lambda r: {
+        "id": r.id, "title": r.title, "due_date": r.due_date,
+        "project_name": r.project_name, "link": "/design/v3/my-tasks",
+    })
+
+
+def build_inbox(db: Session, user: models.User, user_roles: set) -> dict:
+    """Runs the sources relevant to `user_roles` (one query each)."""
+    sources = {}
+    if FIELD_ROLES.intersection(user_roles):
+        sources["job_cards"] = _job_cards(db, user)
+    if requisition_approvals(user_roles) is not None:
+        sources["requisitions"] = _requisitions(db, user_roles)
+    if approval_workflow.GATES["finance"].roles.intersection(user_roles):
+        sources["lpos"] = _lpos(db)
+    sources["design_tasks"] = _design_tasks(db, user)
+    sources["design_tasks_v3"] = _design_tasks_v3(db, user)
+    return {
+        "total": sum(source["count"] for source in sources.values()),
+        "counts": {name: source["count"] for name, source in sources.items()},
+        "sources": sources,
+    }
+
+
+def get_inbox(db: Session, user: models.User, user_roles: set) -> dict:
+    """The user's inbox, cached until one of INBOX_TABLES is written."""
+    scope = f"user:{user.id}:{','.join(sorted(user_roles))}"
+    return cache.cached_data(db, "inbox", scope, INBOX_TABLES, lambda: build_inbox(db, user, user_roles))
@@ -0,0 +1,419 @@
+# app/services/job_card_import.py
+"""
+Bulk job card import from CSV or XLSX.
+
+One row per task; rows with the same `job_card_ref` form one job card and
+must agree on the job card columns. The file is parsed row by row (csv
+reader / openpyxl read-only mode), each row is validated as it is read
+against config.yaml (units, site locations, crew options), and project
+names and user emails are resolved afterwards with one query each.
+
+build_plan() never writes; its summary() is the dry-run diff. commit_plan()
+inserts job cards, tasks and one notification per assignee with multi-row
+INSERTs, BATCH_SIZE rows at a time.
+"""
+import codecs
+import csv
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+import yaml
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+COLUMNS = [
+    "job_card_ref", "job_card_no", "project", "site_location", "date_issued",
+    "site_engineer_email", "supervisor_email", "foreman_email",
+    "task_details", "quantity", "units", "priority", "start_date", "end_date", "assigned_crew",
+]
+REQUIRED_COLUMNS = {"job_card_ref", "project", "site_location", "date_issued", "supervisor_email", "foreman_email", "task_details"}
+# Columns every row of one job card must agree on
+JOB_CARD_COLUMNS = ("job_card_no", "project", "site_location", "date_issued", "site_engineer_email", "supervisor_email", "foreman_email")
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 200
+PREVIEW_JOB_CARDS = 50
+
+
+class JobCardImportError(Exception):
+    """The file cannot be read at all (wrong type, no header, missing columns)."""
+
+
+def _load_config() -> dict:
+    path = Path(os.getenv("APP_CONFIG_PATH", "config.yaml"))
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        print(f"Warning: Config file at {path} not found.")
+        return {}
+
+
+# --- Reading ---
+
+def _normalize_header(value) -> str:
+    return str(value or "").strip().lower().replace(" ", "_")
+
+
+def _rows_from_header(header, rows) -> Iterator[tuple[int, dict]]:
+    columns = [_normalize_header(h) for h in header]
+    missing = REQUIRED_COLUMNS - set(columns)
+    if missing:
+        raise JobCardImportError(f"Missing columns: {', '.join(sorted(missing))}.")
+    for line_no, values in enumerate(rows, start=2):
+        row = {col: value for col, value in zip(columns, values) if col in COLUMNS}
+        if any(v not in (None, "") for v in row.values()):
+            yield line_no, row
+
+
+def read_rows(file: BinaryIO, filename: str) -> Iterator[tuple[int, dict]]:
+    """Yields (line number, row dict) from a CSV or XLSX upload without loading it whole."""
+    suffix = Path(filename or "").suffix.lower()
+    if suffix == ".csv":
+        reader = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+        header = next(reader, None)
+        if header is None:
+            raise JobCardImportError("The file is empty.")
+        yield from _rows_from_header(header, reader)
+    elif suffix == ".xlsx":
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise JobCardImportError("XLSX import needs the openpyxl package; upload a CSV instead.")
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                raise JobCardImportError("The sheet is empty.")
+            yield from _rows_from_header(header, rows)
+        finally:
+            workbook.close()
+    else:
+        raise JobCardImportError("Upload a .csv or .xlsx file.")
+
+
+# --- Planning ---
+
+@dataclass
+class RowError:
+    row: int
+    field: str
+    message: str
+
+
+@dataclass
+class PlannedJobCard:
+    ref: str
+    first_row: int
+    values: dict
+    tasks: list = field(default_factory=list)
+    job_card_no: Optional[str] = None
+    project_id: Optional[int] = None
+    user_ids: dict = field(default_factory=dict)
+
+
+@dataclass
+class ImportPlan:
+    rows: int = 0
+    job_cards: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+
+    def error(self, row: int, field_name: str, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(RowError(row, field_name, message))
+
+    @property
+    def task_count(self) -> int:
+        return sum(len(jc.tasks) for jc in self.job_cards)
+
+    def summary(self) -> dict:
+        by_project: dict = {}
+        for jc in self.job_cards:
+            counts = by_project.setdefault(jc.values["project"], {"job_cards": 0, "tasks": 0})
+            counts["job_cards"] += 1
+            counts["tasks"] += len(jc.tasks)
+        return {
+            "rows": self.rows,
+            "valid": self.error_count == 0,
+            "job_cards": len(self.job_cards),
+            "tasks": self.task_count,
+            "by_project": by_project,
+            "create": [
+                {
+                    "ref": jc.ref,
+                    "job_card_no": jc.job_card_no,
+                    "project": jc.values["project"],
+                    "site_location": jc.values["site_location"],
+                    "date_issued": jc.values["date_issued"],
+                    "tasks": len(jc.tasks),
+                }
+                for jc in self.job_cards[:PREVIEW_JOB_CARDS]
+            ],
+            "error_count": self.error_count,
+            "errors": [vars(e) for e in self.errors],
+        }
+
+
+def _text(value) -> str:
+    return str(value).strip() if value is not None else ""
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"'{text}' is not a date (use YYYY-MM-DD).")
+
+
+def _parse_quantity(value: str) -> Decimal:
+    try:
+        return Decimal(value.replace(",", ""))
+    except InvalidOperation:
+        raise ValueError(f"'{value}' is not a number.")
+
+
+def _choice(value, options: list, label: str) -> str:
+    """Matches `value` case-insensitively against a config.yaml list and returns the configured spelling."""
+    lookup = {str(o).lower(): o for o in options}
+    match = lookup.get(_text(value).lower())
+    if match is None:
+        raise ValueError(f"'{_text(value)}' is not a configured {label}.")
+    return match
+
+
+class _RowParser:
+    def __init__(self, plan: ImportPlan, config: dict):
+        self.plan = plan
+        self.site_locations = config.get("site_locations") or []
+        self.units = config.get("units") or []
+        self.crew_options = config.get("assigned_crew_options") or []
+
+    def field(self, line_no: int, name: str, fn, *args):
+        try:
+            return fn(*args)
+        except ValueError as e:
+            self.plan.error(line_no, name, str(e) or f"Invalid {name}.")
+            return None
+
+    def job_card_values(self, line_no: int, row: dict) -> dict:
+        return {
+            "job_card_no": _text(row.get("job_card_no")) or None,
+            "project": _text(row.get("project")),
+            "site_location": self.field(line_no, "site_location", _choice, row.get("site_location"), self.site_locations, "site location"),
+            "date_issued": self.field(line_no, "date_issued", _parse_date, row.get("date_issued")),
+            "site_engineer_email": _text(row.get("site_engineer_email")).lower() or None,
+            "supervisor_email": _text(row.get("supervisor_email")).lower(),
+            "foreman_email": _text(row.get("foreman_email")).lower(),
+        }
+
+    def task_values(self, line_no: int, row: dict) -> dict:
+        quantity = _text(row.get("quantity"))
+        units = _text(row.get("units"))
+        priority = _text(row.get("priority"))
+        start_date = _text(row.get("start_date"))
+        end_date = _text(row.get("end_date"))
+        crew = _text(row.get("assigned_crew"))
+        task = {
+            "task_details": _text(row.get("task_details")),
+            "quantity": self.field(line_no, "quantity", _parse_quantity, quantity) if quantity else None,
+            "units": self.field(line_no, "units", _choice, units, self.units, "unit") if units else None,
+            "priority": self.field(line_no, "priority", self._priority, priority) if priority else 3,
+            "start_date": self.field(line_no, "start_date", _parse_date, row.get("start_date")) if start_date else None,
+            "end_date": self.field(line_no, "end_date", _parse_date, row.get("end_date")) if end_date else None,
+            "assigned_crew": self.field(line_no, "assigned_crew", _choice, crew, self.crew_options, "crew option") if crew else None,
+        }
+        if task["start_date"] and task["end_date"] and task["end_date"] < task["start_date"]:
+            self.plan.error(line_no, "end_date", "End date is before the start date.")
+        return task
+
+    @staticmethod
+    def _priority(value: str) -> int:
+        priority = int(float(value))
+        if not 1 <= priority <= 5:
+            raise ValueError("Priority must be between 1 and 5.")
+        return priority
+
+
+def build_plan(db: Session, rows: Iterator[tuple[int, dict]], max_rows: int, today: Optional[date] = None) -> ImportPlan:
+    """Validates the rows and works out what an import would create. Never writes."""
+    plan = ImportPlan()
+    parser = _RowParser(plan, _load_config())
+    by_ref: dict[str, PlannedJobCard] = {}
+
+    for line_no, row in rows:
+        plan.rows += 1
+        if plan.rows > max_rows:
+            plan.error(line_no, "", f"Too many rows; the limit is {max_rows}.")
+            break
+        for column in sorted(REQUIRED_COLUMNS):
+            if not _text(row.get(column)):
+                plan.error(line_no, column, "Required.")
+        ref = _text(row.get("job_card_ref"))
+        if not ref:
+            continue
+
+        values = parser.job_card_values(line_no, row)
+        job_card = by_ref.get(ref)
+        if job_card is None:
+            job_card = by_ref[ref] = PlannedJobCard(ref=ref, first_row=line_no, values=values)
+        else:
+            for column in JOB_CARD_COLUMNS:
+                if values[column] is not None and values[column] != job_card.values[column]:
+                    plan.error(line_no, column, f"Differs from row {job_card.first_row} of job card '{ref}'.")
+        job_card.tasks.append(parser.task_values(line_no, row))
+
+    plan.job_cards = list(by_ref.values())
+    _resolve_references(db, plan)
+    _assign_numbers(db, plan, today or date.today())
+    return plan
+
+
+def _resolve_references(db: Session, plan: ImportPlan):
+    """Looks up projects and users for the whole file with one query each."""
+    names = {jc.values["project"].lower() for jc in plan.job_cards if jc.values["project"]}
+    emails = {
+        jc.values[column]
+        for jc in plan.job_cards
+        for column in ("site_engineer_email", "supervisor_email", "foreman_email")
+        if jc.values[column]
+    }
+    projects = dict(db.execute(
+        select(func.lower(models.Project.name), models.Project.id).where(func.lower(models.Project.name).in_(names))
+    ).all()) if names else {}
+    users = dict(db.execute(
+        select(func.lower(models.User.email), models.User.id).where(
+            func.lower(models.User.email).in_(emails), models.User.is_active.is_(True)
+        )
+    ).all()) if emails else {}
+
+    for jc in plan.job_cards:
+        project = jc.values["project"]
+        if project:
+            jc.project_id = projects.get(project.lower())
+            if jc.project_id is None:
+                plan.error(jc.first_row, "project", f"Unknown project '{project}'.")
+        for column in ("site_engineer_email", "supervisor_email", "foreman_email"):
+            email = jc.values[column]
+            if not email:
+                continue
+            jc.user_ids[column] = users.get(email)
+            if jc.user_ids[column] is None:
+                plan.error(jc.first_row, column, f"No active user with email '{email}'.")
+
+
+def _assign_numbers(db: Session, plan: ImportPlan, today: date):
+    """
+    Keeps numbers given in the file (checking they are free) and generates the
+    rest in the same SITE-YYYYMMDD-NNN sequence as generate_job_card_number.
+    """
+    given: dict[str, PlannedJobCard] = {}
+    for jc in plan.job_cards:
+        number = jc.values["job_card_no"]
+        if not number:
+            continue
+        if number in given:
+            plan.error(jc.first_row, "job_card_no", f"Job Card No '{number}' appears twice in the file.")
+        given[number] = jc
+        jc.job_card_no = number
+    if given:
+        taken = db.execute(select(models.JobCard.job_card_no).where(models.JobCard.job_card_no.in_(given))).scalars()
+        for number in taken:
+            plan.error(given[number].first_row, "job_card_no", f"Job Card No '{number}' already exists.")
+
+    date_str = today.strftime("%Y%m%d")
+    prefixes = {
+        jc.ref: f"{(jc.values['site_location'] or '')[:3].upper() or 'XXX'}-{date_str}-"
+        for jc in plan.job_cards if not jc.job_card_no
+    }
+    if not prefixes:
+        return
+    existing = db.execute(
+        select(models.JobCard.job_card_no).where(or_(*(models.JobCard.job_card_no.like(f"{p}%") for p in set(prefixes.values()))))
+    ).scalars()
+    last_seq: dict[str, int] = {}
+    for number in [*existing, *given]:
+        prefix, _, seq = number.rpartition("-")
+        if seq.isdigit():
+            key = prefix + "-"
+            last_seq[key] = max(last_seq.get(key, 0), int(seq))
+    for jc in plan.job_cards:
+        prefix = prefixes.get(jc.ref)
+        if prefix:
+            last_seq[prefix] = last_seq.get(prefix, 0) + 1
+            jc.job_card_no = f"{prefix}{last_seq[prefix]:03d}"
+
+
+# --- Committing ---
+
+def _batches(rows: list):
+    for i in range(0, len(rows), BATCH_SIZE):
+        yield rows[i:i + BATCH_SIZE]
+
+
+def commit_plan(db: Session, plan: ImportPlan, current_user: models.User) -> dict:
+    """Inserts a valid plan with multi-row INSERTs. The caller commits."""
+    job_card_ids: dict[str, int] = {}
+    rows = [
+        {
+            "job_card_no": jc.job_card_no,
+            "project_id": jc.project_id,
+            "date_issued": jc.values["date_issued"],
+            "site_location": jc.values["site_location"],
+            "status": "Pending",
+            "created_by_id": current_user.id,
+            "site_engineer_user_id": jc.user_ids.get("site_engineer_email"),
+            "supervisor_user_id": jc.user_ids["supervisor_email"],
+            "foreman_user_id": jc.user_ids["foreman_email"],
+            # Legacy NOT NULL columns, set the same way as create_job_card
+            "site_engineer_id": 1,
+            "supervisor_id": 1,
+            "foreman_id": 1,
+        }
+        for jc in plan.job_cards
+    ]
+    for batch in _batches(rows):
+        result = db.execute(insert(models.JobCard).returning(models.JobCard.job_card_no, models.JobCard.id), batch)
+        job_card_ids.update(result.all())
+
+    tasks = [
+        {**task, "job_card_id": job_card_ids[jc.job_card_no], "status": "Pending"}
+        for jc in plan.job_cards
+        for task in jc.tasks
+    ]
+    for batch in _batches(tasks):
+        db.execute(insert(models.Task), batch)
+
+    # One notification per assignee for the whole import
+    assigned: dict[int, int] = {}
+    for jc in plan.job_cards:
+        for user_id in {jc.user_ids["supervisor_email"], jc.user_ids["foreman_email"]}:
+            assigned[user_id] = assigned.get(user_id, 0) + 1
+    notifications = [
+        {
+            "user_id": user_id,
+            "message": f"{count} job card{'s' if count != 1 else ''} imported and assigned to you by {current_user.name}.",
+            "link": "/job-card-tracking",
+            "is_read": False,
+        }
+        for user_id, count in assigned.items()
+    ]
+    if notifications:
+        db.execute(insert(models.Notification), notifications)
+
+    return {"job_cards": len(job_card_ids), "tasks": len(tasks), "job_card_nos": sorted(job_card_ids)}
@@ -0,0 +1,88 @@
+# app/services/jobs.py
+"""
+Worker pools that keep heavy jobs off the request path.
+
+- PDF rendering (app/services/pdf.py) is CPU-bound Python that would hold the
+  GIL of the worker serving requests, so it runs in a small process pool
+  (PDF_WORKERS). Its processes are replaced after PDF_MAX_TASKS_PER_CHILD
+  renders, which bounds WeasyPrint's memory growth.
+- Video processing (app/services/video_processing.py) waits minutes on
+  Azure and OpenAI. As a BackgroundTask it would occupy one of the
+  THREADPOOL_SIZE threads that sync endpoints run on, so it gets its own
+  thread pool (JOB_WORKERS).
+
+Pools are created on first use in each worker process, i.e. after gunicorn
+forks. Like the password hashing pool (app/auth/security.py) they shed load:
+once MAX_PENDING jobs are queued or running, submit() raises 503.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+
+class Pool:
+    def __init__(self, name: str, make_executor: Callable[[], Executor], max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._make_executor = make_executor
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=503, detail=f"Too many {self.name} jobs in progress, please retry.",
+                    headers={"Retry-After": "5"},
+                )
+            if self._executor is None:
+                self._executor = self._make_executor()
+            try:
+                future = self._executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # A child died (e.g. killed for memory); start a fresh pool.
+                self._executor = self._make_executor()
+                future = self._executor.submit(fn, *args, **kwargs)
+            self._pending += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def shutdown(self, wait: bool = False, cancel_pending: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+def _pdf_executor() -> Executor:
+    # "spawn": the worker process has threads running, which fork does not copy safely.
+    return ProcessPoolExecutor(
+        max_workers=settings.PDF_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=settings.PDF_MAX_TASKS_PER_CHILD,
+    )
+
+
+def _job_executor() -> Executor:
+    return ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="job")
+
+
+pdf_pool = Pool("PDF", _pdf_executor, settings.PDF_MAX_PENDING)
+job_pool = Pool("processing", _job_executor, settings.JOB_MAX_PENDING)
+
+
+def shutdown():
+    """Stops the pools on worker exit. Renders in progress finish, queued ones are dropped; queued video jobs still run."""
+    pdf_pool.shutdown(wait=True, cancel_pending=True)
+    job_pool.shutdown()
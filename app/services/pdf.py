@@ -0,0 +1,32 @@
+# app/services/pdf.py
+"""
+HTML to PDF rendering for LPOs and invoices.
+
+Rendering runs in the PDF process pool (app/services/jobs.py), so a burst of
+PDF downloads doesn't stall the requests its worker is serving. WeasyPrint
+(and the Pango/cairo bindings it loads) is only ever imported in those
+processes, on their first render - or, with PDF_WORKERS=0, in the worker
+itself on the first render.
+"""
+from concurrent.futures import TimeoutError
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services import jobs
+
+
+def _render(html_string: str) -> bytes:
+    from weasyprint import HTML
+
+    return HTML(string=html_string).write_pdf()
+
+
+def render(html_string: str) -> bytes:
+    """Renders a PDF and waits for it. Call from a sync (threadpool) route."""
+    if settings.PDF_WORKERS <= 0:
+        return _render(html_string)
+    try:
+        return jobs.pdf_pool.submit(_render, html_string).result(timeout=settings.PDF_TIMEOUT_SECONDS)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="PDF generation timed out, please retry.")
@@ -0,0 +1,160 @@
+# app/services/progress_analytics.py
+"""
+Progress time series for burn-up charts.
+
+task_progress_daily holds one row per (task, day) with the quantity done that
+day and the task's project, so a project's chart over any range is a single
+range scan of ix_task_progress_daily_project_date (project_id, date, task_id
+INCLUDE quantity_done) rather than a walk over task_progress_logs.
+record_daily() upserts the row when progress is logged (see
+task_progress.record_progress); rebuild_daily() regenerates the table from
+the logs.
+
+trend() buckets by day, week (ISO, Monday) or month and returns columnar
+arrays: one list of bucket dates, and per task one list of quantities aligned
+with it.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Date, case, cast, delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+MAX_BUCKETS = 400
+
+
+def record_daily(db: Session, task_id: int, log_date: date, quantity_done: Decimal):
+    """Adds `quantity_done` to the task's row for `log_date`. The caller commits."""
+    source = (
+        select(
+            models.Task.id,
+            literal(log_date, Date),
+            models.JobCard.project_id,
+            literal(quantity_done, models.TaskProgressDaily.quantity_done.type),
+        )
+        .join(models.JobCard, models.JobCard.id == models.Task.job_card_id)
+        .where(models.Task.id == task_id)
+    )
+    stmt = pg_insert(models.TaskProgressDaily).from_select(
+        ["task_id", "date", "project_id", "quantity_done"], source
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.TaskProgressDaily.task_id, models.TaskProgressDaily.date],
+        set_={"quantity_done": models.TaskProgressDaily.quantity_done + stmt.excluded.quantity_done},
+    ))
+
+
+def rebuild_daily(db: Session) -> int:
+    """Regenerates task_progress_daily from task_progress_logs. Returns the row count. The caller commits."""
+    db.execute(delete(models.TaskProgressDaily))
+    source = (
+        select(
+            models.TaskProgressLog.task_id,
+            models.TaskProgressLog.date,
+            models.JobCard.project_id,
+            func.sum(models.TaskProgressLog.quantity_done),
+        )
+        .join(models.Task, models.Task.id == models.TaskProgressLog.task_id)
+        .join(models.JobCard, models.JobCard.id == models.Task.job_card_id)
+        .group_by(models.TaskProgressLog.task_id, models.TaskProgressLog.date, models.JobCard.project_id)
+    )
+    result = db.execute(insert(models.TaskProgressDaily).from_select(
+        ["task_id", "date", "project_id", "quantity_done"], source
+    ))
+    return result.rowcount
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_count(start: date, end: date, bucket: str) -> int:
+    if bucket == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    if bucket == "week":
+        return (bucket_start(end, bucket) - bucket_start(start, bucket)).days // 7 + 1
+    return (end - start).days + 1
+
+
+def bucket_dates(start: date, end: date, bucket: str) -> list:
+    dates, current = [], bucket_start(start, bucket)
+    while current <= end:
+        dates.append(current)
+        if bucket == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == "week" else 1)
+    return dates
+
+
+def trend(db: Session, project_id: int, start: date, end: date, bucket: str, tasks: Optional[list] = None) -> dict:
+    """
+    Quantity done per bucket between `start` and `end` for a project, per task
+    and in total, plus each task's progress before `start` so burn-up lines can
+    start from the right height. One range scan of task_progress_daily, then
+    the task labels by primary key.
+    """
+    dates = bucket_dates(start, end, bucket)
+    index = {d: i for i, d in enumerate(dates)}
+
+    daily = models.TaskProgressDaily
+    # Everything before the range collapses into one NULL "baseline" bucket.
+    # Grouped by label: the bound parameters would make the expressions differ.
+    period = case((daily.date < start, None), else_=cast(func.date_trunc(bucket, daily.date), Date)).label("bucket")
+    query = (
+        select(daily.task_id, period, func.sum(daily.quantity_done).label("quantity"))
+        .where(daily.project_id == project_id, daily.date <= end)
+        .group_by(daily.task_id, period)
+    )
+    if tasks:
+        query = query.where(daily.task_id.in_(tasks))
+
+    series: dict[int, list] = {}
+    baseline: dict[int, float] = {}
+    for task_id, period_start, quantity in db.execute(query):
+        if period_start is None:
+            baseline[task_id] = float(quantity)
+            continue
+        row = series.setdefault(task_id, [0.0] * len(dates))
+        row[index[period_start]] += float(quantity)
+
+    task_ids = sorted(set(series) | set(baseline))
+    for task_id in task_ids:
+        series.setdefault(task_id, [0.0] * len(dates))
+    total = [round(sum(values), 2) for values in zip(*(series[t] for t in task_ids))] if task_ids else [0.0] * len(dates)
+
+    cumulative, running = [], sum(baseline.values())
+    for value in total:
+        running += value
+        cumulative.append(round(running, 2))
+
+    labels = {
+        row.id: row
+        for row in db.execute(
+            select(models.Task.id, models.Task.task_details, models.Task.units, models.Task.quantity)
+            .where(models.Task.id.in_(task_ids))
+        )
+    } if task_ids else {}
+
+    return {
+        "project_id": project_id,
+        "bucket": bucket,
+        "buckets": [d.isoformat() for d in dates],
+        "total": {"done": total, "cumulative": cumulative},
+        "tasks": {
+            "id": task_ids,
+            "task_details": [labels[t].task_details for t in task_ids],
+            "units": [labels[t].units for t in task_ids],
+            "quantity": [labels[t].quantity for t in task_ids],
+            "baseline": [baseline.get(t, 0.0) for t in task_ids],
+            "done": [series[t] for t in task_ids],
+        },
+    }
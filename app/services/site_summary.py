@@ -0,0 +1,206 @@
+# app/services/site_summary.py
+"""
+Combined Form B / Form C daily site summary.
+
+site_daily_summary holds one row per (day, site location, project) with the
+counts the dashboard shows: reports submitted, PPE compliance, incidents /
+near misses, the overall site health reported on Form C and Form C reports
+listing critical actions. record_duty_officer_report() and
+record_site_officer_report() add a report's counts when it is submitted (see
+endpoints/reports.py); rebuild() regenerates the table from the reports.
+
+A Form B report counts against its job card's site and project. A Form C
+report counts once for each distinct project among its linked job cards, or
+against its material requisition project when it links none, under its own
+site location ('' when blank).
+
+summary() serves any range by day, week or month from the table alone.
+"""
+import re
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Date, Integer, and_, case, cast, delete, exists, func, insert, select, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+COUNTS = (
+    "form_b_reports", "form_c_reports", "ppe_compliant", "ppe_non_compliant", "incidents",
+    "health_good", "health_needs_improvement", "health_critical", "critical_actions",
+)
+
+HEALTH_COLUMNS = {
+    "Good": "health_good",
+    "Needs Improvement": "health_needs_improvement",
+    "Critical": "health_critical",
+}
+
+# Free-text answers that mean "nothing to report" on Form C, compared after
+# lower-casing and trimming whitespace and trailing full stops.
+NOTHING_TO_REPORT = ("", "none", "nil", "no", "n/a", "na", "-", "0", "nothing", "no incidents")
+_TRIM = r"^\s+|[\s.]+$"
+
+
+def _reported(answer: Optional[str]) -> bool:
+    return answer is not None and re.sub(_TRIM, "", answer.lower()) not in NOTHING_TO_REPORT
+
+
+def _reported_sql(column):
+    """SQL twin of _reported() for rebuild()."""
+    return and_(column.isnot(None), func.regexp_replace(func.lower(column), _TRIM, "", "g").notin_(NOTHING_TO_REPORT))
+
+
+def _add(db: Session, day: date, site_location: str, project_ids, counts: dict):
+    """Adds `counts` to the (day, site_location, project) row of each project."""
+    rows = [
+        {"date": day, "site_location": site_location, "project_id": project_id,
+         **{column: counts.get(column, 0) for column in COUNTS}}
+        for project_id in sorted(set(project_ids))
+    ]
+    if not rows:
+        return
+    summary_table = models.SiteDailySummary
+    stmt = pg_insert(summary_table).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[summary_table.date, summary_table.site_location, summary_table.project_id],
+        set_={column: getattr(summary_table, column) + stmt.excluded[column] for column in COUNTS},
+    ))
+
+
+def record_duty_officer_report(db: Session, report: models.DutyOfficerProgress):
+    """Adds a new Form B report to its day's summary. The caller commits."""
+    job_card = db.execute(
+        select(models.JobCard.site_location, models.JobCard.project_id)
+        .where(models.JobCard.id == report.job_card_id)
+    ).one_or_none()
+    if job_card is None:
+        return
+    _add(db, report.date_of_work, job_card.site_location or "", [job_card.project_id], {
+        "form_b_reports": 1,
+        "ppe_compliant" if report.sm_ppe_check else "ppe_non_compliant": 1,
+    })
+
+
+def record_site_officer_report(db: Session, report: models.SiteOfficerReport):
+    """Adds a new Form C report, job cards already linked, to its day's summary. The caller commits."""
+    project_ids = [job_card.project_id for job_card in report.job_cards]
+    if not project_ids and report.material_requisition_project_id:
+        project_ids = [report.material_requisition_project_id]
+
+    counts = {
+        "form_c_reports": 1,
+        "ppe_compliant" if report.hs_ppe_compliance else "ppe_non_compliant": 1,
+        "incidents": int(_reported(report.hs_incidents_near_misses)),
+        "critical_actions": int(_reported(report.sa_critical_actions)),
+    }
+    health = HEALTH_COLUMNS.get(report.sa_overall_site_health)
+    if health:
+        counts[health] = 1
+    _add(db, report.date, report.site_location or "", project_ids, counts)
+
+
+def _flag(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def rebuild(db: Session) -> int:
+    """Regenerates site_daily_summary from the Form B and Form C reports. Returns the row count. The caller commits."""
+    summary_table = models.SiteDailySummary
+    db.execute(delete(summary_table))
+
+    form_b = models.DutyOfficerProgress
+    site = func.coalesce(models.JobCard.site_location, "")
+    source = (
+        select(
+            form_b.date_of_work, site, models.JobCard.project_id, func.count(),
+            _flag(form_b.sm_ppe_check.is_(True)), _flag(form_b.sm_ppe_check.isnot(True)),
+        )
+        .join(models.JobCard, models.JobCard.id == form_b.job_card_id)
+        .group_by(form_b.date_of_work, site, models.JobCard.project_id)
+    )
+    db.execute(insert(summary_table).from_select(
+        ["date", "site_location", "project_id", "form_b_reports", "ppe_compliant", "ppe_non_compliant"], source
+    ))
+
+    form_c = models.SiteOfficerReport
+    link = models.report_jc_association_table
+    report_projects = union(
+        select(link.c.report_id, models.JobCard.project_id)
+        .join(models.JobCard, models.JobCard.id == link.c.job_card_id),
+        select(form_c.id, form_c.material_requisition_project_id)
+        .where(
+            form_c.material_requisition_project_id.isnot(None),
+            ~exists().where(link.c.report_id == form_c.id),
+        ),
+    ).subquery()
+    site = func.coalesce(form_c.site_location, "")
+    source = (
+        select(
+            form_c.date, site, report_projects.c.project_id, func.count(),
+            _flag(form_c.hs_ppe_compliance.is_(True)), _flag(form_c.hs_ppe_compliance.isnot(True)),
+            _flag(_reported_sql(form_c.hs_incidents_near_misses)),
+            *(_flag(form_c.sa_overall_site_health == value) for value in HEALTH_COLUMNS),
+            _flag(_reported_sql(form_c.sa_critical_actions)),
+        )
+        .join(report_projects, report_projects.c.report_id == form_c.id)
+        .group_by(form_c.date, site, report_projects.c.project_id)
+    )
+    columns = ["date", "site_location", "project_id", "form_c_reports", "ppe_compliant", "ppe_non_compliant",
+               "incidents", *HEALTH_COLUMNS.values(), "critical_actions"]
+    stmt = pg_insert(summary_table).from_select(columns, source)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[summary_table.date, summary_table.site_location, summary_table.project_id],
+        set_={column: getattr(summary_table, column) + stmt.excluded[column] for column in columns[3:]},
+    ))
+    return db.scalar(select(func.count()).select_from(summary_table))
+
+
+def summary(
+    db: Session, start: date, end: date, bucket: str,
+    project_id: Optional[int] = None, site_location: Optional[str] = None,
+) -> dict:
+    """
+    Summary rows per bucket, site location and project between `start` and
+    `end`, with totals over the range. Open critical actions are those on the
+    latest day each site / project reported Form C within the range, since a
+    later Form C restates what is still outstanding.
+    """
+    summary_table = models.SiteDailySummary
+    filters = [summary_table.date >= start, summary_table.date <= end]
+    if project_id is not None:
+        filters.append(summary_table.project_id == project_id)
+    if site_location is not None:
+        filters.append(summary_table.site_location == site_location)
+
+    period = cast(func.date_trunc(bucket, summary_table.date), Date).label("bucket")
+    sums = [cast(func.sum(getattr(summary_table, column)), Integer).label(column) for column in COUNTS]
+    query = (
+        select(period, summary_table.site_location, summary_table.project_id, models.Project.name.label("project_name"), *sums)
+        .join(models.Project, models.Project.id == summary_table.project_id)
+        .where(*filters)
+        .group_by(period, summary_table.site_location, summary_table.project_id, models.Project.name)
+        .order_by(period, summary_table.site_location, summary_table.project_id)
+    )
+    rows = [dict(row._mapping) for row in db.execute(query)]
+
+    totals = {column: sum(row[column] for row in rows) for column in COUNTS}
+    latest = (
+        select(summary_table.critical_actions)
+        .where(*filters, summary_table.form_c_reports > 0)
+        .distinct(summary_table.site_location, summary_table.project_id)
+        .order_by(summary_table.site_location, summary_table.project_id, summary_table.date.desc())
+        .subquery()
+    )
+    open_critical_actions = db.scalar(select(func.coalesce(func.sum(latest.c.critical_actions), 0)))
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "bucket": bucket,
+        "rows": rows,
+        "totals": totals,
+        "health": {value: totals[column] for value, column in HEALTH_COLUMNS.items()},
+        "open_critical_actions": int(open_critical_actions),
+    }
@@ -1,6 +1,7 @@
 # app/services/slack.py
 import httpx
 from app.core.config import settings
+from app.core import metrics
 
 async def send_slack_notification(message: str):
     """
@@ -14,7 +15,8 @@ async def send_slack_notification(message: str):
     
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(settings.SLACK_WEBHOOK_URL, json=payload)
+            with metrics.track_external("slack"):
+                response = await client.post(settings.SLACK_WEBHOOK_URL, json=payload)
             response.raise_for_status() # Raises an exception for 4xx/5xx errors
             print(f"Successfully sent Slack notification.")
         except httpx.RequestError as e:
@@ -33,7 +35,8 @@ async def send_design_slack_notification(message: str):
     
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(settings.SLACK_DESIGN_WEBHOOK_URL, json=payload)
+            with metrics.track_external("slack"):
+                response = await client.post(settings.SLACK_DESIGN_WEBHOOK_URL, json=payload)
             response.raise_for_status() # Raises an exception for 4xx/5xx errors
             print(f"Successfully sent Slack notification.")
         except httpx.RequestError as e:
@@ -0,0 +1,110 @@
+# app/services/task_progress.py
+"""
+Task progress totals.
+
+Task.quantity_done_total and Task.last_progress_at mirror the task's
+TaskProgressLog rows so pages can show progress without summing the logs.
+record_progress() inserts the log, increments the totals (a single
+UPDATE ... SET total = total + n, so concurrent logs for one task don't lose
+updates) and upserts the task's task_progress_daily row, all in the same
+transaction. reconcile() recomputes the totals from the logs and fixes any
+task that drifted, e.g. after logs were edited by hand; see
+scripts/reconcile_task_progress.py.
+"""
+from datetime import date as date_type
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import progress_analytics
+
+
+def record_progress(
+    db: Session,
+    task_id: int,
+    log_date: date_type,
+    quantity_done: Decimal,
+    notes: Optional[str],
+    user_id: int,
+) -> Optional[Decimal]:
+    """
+    Logs progress on a task and bumps its totals. Returns the new
+    quantity_done_total, or None if the task does not exist. The caller commits.
+    """
+    total = db.execute(
+        update(models.Task)
+        .where(models.Task.id == task_id)
+        .values(
+            quantity_done_total=models.Task.quantity_done_total + quantity_done,
+            last_progress_at=func.now(),
+        )
+        .returning(models.Task.quantity_done_total)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if total is None:
+        return None
+
+    progress_analytics.record_daily(db, task_id, log_date, quantity_done)
+    db.add(models.TaskProgressLog(
+        task_id=task_id,
+        date=log_date,
+        quantity_done=quantity_done,
+        notes=notes,
+        created_by_id=user_id,
+    ))
+    return total
+
+
+def _log_totals():
+    return (
+        select(
+            models.TaskProgressLog.task_id,
+            func.sum(models.TaskProgressLog.quantity_done).label("total"),
+            func.max(models.TaskProgressLog.created_at).label("last_at"),
+        )
+        .group_by(models.TaskProgressLog.task_id)
+        .subquery()
+    )
+
+
+def _drifted(actual, last_at):
+    return (models.Task.quantity_done_total != actual) | models.Task.last_progress_at.is_distinct_from(last_at)
+
+
+def find_drift(db: Session) -> list:
+    """Tasks whose stored totals differ from their logs: (task_id, stored, actual)."""
+    logs = _log_totals()
+    actual = func.coalesce(logs.c.total, 0)
+    return db.execute(
+        select(models.Task.id, models.Task.quantity_done_total, actual.label("actual"))
+        .outerjoin(logs, logs.c.task_id == models.Task.id)
+        .where(_drifted(actual, logs.c.last_at))
+        .order_by(models.Task.id)
+    ).all()
+
+
+def reconcile(db: Session) -> int:
+    """Rewrites the totals of every drifted task from its logs in one UPDATE. Returns how many changed. The caller commits."""
+    logs = _log_totals()
+    recomputed = (
+        select(
+            models.Task.id.label("task_id"),
+            func.coalesce(logs.c.total, 0).label("total"),
+            logs.c.last_at,
+        )
+        .outerjoin(logs, logs.c.task_id == models.Task.id)
+        .subquery()
+    )
+    result = db.execute(
+        update(models.Task)
+        .where(
+            models.Task.id == recomputed.c.task_id,
+            _drifted(recomputed.c.total, recomputed.c.last_at),
+        )
+        .values(quantity_done_total=recomputed.c.total, last_progress_at=recomputed.c.last_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
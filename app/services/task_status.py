@@ -0,0 +1,98 @@
+# app/services/task_status.py
+"""
+Task status updates and the job card status rollup.
+
+A job card is Done when all of its tasks are Done and goes back to Pending
+as soon as one of them is not. apply_status_updates() writes any number of
+(task_id, status) pairs with one UPDATE ... FROM (VALUES ...) and then
+recomputes the affected job cards with one grouped UPDATE, so ticking
+through a job card's tasks costs two statements and one commit.
+"""
+import os
+from pathlib import Path
+
+import yaml
+from fastapi import HTTPException
+from sqlalchemy import Integer, String, and_, case, column, func, or_, select, update, values
+from sqlalchemy.orm import Session
+
+from app import models
+
+DONE = "Done"
+REOPENED = "Pending"
+
+
+def _load_config() -> dict:
+    path = Path(os.getenv("APP_CONFIG_PATH", "config.yaml"))
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        print(f"Warning: Config file at {path} not found.")
+        return {}
+
+
+TASK_STATUSES = _load_config().get("task_statuses") or ["Pending", "Processing", DONE]
+
+
+def apply_status_updates(db: Session, statuses: dict[int, str]) -> dict:
+    """
+    Sets each task in `statuses` ({task_id: status}) and rolls the change up to
+    the job cards. Returns {task_id: {status, job_card_id}} for the updated tasks,
+    {job_card_id: status} for the job cards whose status changed and the task
+    ids that do not exist. The caller commits.
+    """
+    invalid = sorted({s for s in statuses.values() if s not in TASK_STATUSES})
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid task status: {', '.join(invalid)}. Allowed: {', '.join(TASK_STATUSES)}."
+        )
+
+    changes = values(
+        column("id", Integer), column("status", String), name="changes"
+    ).data(list(statuses.items()))
+    updated = db.execute(
+        update(models.Task)
+        .where(models.Task.id == changes.c.id)
+        .values(status=changes.c.status)
+        .returning(models.Task.id, models.Task.job_card_id, models.Task.status)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    tasks = {row.id: {"status": row.status, "job_card_id": row.job_card_id} for row in updated}
+    job_card_ids = {row.job_card_id for row in updated}
+    return {
+        "tasks": tasks,
+        "job_cards": rollup_job_cards(db, job_card_ids),
+        "not_found": sorted(set(statuses) - set(tasks)),
+    }
+
+
+def rollup_job_cards(db: Session, job_card_ids: set) -> dict:
+    """Recomputes the status of `job_card_ids` from their tasks; returns {id: status} for those that changed."""
+    if not job_card_ids:
+        return {}
+    open_tasks = (
+        select(
+            models.Task.job_card_id,
+            func.count().filter(models.Task.status != DONE).label("open"),
+        )
+        .where(models.Task.job_card_id.in_(job_card_ids))
+        .group_by(models.Task.job_card_id)
+        .subquery()
+    )
+    changed = db.execute(
+        update(models.JobCard)
+        .where(
+            models.JobCard.id == open_tasks.c.job_card_id,
+            or_(
+                and_(open_tasks.c.open == 0, models.JobCard.status.is_distinct_from(DONE)),
+                and_(open_tasks.c.open > 0, models.JobCard.status == DONE),
+            ),
+        )
+        .values(status=case((open_tasks.c.open == 0, DONE), else_=REOPENED))
+        .returning(models.JobCard.id, models.JobCard.status)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return {row.id: row.status for row in changed}
@@ -2,12 +2,11 @@
 import os
 import uuid
 import tempfile
-import openai
-from azure.storage.blob import BlobServiceClient
 from sqlalchemy.orm import Session
 
 from app.models import ToolboxVideo
 from app.core.database import SessionLocal
+from app.core import metrics
 
 def process_video_and_update_db(
     video_id: int, 
@@ -18,6 +17,10 @@ def process_video_and_update_db(
     """
     Background task to upload video, transcribe, and summarize.
     """
+    # The OpenAI and Azure SDKs are slow to import; load them on first use, not at app startup.
+    import openai
+    from azure.storage.blob import BlobServiceClient
+
     db: Session = SessionLocal()
     video_record = db.query(ToolboxVideo).filter(ToolboxVideo.id == video_id).first()
     if not video_record:
@@ -34,12 +37,12 @@ def process_video_and_update_db(
         blob_service_client = BlobServiceClient.from_connection_string(azure_conn_string)
         container_name = "toolbox-videos"
         container_client = blob_service_client.get_container_client(container_name)
-        if not container_client.exists():
-            container_client.create_container()
-        
         blob_name = f"{uuid.uuid4()}.webm"
         blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-        blob_client.upload_blob(file_contents, overwrite=True)
+        with metrics.track_external("azure"):
+            if not container_client.exists():
+                container_client.create_container()
+            blob_client.upload_blob(file_contents, overwrite=True)
         video_record.blob_url = blob_client.url
 
         # 2. Transcribe with OpenAI
@@ -48,7 +51,7 @@ def process_video_and_update_db(
             temp_file.write(file_contents)
             temp_file_path = temp_file.name
         
-        with open(temp_file_path, "rb") as audio_file:
+        with open(temp_file_path, "rb") as audio_file, metrics.track_external("openai"):
             transcription = openai.audio.transcriptions.create(model="whisper-1", file=audio_file)
             transcript_text = transcription.text
         
@@ -56,13 +59,14 @@ def process_video_and_update_db(
 
         # 3. Summarize with OpenAI
         if transcript_text:
-            completion = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Summarize this toolbox talk into key bullet points."},
-                    {"role": "user", "content": transcript_text}
-                ]
-            )
+            with metrics.track_external("openai"):
+                completion = openai.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "Summarize this toolbox talk into key bullet points."},
+                        {"role": "user", "content": transcript_text}
+                    ]
+                )
             video_record.summary = completion.choices[0].message.content
         
         video_record.processing_status = 'completed'
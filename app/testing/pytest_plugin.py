@@ -0,0 +1,43 @@
+# app/testing/pytest_plugin.py
+"""
+pytest plugin with query-budget helpers. Enable it with
+
+    pytest -p app.testing.pytest_plugin
+
+or `pytest_plugins = ["app.testing.pytest_plugin"]` in a conftest.py.
+
+Unless N_PLUS_ONE_MODE is already set, the plugin switches the app's N+1
+detector to "raise", so any request that repeats a lazy load more than
+N_PLUS_ONE_THRESHOLD times returns a 500 during the test run.
+
+    def test_dashboard(client, query_budget):
+        with query_budget(6, lazy_loads=0):
+            assert client.get("/").status_code == 200
+"""
+import os
+from contextlib import contextmanager
+
+import pytest
+
+
+def pytest_configure(config):
+    # Must run before app.core.config is imported by the tests.
+    os.environ.setdefault("N_PLUS_ONE_MODE", "raise")
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager factory: fails the test if the block exceeds its SQL / lazy-load budget."""
+    from app.core import nplusone
+
+    @contextmanager
+    def budget(max_queries: int, lazy_loads: int | None = None):
+        with nplusone.count_queries() as count:
+            yield count
+        if count.queries > max_queries:
+            pytest.fail(f"Query budget exceeded: {count.queries} > {max_queries}\n{count.summary()}", pytrace=False)
+        total_lazy = sum(count.lazy_loads.values())
+        if lazy_loads is not None and total_lazy > lazy_loads:
+            pytest.fail(f"Lazy-load budget exceeded: {total_lazy} > {lazy_loads}\n{count.summary()}", pytrace=False)
+
+    return budget
@@ -2,14 +2,8 @@
 from datetime import date
 from sqlalchemy.orm import Session
 from app.models import JobCard
-from azure.storage.blob import (
-    BlobServiceClient,
-    generate_blob_sas,
-    BlobSasPermissions,
-)
 from urllib.parse import urlparse, unquote, quote
 from datetime import datetime, timedelta
-from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
 from app.core.config import settings
 import base64
 from pathlib import Path
@@ -49,6 +43,9 @@ def generate_sas_url(blob_url: str) -> str:
     if not blob_url or not settings.AZURE_STORAGE_CONNECTION_STRING:
         return blob_url
 
+    # Imported here so app startup doesn't pay for the Azure SDK.
+    from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
+
     try:
         bsc = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
 
@@ -97,4 +94,15 @@ def image_to_data_uri(filepath: str) -> str | None:
             mime_type = f"image/{path.suffix.lstrip('.')}"
             return f"data:{mime_type};base64,{encoded_string}"
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+def date_cursor(day: date, row_id: int) -> str:
+    """Keyset cursor for lists ordered newest first by (date, id)."""
+    return f"{day.isoformat()}_{row_id}"
+
+
+def parse_date_cursor(cursor: str) -> tuple[date, int]:
+    """Inverse of date_cursor. Raises ValueError for a malformed cursor."""
+    cursor_date, cursor_id = cursor.split("_")
+    return date.fromisoformat(cursor_date), int(cursor_id)
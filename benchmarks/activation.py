@@ -0,0 +1,85 @@
+# benchmarks/activation.py
+"""
+Times Design V3 deal activation (project + 10 stages + default tasks) for a
+single deal and for a batch of deals, and counts the SQL statements each run
+issues. Everything happens in one transaction that is rolled back, so it is
+safe to point at a seeded benchmark database.
+
+    python benchmarks/activation.py --batch 500 --repeat 5
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from sqlalchemy import insert
+
+from app.core.database import SessionLocal
+from app.core.nplusone import count_queries
+from app import models
+import app.design_models  # noqa: F401 - registers the mappers User relates to
+import app.invoice_models  # noqa: F401
+from app.design_v3_models import CommitmentPackage, Deal, ProjectType
+from app.services import design_v3_workflow as workflow
+
+from journeys import BENCH_EMAIL
+
+
+def _make_deals(db, count: int, run: int) -> list:
+    ids = db.execute(
+        insert(Deal).returning(Deal.id),
+        [
+            {
+                "project_name": f"BENCH-ACT-{run}-{i:05d}",
+                "client_name": "Benchmark Client",
+                "project_type": ProjectType.NEW_PROJECT,
+                "contract_type": CommitmentPackage.DESIGN_BUILD,
+            }
+            for i in range(count)
+        ],
+    ).scalars().all()
+    return db.query(Deal).filter(Deal.id.in_(ids)).all()
+
+
+def measure(db, size: int, repeat: int, user_id) -> dict:
+    timings, statements = [], 0
+    for run in range(repeat):
+        deals = _make_deals(db, size, run)
+        with count_queries() as count:
+            started = time.perf_counter()
+            workflow.activate_deals(db, deals, user_id)
+            db.flush()
+            timings.append(time.perf_counter() - started)
+        statements = count.queries
+    median = statistics.median(timings)
+    return {"deals": size, "median_ms": median * 1000, "per_deal_ms": median * 1000 / size, "statements": statements}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=500, help="Deals activated in the batch run (default: 500)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size; the median is reported")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == BENCH_EMAIL).first()
+        workflow.stage_templates()  # read the YAML outside the timed region
+        results = [measure(db, size, args.repeat, user.id if user else None) for size in (1, args.batch)]
+    finally:
+        db.rollback()
+        db.close()
+
+    print(f"{'deals':>7} {'median ms':>10} {'ms/deal':>9} {'statements':>11}")
+    for r in results:
+        print(f"{r['deals']:>7} {r['median_ms']:>10.1f} {r['per_deal_ms']:>9.2f} {r['statements']:>11}")
+    single, batch = results
+    print(f"\n{args.batch} deals in one batch: {single['per_deal_ms'] / batch['per_deal_ms']:.1f}x cheaper per deal than one at a time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/journeys.py
+"""
+Scripted user journeys for benchmarks/run.py.
+
+Each journey is an async function taking a Session and performing the
+requests a real user would make on that screen. Every request is recorded
+under its route template (e.g. "GET /api/lpos/{lpo_id}/pdf") so numbers from
+different ids aggregate together.
+"""
+import random
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+BENCH_EMAIL = "bench@metamorphic.local"
+
+
+@dataclass
+class Sample:
+    route: str
+    seconds: float
+    status: int
+
+
+@dataclass
+class Session:
+    client: httpx.AsyncClient
+    rng: random.Random
+    samples: list[Sample]
+    ids: dict[str, list[int]] = field(default_factory=dict)
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.samples.append(Sample(route, time.perf_counter() - start, status))
+        return response
+
+    async def get(self, route: str, url: str | None = None, **kwargs) -> httpx.Response:
+        return await self.request(f"GET {route}", "GET", url or route, **kwargs)
+
+    async def post(self, route: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(f"POST {route}", "POST", url, **kwargs)
+
+    def pick(self, kind: str) -> int | None:
+        ids = self.ids.get(kind)
+        return self.rng.choice(ids) if ids else None
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/auth/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    token = response.json()["access_token"]
+    client.cookies.set("access_token", token)
+    client.headers["Authorization"] = f"Bearer {token}"
+    return token
+
+
+async def discover_ids(client: httpx.AsyncClient) -> dict[str, list[int]]:
+    """Collects ids the journeys need (LPOs, requisitions awaiting MR approval)."""
+    lpos = (await client.get("/api/lpos/", params={"limit": 200, "search": "BENCH-LPO"})).json()["lpos"]
+    pending = (await client.get("/api/approvals/pending")).json()
+    return {
+        "lpo": [lpo["id"] for lpo in lpos],
+        "pending_mr": [mr["id"] for mr in pending if mr.get("mr_approval") == "Pending"][:500],
+    }
+
+
+# --- Journeys ---
+
+async def dashboard(s: Session):
+    await s.get("/")
+
+
+async def form_pages(s: Session):
+    for path in ("/job-card-form", "/material-requisition-form", "/duty-officer-form", "/site-officer-form"):
+        await s.get(path)
+
+
+async def job_card_tracking(s: Session):
+    await s.get("/job-card-tracking")
+    response = await s.get("/job-cards/api/tracking")
+    if response is None or response.status_code != 200:
+        return
+    page = response.json()
+    if page["next_cursor"] is not None:
+        await s.get("/job-cards/api/tracking (next page)", "/job-cards/api/tracking", params={"cursor": page["next_cursor"]})
+    if page["job_cards"]:
+        job_card_id = s.rng.choice(page["job_cards"])["id"]
+        await s.get("/job-cards/api/tracking/{job_card_id}/tasks", f"/job-cards/api/tracking/{job_card_id}/tasks")
+
+
+async def approvals(s: Session):
+    await s.get("/approvals")
+    await s.get("/api/approvals/pending")
+    mr_id = s.pick("pending_mr")
+    if mr_id is not None:
+        await s.post(
+            "/api/approvals/{req_id}/status",
+            f"/api/approvals/{mr_id}/status",
+            json={"approval_type": "mr", "new_status": "Approved"},
+        )
+
+
+async def lpo_list_search_pdf(s: Session):
+    await s.get("/lpos")
+    await s.get("/api/lpos/", params={"skip": s.rng.randrange(0, 2000, 20), "limit": 20})
+    await s.get("/api/lpos/ (search)", "/api/lpos/", params={"search": f"BENCH-LPO-{s.rng.randrange(0, 200):03d}"})
+    lpo_id = s.pick("lpo")
+    if lpo_id is not None:
+        await s.get("/api/lpos/{lpo_id}", f"/api/lpos/{lpo_id}")
+        await s.get("/api/lpos/{lpo_id}/pdf", f"/api/lpos/{lpo_id}/pdf")
+
+
+async def notifications_stream(s: Session):
+    """Opens the SSE stream and measures time to the first event."""
+    route = "GET /api/notifications/stream (first event)"
+    start = time.perf_counter()
+    status = 0
+    try:
+        async with s.client.stream("GET", "/api/notifications/stream") as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    break
+    except httpx.HTTPError:
+        status = 0
+    s.samples.append(Sample(route, time.perf_counter() - start, status))
+
+
+# name -> (journey, relative weight)
+JOURNEYS = {
+    "dashboard": (dashboard, 5),
+    "forms": (form_pages, 3),
+    "job_card_tracking": (job_card_tracking, 3),
+    "approvals": (approvals, 2),
+    "lpos": (lpo_list_search_pdf, 3),
+    "notifications": (notifications_stream, 2),
+}
@@ -0,0 +1,264 @@
+# benchmarks/run.py
+"""
+Runs the scripted user journeys against the app and reports per-route
+throughput and p50/p95/p99 latency.
+
+    # 1. seed once
+    python benchmarks/seed_data.py --scale 1.0 --password bench-pass
+    # 2. start stubs + app, run for 60s with 10 virtual users, save the result as the baseline
+    python benchmarks/run.py --start-app --password bench-pass --users 10 --duration 60 --save-baseline
+    # 3. after a change: compare against the baseline (exit code 1 on regressions)
+    python benchmarks/run.py --start-app --password bench-pass --compare benchmarks/baseline.json
+
+With --start-app the Slack/Azure/OpenAI stubs (stub_services.py) and
+app.main:app under gunicorn (gunicorn.conf.py) are started with the stub
+environment; the database is whatever DATABASE_URL points at. Without it,
+--app-url must point at an app that is already running against the stubs.
+benchmarks/topology.py reruns this for several worker/threadpool sizes.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from multiprocessing import Process
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.append(str(BENCH_DIR))
+
+import journeys
+import stub_services
+from journeys import BENCH_EMAIL
+
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+
+# --- Process management ---
+
+def _wait_for(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+def start_services(app_port: int, stub_port: int, workers: int, stub_latency_ms: float,
+                   threadpool: int | None = None):
+    stubs = Process(target=stub_services.serve, args=(stub_port, stub_latency_ms), daemon=True)
+    stubs.start()
+    _wait_for(f"http://127.0.0.1:{stub_port}/v1/chat/completions")
+
+    # Same process model as production (gunicorn.conf.py), sized by the arguments.
+    env = {
+        **os.environ, **stub_services.stub_env(stub_port), "BASE_URL": f"http://127.0.0.1:{app_port}/",
+        "BIND": f"127.0.0.1:{app_port}", "WEB_CONCURRENCY": str(workers),
+    }
+    if threadpool:
+        env["THREADPOOL_SIZE"] = str(threadpool)
+    app = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app", "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    _wait_for(f"http://127.0.0.1:{app_port}/health")
+    return stubs, app
+
+
+# --- Load generation ---
+
+async def virtual_user(base_url: str, email: str, password: str, names: list[str], ids: dict,
+                       seed: int, deadline: float, samples: list):
+    rng = random.Random(seed)
+    weights = [journeys.JOURNEYS[name][1] for name in names]
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, follow_redirects=False) as client:
+        await journeys.login(client, email, password)
+        session = journeys.Session(client=client, rng=rng, samples=samples, ids=ids)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights=weights)[0]
+            await journeys.JOURNEYS[name][0](session)
+
+
+async def run_load(base_url: str, email: str, password: str, names: list[str], users: int,
+                   duration: float, warmup: float, seed: int) -> tuple[list, float]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await journeys.login(client, email, password)
+        ids = await journeys.discover_ids(client)
+
+    if warmup:
+        await asyncio.gather(*(
+            virtual_user(base_url, email, password, names, ids, seed + i, time.monotonic() + warmup, [])
+            for i in range(users)
+        ))
+
+    samples: list = []
+    started = time.monotonic()
+    await asyncio.gather(*(
+        virtual_user(base_url, email, password, names, ids, seed + 1000 + i, started + duration, samples)
+        for i in range(users)
+    ))
+    return samples, time.monotonic() - started
+
+
+# --- Reporting ---
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)  # nearest rank
+    return sorted_values[index]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    by_route: dict[str, list] = {}
+    for sample in samples:
+        by_route.setdefault(sample.route, []).append(sample)
+
+    def stats(group: list) -> dict:
+        latencies = sorted(s.seconds * 1000 for s in group)
+        return {
+            "count": len(group),
+            "errors": sum(1 for s in group if s.status == 0 or s.status >= 500),
+            "rps": round(len(group) / elapsed, 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+        }
+
+    return {
+        "routes": {route: stats(group) for route, group in sorted(by_route.items())},
+        "total": stats(samples) if samples else {},
+    }
+
+
+def print_report(result: dict, baseline: dict | None = None):
+    header = f"{'route':52} {'count':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    rows = list(result["routes"].items()) + [("TOTAL", result["total"])]
+    for route, s in rows:
+        line = (f"{route[:52]:52} {s['count']:>7} {s['errors']:>5} {s['rps']:>8.1f} "
+                f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+        if baseline:
+            base = baseline["routes"].get(route) if route != "TOTAL" else baseline.get("total")
+            line += f" {_delta(base['p95_ms'], s['p95_ms']) if base else 'new':>12}"
+        print(line)
+
+
+def _delta(before: float, after: float) -> str:
+    if not before:
+        return "-"
+    return f"{(after - before) / before:+.0%}"
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for route, s in result["routes"].items():
+        base = baseline["routes"].get(route)
+        if base and base["p95_ms"] and s["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{route}: p95 {base['p95_ms']:.1f} -> {s['p95_ms']:.1f} ms")
+    return found
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start-app", action="store_true", help="Start the service stubs and the app")
+    parser.add_argument("--app-port", type=int, default=8000)
+    parser.add_argument("--stub-port", type=int, default=9911)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Artificial latency for stubbed services")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers (with --start-app)")
+    parser.add_argument("--threadpool", type=int, help="THREADPOOL_SIZE per worker (with --start-app)")
+    parser.add_argument("--email", default=BENCH_EMAIL)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--journeys", default=",".join(journeys.JOURNEYS), help="Comma-separated journey names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write the result to {BASELINE_PATH.name}")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p95 regression (default 15%%)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.journeys.split(",") if n.strip()]
+    unknown = set(names) - set(journeys.JOURNEYS)
+    if unknown:
+        parser.error(f"Unknown journeys: {', '.join(sorted(unknown))}")
+
+    processes = None
+    base_url = args.app_url
+    if args.start_app:
+        processes = start_services(args.app_port, args.stub_port, args.workers, args.stub_latency_ms, args.threadpool)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+
+    try:
+        samples, elapsed = asyncio.run(run_load(
+            base_url, args.email, args.password, names, args.users, args.duration, args.warmup, args.seed
+        ))
+    finally:
+        if processes:
+            stubs, app = processes
+            app.terminate()
+            app.wait(timeout=30)
+            stubs.terminate()
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "users": args.users,
+            "duration_s": round(elapsed, 1),
+            "journeys": names,
+            "workers": args.workers if args.start_app else None,
+            "threadpool": args.threadpool if args.start_app else None,
+            "stub_latency_ms": args.stub_latency_ms,
+        },
+        **summarize(samples, elapsed),
+    }
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(result, baseline)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{result['meta']['commit']}.json"
+    out.write_text(json.dumps(result, indent=2))
+    print(f"\nSaved {out.relative_to(ROOT)}")
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(result, indent=2))
+        print(f"Saved baseline {BASELINE_PATH.relative_to(ROOT)}")
+
+    if baseline:
+        found = regressions(result, baseline, args.tolerance)
+        if found:
+            print(f"\np95 regressions beyond {args.tolerance:.0%}:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# benchmarks/seed_data.py
+"""
+Seeds a local Postgres for benchmarking.
+
+Reference data comes from the regular scripts/seed_*.py scripts (roles,
+projects, suppliers, materials); on top of that synthetic job cards, tasks,
+material requisitions and LPOs are generated at realistic volume with bulk
+INSERTs. Generation is deterministic (fixed random seed), so two databases
+seeded with the same --scale are comparable.
+
+    python benchmarks/seed_data.py --scale 1.0 --password bench-pass
+
+--scale 1.0 is 50k job cards, 200k tasks, 100k MRs and 20k LPOs. Run it
+against an empty database (after `alembic upgrade head`); rows are tagged
+with a BENCH- prefix and a second run is a no-op.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "scripts"))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app import models
+import app.design_models  # noqa: F401 - registers the mappers User relates to
+import app.design_v3_models  # noqa: F401
+import app.invoice_models  # noqa: F401
+from app.auth.security import get_password_hash
+
+import seed_roles
+import seed_projects
+import seed_suppliers
+import seed_materials
+
+from journeys import BENCH_EMAIL
+BENCH_ROLES = ["Super Admin", "Project Manager", "QS", "Procurement", "Finance"]
+
+# Row counts at --scale 1.0
+VOLUMES = {
+    "job_cards": 50_000,
+    "tasks": 200_000,
+    "material_requisitions": 100_000,
+    "lpos": 20_000,
+}
+BATCH_SIZE = 5_000
+START_DATE = date(2024, 1, 1)
+
+with (ROOT / "config.yaml").open(encoding="utf-8") as f:
+    APP_CONFIG = yaml.safe_load(f) or {}
+SITE_LOCATIONS = APP_CONFIG.get("site_locations") or ["Dubai"]
+UNITS = APP_CONFIG.get("units") or ["NOS"]
+
+
+def _batched(rows, size=BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _bulk_insert(db: Session, model, rows: list[dict]) -> list[int]:
+    """Multi-row INSERT ... RETURNING id in batches; returns the new ids in order."""
+    ids = []
+    for batch in _batched(rows):
+        ids.extend(db.execute(insert(model).returning(model.id), batch).scalars().all())
+    return ids
+
+
+def _ensure_people(db: Session, model, prefix: str, count: int) -> list[int]:
+    existing = set(db.execute(select(model.name)).scalars())
+    rows = [{"name": f"{prefix} {i:02d}"} for i in range(1, count + 1) if f"{prefix} {i:02d}" not in existing]
+    if rows:
+        db.execute(insert(model), rows)
+    return list(db.execute(select(model.id)).scalars())
+
+
+def seed_reference_data(db: Session):
+    """Runs the regular seed scripts."""
+    seed_roles.create_all_roles(db)
+    seed_projects.create_projects(db)
+    seed_suppliers.seed_suppliers(db)
+    seed_materials.seed_materials(db)
+
+
+def ensure_bench_user(db: Session, password: str) -> models.User:
+    user = db.query(models.User).filter(models.User.email == BENCH_EMAIL).first()
+    roles = db.query(models.Role).filter(models.Role.name.in_(BENCH_ROLES)).all()
+    if user is None:
+        user = models.User(email=BENCH_EMAIL, name="Benchmark User", hashed_password=get_password_hash(password), is_active=True)
+        db.add(user)
+    else:
+        user.hashed_password = get_password_hash(password)
+    user.roles = roles
+    db.commit()
+    return user
+
+
+def seed_synthetic(db: Session, scale: float, user_id: int, rng: random.Random):
+    volumes = {name: max(1, int(count * scale)) for name, count in VOLUMES.items()}
+    already = db.execute(select(func.count()).where(models.JobCard.job_card_no.like("BENCH-%"))).scalar()
+    if already:
+        print(f"Found {already} benchmark job cards, skipping synthetic data.")
+        return
+
+    project_ids = list(db.execute(select(models.Project.id)).scalars())
+    supplier_ids = list(db.execute(select(models.Supplier.id)).scalars())
+    material_ids = list(db.execute(select(models.Material.id)).scalars())
+    if not (project_ids and supplier_ids and material_ids):
+        raise SystemExit("Projects, suppliers and materials must be seeded first (see scripts/seed_*.py).")
+    engineer_ids = _ensure_people(db, models.SiteEngineer, "Bench Engineer", 20)
+    supervisor_ids = _ensure_people(db, models.Supervisor, "Bench Supervisor", 20)
+    foreman_ids = _ensure_people(db, models.Foreman, "Bench Foreman", 40)
+
+    def some_date():
+        return START_DATE + timedelta(days=rng.randrange(0, 650))
+
+    started = time.perf_counter()
+    job_cards = [
+        {
+            "job_card_no": f"BENCH-JC-{i:07d}",
+            "status": rng.choices(["Pending", "Processing", "Done"], weights=[3, 2, 5])[0],
+            "date_issued": some_date(),
+            "site_location": rng.choice(SITE_LOCATIONS),
+            "project_id": rng.choice(project_ids),
+            "site_engineer_id": rng.choice(engineer_ids),
+            "supervisor_id": rng.choice(supervisor_ids),
+            "foreman_id": rng.choice(foreman_ids),
+            "created_by_id": user_id,
+        }
+        for i in range(volumes["job_cards"])
+    ]
+    job_card_ids = _bulk_insert(db, models.JobCard, job_cards)
+    print(f"  job_cards: {len(job_card_ids)}")
+
+    tasks = [
+        {
+            "job_card_id": rng.choice(job_card_ids),
+            "task_details": f"Bench task {i}: {rng.choice(['Tiling', 'Painting', 'Gypsum', 'MEP first fix', 'Screeding'])}",
+            "status": rng.choices(["Pending", "Processing", "Done"], weights=[3, 2, 5])[0],
+            "quantity": rng.randrange(1, 500),
+            "units": rng.choice(UNITS),
+            "priority": rng.randrange(1, 6),
+        }
+        for i in range(volumes["tasks"])
+    ]
+    for batch in _batched(tasks):
+        db.execute(insert(models.Task), batch)
+    print(f"  tasks: {len(tasks)}")
+
+    approvals = ["Pending", "Approved", "Rejected"]
+    requisitions = []
+    for i in range(volumes["material_requisitions"]):
+        mr_approval = rng.choices(approvals, weights=[2, 7, 1])[0]
+        requisitions.append({
+            "mr_number": f"BENCH-MR-{i:07d}",
+            "request_date": some_date(),
+            "project_id": rng.choice(project_ids),
+            "requested_by_id": user_id,
+            "created_by_id": user_id,
+            "material_type": rng.choice(["Civil", "MEP", "Finishing"]),
+            "urgency": rng.choice(["Low", "Medium", "High"]),
+            "required_delivery_date": some_date(),
+            "status": rng.choices(["Pending", "Approved", "Rejected", "Delivered"], weights=[4, 3, 1, 2])[0],
+            "supplier_id": rng.choice(supplier_ids),
+            "mr_approval": mr_approval,
+            "pm_approval": rng.choices(approvals, weights=[4, 5, 1])[0] if mr_approval == "Approved" else "Pending",
+            "qs_approval": "Pending",
+        })
+    mr_ids = _bulk_insert(db, models.MaterialRequisition, requisitions)
+    items = [
+        {"requisition_id": mr_id, "material_id": material_id, "quantity": rng.randrange(1, 200)}
+        for mr_id in mr_ids
+        for material_id in rng.sample(material_ids, k=min(len(material_ids), rng.randrange(1, 4)))
+    ]
+    for batch in _batched(items):
+        db.execute(insert(models.RequisitionItem), batch)
+    print(f"  material_requisitions: {len(mr_ids)} ({len(items)} items)")
+
+    lpos = []
+    for i in range(volumes["lpos"]):
+        subtotal = rng.randrange(500, 250_000)
+        lpos.append({
+            "lpo_number": f"BENCH-LPO-{i:06d}",
+            "lpo_date": some_date(),
+            "status": rng.choices(["Pending", "Approved", "Rejected"], weights=[3, 6, 1])[0],
+            "subtotal": subtotal,
+            "tax_total": round(subtotal * 0.05, 2),
+            "grand_total": round(subtotal * 1.05, 2),
+            "supplier_id": rng.choice(supplier_ids),
+            "project_id": rng.choice(project_ids),
+            "created_by_id": user_id,
+        })
+    lpo_ids = _bulk_insert(db, models.LPO, lpos)
+    lpo_items = [
+        {"lpo_id": lpo_id, "material_id": rng.choice(material_ids), "description": "Bench item",
+         "quantity": rng.randrange(1, 100), "rate": rng.randrange(5, 900), "tax_rate": 0.05}
+        for lpo_id in lpo_ids
+        for _ in range(rng.randrange(1, 6))
+    ]
+    for batch in _batched(lpo_items):
+        db.execute(insert(models.LPOItem), batch)
+    links = [
+        {"lpo_id": lpo_id, "material_requisition_id": mr_id}
+        for lpo_id, mr_id in zip(lpo_ids, rng.sample(mr_ids, k=min(len(mr_ids), len(lpo_ids))))
+    ]
+    for batch in _batched(links):
+        db.execute(insert(models.lpo_mr_association_table), batch)
+    print(f"  lpos: {len(lpo_ids)} ({len(lpo_items)} items)")
+
+    db.commit()
+    print(f"Synthetic data committed in {time.perf_counter() - started:.1f}s")
+
+
+def main(scale: float, password: str, seed: int):
+    db = SessionLocal()
+    try:
+        seed_reference_data(db)
+        user = ensure_bench_user(db, password)
+        print(f"Benchmark user: {BENCH_EMAIL}")
+        seed_synthetic(db, scale, user.id, random.Random(seed))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the row counts (default: 1.0)")
+    parser.add_argument("--password", required=True, help=f"Password to set for {BENCH_EMAIL}")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args()
+    main(args.scale, args.password, args.seed)
@@ -0,0 +1,98 @@
+# benchmarks/startup.py
+"""
+Measures what importing app.main costs a worker at startup, using
+`python -X importtime` in fresh interpreters, and checks that the heavy
+optional dependencies (WeasyPrint, OpenAI, Azure SDK, ...) are not among the
+modules loaded - they are imported on first use.
+
+    python benchmarks/startup.py --repeat 5 --top 15
+    # in CI: exit code 1 if one of LAZY_PACKAGES is imported at startup
+    python benchmarks/startup.py --check-lazy
+
+The app's settings are read from the environment / .env as usual; no
+database connection is made.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Top-level packages that must only be imported when first used.
+LAZY_PACKAGES = ("weasyprint", "openai", "azure", "user_agents", "ua_parser")
+
+
+def _import_once(module: str) -> list:
+    """[(self_us, cumulative_us, depth, name)] for one fresh `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def _by_package(rows: list) -> dict:
+    """Self time summed per top-level package, in microseconds."""
+    totals = {}
+    for self_us, _, _, name in rows:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--check-lazy", action="store_true", help="Fail if a LAZY_PACKAGES module is imported.")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    runs = [_import_once(args.module) for _ in range(args.repeat)]
+    totals_ms = [sum(row[0] for row in rows) / 1000 for rows in runs]
+    packages = {}
+    for rows in runs:
+        for package, us in _by_package(rows).items():
+            packages.setdefault(package, []).append(us / 1000)
+    median_by_package = sorted(
+        ((package, statistics.median(ms)) for package, ms in packages.items()), key=lambda item: -item[1]
+    )
+    loaded = {row[3].split(".")[0] for row in runs[-1]}
+    eager = sorted(loaded & set(LAZY_PACKAGES))
+
+    print(f"import {args.module}: median {statistics.median(totals_ms):.0f} ms "
+          f"(min {min(totals_ms):.0f}, max {max(totals_ms):.0f}) over {args.repeat} runs, "
+          f"{len(runs[-1])} modules")
+    print(f"\n{'package':<32}{'self ms':>10}")
+    for package, ms in median_by_package[:args.top]:
+        print(f"{package:<32}{ms:>10.1f}")
+    print(f"\nLazy packages imported at startup: {', '.join(eager) or 'none'}")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "module": args.module,
+            "total_ms": totals_ms,
+            "packages_ms": dict(median_by_package),
+            "eager_lazy_packages": eager,
+        }, indent=2))
+
+    if args.check_lazy and eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/stub_services.py
+"""
+Local stand-ins for the external services the app calls, so benchmarks never
+touch Slack, Azure Blob Storage or OpenAI:
+
+  POST /slack                                  Slack incoming webhook
+  GET/PUT /devstoreaccount1/<container>[/blob]   Azure Blob (container exists/create, upload)
+  POST /v1/audio/transcriptions                Whisper
+  POST /v1/chat/completions                    Chat completions
+
+`stub_env(port)` returns the environment overrides that point the app at it.
+Each stub can add artificial latency (--latency-ms) to mimic the real service.
+
+    python benchmarks/stub_services.py --port 9911 --latency-ms 80
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import time
+import uuid
+from email.utils import formatdate
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+AZURE_ACCOUNT = "devstoreaccount1"
+AZURE_KEY = base64.b64encode(b"benchmark-stub-account-key").decode()
+
+LATENCY_SECONDS = 0.0
+
+
+def stub_env(port: int) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    return {
+        "SLACK_WEBHOOK_URL": f"{base}/slack",
+        "SLACK_DESIGN_WEBHOOK_URL": f"{base}/slack",
+        "AZURE_STORAGE_CONNECTION_STRING": (
+            f"DefaultEndpointsProtocol=http;AccountName={AZURE_ACCOUNT};AccountKey={AZURE_KEY};"
+            f"BlobEndpoint={base}/{AZURE_ACCOUNT};"
+        ),
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{base}/v1",
+    }
+
+
+async def _delay():
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+
+
+def _azure_headers() -> dict:
+    return {
+        "ETag": f'"0x{uuid.uuid4().hex[:16].upper()}"',
+        "Last-Modified": formatdate(usegmt=True),
+        "x-ms-request-id": str(uuid.uuid4()),
+        "x-ms-version": "2025-01-05",
+        "x-ms-request-server-encrypted": "true",
+    }
+
+
+async def slack(request: Request):
+    await request.body()
+    await _delay()
+    return PlainTextResponse("ok")
+
+
+async def azure_container(request: Request):
+    await _delay()
+    if request.method == "PUT":
+        return Response(status_code=201, headers=_azure_headers())
+    # Every container "exists" so the app skips creation after the first call.
+    return Response(status_code=200, headers=_azure_headers())
+
+
+async def azure_blob(request: Request):
+    body = await request.body()
+    await _delay()
+    if request.method == "PUT":
+        headers = _azure_headers()
+        headers["Content-MD5"] = base64.b64encode(hashlib.md5(body).digest()).decode()
+        return Response(status_code=201, headers=headers)
+    return Response(b"stub", headers={**_azure_headers(), "Content-Type": "application/octet-stream"})
+
+
+async def transcription(request: Request):
+    await request.body()
+    await _delay()
+    return JSONResponse({"text": "Toolbox talk: wear PPE, keep the site clean, report hazards."})
+
+
+async def chat_completion(request: Request):
+    payload = await request.json()
+    await _delay()
+    return JSONResponse({
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "- Wear PPE\n- Keep the site clean\n- Report hazards"},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+    })
+
+
+app = Starlette(routes=[
+    Route("/slack", slack, methods=["POST"]),
+    Route("/v1/audio/transcriptions", transcription, methods=["POST"]),
+    Route("/v1/chat/completions", chat_completion, methods=["POST"]),
+    Route(f"/{AZURE_ACCOUNT}/{{container}}", azure_container, methods=["GET", "HEAD", "PUT"]),
+    Route(f"/{AZURE_ACCOUNT}/{{container}}/{{blob:path}}", azure_blob, methods=["GET", "HEAD", "PUT"]),
+])
+
+
+def serve(port: int, latency_ms: float = 0.0):
+    global LATENCY_SECONDS
+    LATENCY_SECONDS = latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9911)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    serve(args.port, args.latency_ms)
@@ -0,0 +1,111 @@
+# benchmarks/topology.py
+"""
+Sweeps gunicorn worker counts and per-worker threadpool sizes with the
+run.py journeys and recommends WEB_CONCURRENCY / THREADPOOL_SIZE for the
+machine it runs on.
+
+    python benchmarks/topology.py --password bench-pass --workers 2,4,8 --threadpool 20,40,80 --duration 30
+
+Each combination gets a fresh app (and stubs) and the same load. The
+recommendation is the smallest configuration - fewest workers, then fewest
+threads, since both cost memory and DB connections - whose throughput is
+within --slack of the best run and whose error rate is at most --max-errors.
+Use --stub-latency-ms to model slow Azure/OpenAI/Slack calls.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BENCH_DIR))
+
+import journeys
+import run
+from journeys import BENCH_EMAIL
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def measure(args, workers: int, threadpool: int, names: list[str]) -> dict:
+    stubs, app = run.start_services(args.app_port, args.stub_port, workers, args.stub_latency_ms, threadpool)
+    try:
+        samples, elapsed = asyncio.run(run.run_load(
+            f"http://127.0.0.1:{args.app_port}", args.email, args.password, names,
+            args.users, args.duration, args.warmup, args.seed,
+        ))
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        stubs.terminate()
+        stubs.join()
+    total = run.summarize(samples, elapsed)["total"]
+    return {
+        "workers": workers,
+        "threadpool": threadpool,
+        "rps": total.get("rps", 0.0),
+        "p95_ms": total.get("p95_ms", 0.0),
+        "p99_ms": total.get("p99_ms", 0.0),
+        "error_rate": total["errors"] / total["count"] if total.get("count") else 1.0,
+    }
+
+
+def recommend(results: list[dict], slack: float, max_errors: float) -> dict | None:
+    healthy = [r for r in results if r["error_rate"] <= max_errors]
+    if not healthy:
+        return None
+    best_rps = max(r["rps"] for r in healthy)
+    close = [r for r in healthy if r["rps"] >= best_rps * (1 - slack)]
+    return min(close, key=lambda r: (r["workers"], r["threadpool"], r["p95_ms"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=_ints, default=[2, 4, 8], help="Comma-separated worker counts")
+    parser.add_argument("--threadpool", type=_ints, default=[20, 40, 80], help="Comma-separated THREADPOOL_SIZE values")
+    parser.add_argument("--app-port", type=int, default=8000)
+    parser.add_argument("--stub-port", type=int, default=9911)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--email", default=BENCH_EMAIL)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--users", type=int, default=40, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per configuration")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--journeys", default=",".join(journeys.JOURNEYS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slack", type=float, default=0.05, help="Throughput within this of the best counts as equal")
+    parser.add_argument("--max-errors", type=float, default=0.001, help="Highest acceptable error rate")
+    args = parser.parse_args()
+    names = [n.strip() for n in args.journeys.split(",") if n.strip()]
+
+    results = []
+    for workers in args.workers:
+        for threadpool in args.threadpool:
+            print(f"workers={workers} threadpool={threadpool} ...", flush=True)
+            results.append(measure(args, workers, threadpool, names))
+
+    print(f"\n{'workers':>8} {'threads':>8} {'rps':>9} {'p95':>9} {'p99':>9} {'errors':>8}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['threadpool']:>8} {r['rps']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['error_rate']:>8.2%}")
+
+    choice = recommend(results, args.slack, args.max_errors)
+    print(f"\nCPUs: {os.cpu_count()}, users: {args.users}, stub latency: {args.stub_latency_ms} ms")
+    if choice:
+        print(f"Recommended: WEB_CONCURRENCY={choice['workers']} THREADPOOL_SIZE={choice['threadpool']}")
+    else:
+        print(f"No configuration stayed under {args.max_errors:.1%} errors.")
+
+    run.RESULTS_DIR.mkdir(exist_ok=True)
+    out = run.RESULTS_DIR / f"topology-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps({"users": args.users, "results": results, "recommended": choice}, indent=2))
+    print(f"Saved {out.relative_to(run.ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
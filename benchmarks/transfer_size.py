@@ -0,0 +1,86 @@
+# benchmarks/transfer_size.py
+"""
+Reports how many bytes the main pages and JSON endpoints put on the wire:
+uncompressed, gzip, brotli and a conditional revalidation (If-None-Match).
+
+    python benchmarks/transfer_size.py --base-url http://127.0.0.1:8000 --email admin@example.com --password ...
+"""
+import argparse
+import os
+
+import httpx
+
+PAGES = [
+    "/",
+    "/job-card-tracking",
+    "/procurement/material-requisitions",
+    "/procurement/material-requisitions-drafts",
+    "/procurement/material-requisitions-delivered",
+]
+JSON_ENDPOINTS = [
+    "/api/lpos/",
+    "/api/invoices/",
+    "/job-cards/api/all-done",
+    "/api/reports/job-cards",
+    "/api/reports/material-requisitions",
+    "/api/reports/lpos",
+]
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def wire_bytes(client: httpx.Client, path: str, headers: dict) -> tuple[int, httpx.Response]:
+    """GETs `path` and returns the number of (possibly compressed) body bytes received."""
+    with client.stream("GET", path, headers=headers) as response:
+        response.read()
+        return response.num_bytes_downloaded, response
+
+
+def login(client: httpx.Client, email: str, password: str):
+    response = client.post("/auth/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    token = response.json()["access_token"]
+    client.cookies.set("access_token", token)
+    client.headers["Authorization"] = f"Bearer {token}"
+
+
+def run(base_url: str, email: str, password: str):
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        login(client, email, password)
+
+        header = f"{'path':45} " + " ".join(f"{e:>10}" for e in ENCODINGS) + f" {'304':>10} {'saved':>7}"
+        print(header)
+        print("-" * len(header))
+        totals = dict.fromkeys(ENCODINGS + ["304"], 0)
+        for path in PAGES + JSON_ENDPOINTS:
+            sizes = {}
+            etag = None
+            for encoding in ENCODINGS:
+                sizes[encoding], response = wire_bytes(client, path, {"Accept-Encoding": encoding})
+                etag = etag or response.headers.get("etag")
+                if encoding != "identity" and response.headers.get("content-encoding") != encoding:
+                    sizes[encoding] = None  # Server did not negotiate this encoding
+            if etag:
+                sizes["304"], _ = wire_bytes(client, path, {"Accept-Encoding": "gzip", "If-None-Match": etag})
+            else:
+                sizes["304"] = None
+
+            best = min(v for k, v in sizes.items() if v is not None and k != "304")
+            saved = 1 - best / sizes["identity"] if sizes["identity"] else 0
+            cells = " ".join(f"{sizes[k] if sizes[k] is not None else '-':>10}" for k in ENCODINGS + ["304"])
+            print(f"{path:45} {cells} {saved:>6.0%}")
+            for k, v in sizes.items():
+                totals[k] += v if v is not None else sizes["identity"]
+
+        print("-" * len(header))
+        print(f"{'TOTAL':45} " + " ".join(f"{totals[k]:>10}" for k in ENCODINGS + ["304"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("BENCH_BASE_URL", "http://127.0.0.1:8000"))
+    parser.add_argument("--email", default=os.getenv("BENCH_EMAIL"))
+    parser.add_argument("--password", default=os.getenv("BENCH_PASSWORD"))
+    args = parser.parse_args()
+    if not args.email or not args.password:
+        parser.error("--email and --password (or BENCH_EMAIL / BENCH_PASSWORD) are required")
+    run(args.base_url, args.email, args.password)
@@ -0,0 +1,59 @@
+# gunicorn.conf.py
+"""
+Production process model: a gunicorn master with uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Each of the WEB_CONCURRENCY workers serves async routes on its event loop
+and sync `def` routes on THREADPOOL_SIZE threads, and hands PDF renders and
+video processing to its own pools (PDF_WORKERS processes, JOB_WORKERS
+threads; see app/services/jobs.py). benchmarks/topology.py measures which
+worker/thread counts suit a given machine.
+
+With GUNICORN_PRELOAD=1 (the default) the master imports the app once, compiles
+every Jinja template and freezes the GC before forking, so the workers start
+with all of it already in (copy-on-write shared) memory instead of each
+importing and compiling it again. Set GUNICORN_PRELOAD=0 to have each worker
+import the app itself (e.g. to roll workers onto new code with a HUP).
+"""
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Workers are replaced after max_requests (+ up to max_requests_jitter, so they
+# don't all restart at once), which bounds slow memory growth.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None  # heartbeat file off the container's disk
+
+
+def when_ready(server):
+    """Runs in the master once the app is loaded (only when preloading)."""
+    if not preload_app:
+        return
+    from app.core import templating
+
+    count = templating.precompile()
+    # Objects created so far are never collected; keeping the GC from touching them
+    # keeps their pages shared with the workers.
+    gc.freeze()
+    server.log.info("Preloaded app: %d templates compiled, %d objects frozen", count, gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Connections the master may have opened must not be shared with the children.
+    from app.core.database import engine, replica_engine
+
+    engine.dispose(close=False)
+    if replica_engine is not None:
+        replica_engine.dispose(close=False)
@@ -0,0 +1,36 @@
+# scripts/rebuild_site_summary.py
+"""
+Regenerates the site_daily_summary table behind the site summary dashboard
+from the Form B and Form C reports, e.g. after reports were edited or deleted
+through the admin.
+
+    python scripts/rebuild_site_summary.py
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+import app.models  # noqa: F401
+import app.design_models  # noqa: F401 - registers the mappers User relates to
+import app.design_v3_models  # noqa: F401
+import app.invoice_models  # noqa: F401
+from app.services import site_summary
+
+
+def main():
+    db = SessionLocal()
+    try:
+        rows = site_summary.rebuild(db)
+        db.commit()
+        print(f"Rebuilt site_daily_summary: {rows} row(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    main()
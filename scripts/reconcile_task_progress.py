@@ -0,0 +1,53 @@
+# scripts/reconcile_task_progress.py
+"""
+Recomputes Task.quantity_done_total / last_progress_at from task_progress_logs
+and fixes any task that has drifted. --rebuild-daily also regenerates the
+task_progress_daily rollup behind the trend charts.
+
+    python scripts/reconcile_task_progress.py            # fix
+    python scripts/reconcile_task_progress.py --dry-run  # only report
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+import app.models  # noqa: F401
+import app.design_models  # noqa: F401 - registers the mappers User relates to
+import app.design_v3_models  # noqa: F401
+import app.invoice_models  # noqa: F401
+from app.services import progress_analytics, task_progress
+
+
+def main(dry_run: bool, rebuild_daily: bool):
+    db = SessionLocal()
+    try:
+        if rebuild_daily and not dry_run:
+            rows = progress_analytics.rebuild_daily(db)
+            db.commit()
+            print(f"Rebuilt task_progress_daily: {rows} row(s).")
+
+        drifted = task_progress.find_drift(db)
+        for task_id, stored, actual in drifted[:50]:
+            print(f"Task #{task_id}: stored {stored}, logs say {actual}")
+        if len(drifted) > 50:
+            print(f"... and {len(drifted) - 50} more")
+        if dry_run or not drifted:
+            print(f"{len(drifted)} task(s) out of step.")
+            return
+        fixed = task_progress.reconcile(db)
+        db.commit()
+        print(f"Reconciled {fixed} task(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report drifted tasks without changing them")
+    parser.add_argument("--rebuild-daily", action="store_true", help="Also regenerate task_progress_daily from the logs")
+    args = parser.parse_args()
+    main(args.dry_run, args.rebuild_daily)
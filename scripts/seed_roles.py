@@ -10,7 +10,6 @@ from app.core.database import SessionLocal
 from app.models import Role, UserRole
 
 import app.design_models
-import app.design_v2_models
 import app.design_v3_models
 
 def create_all_roles(db: Session):